@@ -1,5 +1,7 @@
 """ Init module of GeocoderPL project """
 
-from . import db_classes, geo_gui, geo_utilities, super_permutations, xml_parsers
+from . import (db_classes, db_export, db_queries, db_shards, db_snapshots, geo_bench, geo_gui, geo_labels, geo_search,
+               geo_stats, geo_tiles, geo_utilities, super_permutations, xml_parsers)
 
-__all__ = [db_classes, geo_gui, geo_utilities, super_permutations, xml_parsers]
+__all__ = [db_classes, db_export, db_queries, db_shards, db_snapshots, geo_bench, geo_gui, geo_labels, geo_search,
+           geo_stats, geo_tiles, geo_utilities, super_permutations, xml_parsers]
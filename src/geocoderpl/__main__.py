@@ -1,53 +1,114 @@
 """ Main module of GeocoderPL project """
 
+import argparse
+
 from PyQt5 import QtWidgets
 
-from db_classes import BASE
+from db_classes import BASE, SCHEMA_VERSION, get_snapshot_path
+from db_export import export_snapshot
+from db_queries import create_dict_views, get_data_engines, get_schema_version, set_schema_version, \
+    sync_rtree_tables, sync_table_indexes
+from db_shards import build_shards
+from db_snapshots import create_snapshot_version, publish_snapshot, validate_snapshot
 from geo_gui import MyGeoGUI
 from geo_utilities import *
 from xml_parsers import BDOT10kDataParser, PRGDataParser
 
-# Tworzymy domyślny obiekt loggera
-create_logger('root')
-
-# Zapisujemy czas startu
-s_time = time.time()
-
-# Sprawdzamy w bazie czy tablica 'BDOT10K_TABLE' istnieje
-if not sa.inspect(SQL_ENGINE).has_table("BDOT10K_TABLE"):
-    # Tworzymy domyslne obiekty tabel BDOT10K i PRG
-    BASE.metadata.create_all(SQL_ENGINE)
-
-    # Tworzymy tabele z macierza addresow oraz unikalnych fraz
-    with Session(SQL_ENGINE) as db_session:
-        db_session.add(UniqPhrs(''))
-        db_session.commit()
-
-    # Wypełniamy tablice zwiazane z parametrami regionow
-    fill_regs_tables()
-
-    # Tworzymy tabelę 'BDOT10K_TABLE' z danymi o budynkach
-    m_tags = os.environ['BDOT10K_TAGS'].split(";")
-    all_tags = (m_tags[0], m_tags[1], m_tags[2], m_tags[3], m_tags[4], m_tags[5], m_tags[6], m_tags[7])
-    dicts_tags = {m_tags[0]: m_tags[-4], m_tags[1]: m_tags[-3], m_tags[2]: m_tags[-2], m_tags[3]: m_tags[-1]}
-    tags_dict = {tag: i for i, tag in enumerate(all_tags)}
-    bdot10k_path = os.path.join(os.environ["PARENT_PATH"], os.environ['BDOT10K_PATH'])
-    BDOT10kDataParser(bdot10k_path, all_tags, 'end', dicts_tags, tags_dict)
-
-    # Tworzymy tabelę SQL z punktami adresowymi PRG
-    prg_path = os.path.join(os.environ["PARENT_PATH"], os.environ['PRG_PATH'])
-    all_tags1 = tuple(os.environ['PRG_TAGS'].split(";"))
-    perms_dict = get_super_permut_dict(int(os.environ['SUPPERM_MAX']))
-    PRGDataParser(prg_path, all_tags1, 'end', perms_dict)
-
-# Tworzmy GUI wyswietlajace mape
-geo_app = QtWidgets.QApplication(sys.argv)
-geo_app.setStyleSheet('''QWidget {background-color: rgb(255, 255, 255);}''')
-my_geo_gui = MyGeoGUI()
-my_geo_gui.show()
-
-# Dodajemy do loggera infomracje o czasie wykonania
-logging.getLogger('root').info("Łączny czas wykonywania programu - {:.2f} sekundy.".format(time.time() - s_time))
-
-# Zamykamy okno aplikaji
-sys.exit(geo_app.exec_())
+# Kod programu uruchamiamy tylko w procesie glownym - procesy robocze budujace bazy czesciowe importuja ten modul
+if __name__ == '__main__':
+    # Tworzymy domyślny obiekt loggera
+    create_logger('root')
+
+    # Zapisujemy czas startu
+    s_time = time.time()
+
+    # Wczytujemy parametry uruchomienia programu
+    arg_parser = argparse.ArgumentParser(description="Geokoder adresów PRG i budynków BDOT10k.")
+    arg_parser.add_argument("--build", action="store_true", help="buduje nową kopię bazy danych nawet jeśli " +
+                            "opublikowana kopia już istnieje")
+    arg_parser.add_argument("--keep", type=int, default=int(os.environ["SNAPSHOT_KEEP"]),
+                            help="liczba najnowszych kopii bazy danych, które nie są usuwane po opublikowaniu nowej " +
+                            "kopii")
+    arg_parser.add_argument("--no-gui", action="store_true", help="kończy program bez uruchamiania okna mapy")
+    arg_parser.add_argument("--shards", action="store_true", help="zapisuje budynki i punkty adresowe każdego " +
+                            "województwa w osobnej bazie częściowej budowanej przez niezależny proces")
+    arg_parser.add_argument("--workers", type=int, default=int(os.environ["SHARD_WORKERS"]),
+                            help="liczba procesów budujących bazy częściowe")
+    main_args = arg_parser.parse_args()
+
+    # Nowa kopie bazy danych budujemy, jesli zazada tego uzytkownik, gdy w opublikowanej bazie nie ma tablicy
+    # 'BDOT10K_TABLE' lub gdy opublikowana baza ma inna wersje schematu - do czasu opublikowania nowej kopii inne
+    # procesy korzystaja z poprzedniej kopii bazy danych
+    if main_args.build or not os.path.isfile(get_snapshot_path("DB_PATH")) or \
+            not sa.inspect(SQL_ENGINE).has_table("BDOT10K_TABLE") or get_schema_version() != SCHEMA_VERSION:
+        snap_version = create_snapshot_version()
+
+        # Tworzymy domyslne obiekty tabel BDOT10K i PRG
+        BASE.metadata.create_all(SQL_ENGINE)
+
+        # Tworzymy widoki tablic BDOT10K i PRG zawierajace wartosci z tablic slownikowych
+        create_dict_views()
+
+        # Tworzymy tabele z macierza addresow oraz unikalnych fraz
+        with Session(SQL_ENGINE) as db_session:
+            db_session.add(UniqPhrs(''))
+            db_session.commit()
+
+        # Wypełniamy tablice zwiazane z parametrami regionow
+        fill_regs_tables()
+
+        # Definiujemy parametry parserow BDOT10k i PRG
+        m_tags = os.environ['BDOT10K_TAGS'].split(";")
+        all_tags = (m_tags[0], m_tags[1], m_tags[2], m_tags[3], m_tags[4], m_tags[5], m_tags[6], m_tags[7])
+        dicts_tags = {m_tags[0]: m_tags[-4], m_tags[1]: m_tags[-3], m_tags[2]: m_tags[-2], m_tags[3]: m_tags[-1]}
+        tags_dict = {tag: i for i, tag in enumerate(all_tags)}
+        bdot10k_path = os.path.join(os.environ["PARENT_PATH"], os.environ['BDOT10K_PATH'])
+        bdot10k_args = (bdot10k_path, all_tags, 'end', dicts_tags, tags_dict)
+        prg_path = os.path.join(os.environ["PARENT_PATH"], os.environ['PRG_PATH'])
+        all_tags1 = tuple(os.environ['PRG_TAGS'].split(";"))
+        perms_dict = get_super_permut_dict(int(os.environ['SUPPERM_MAX']))
+        prg_args = (prg_path, all_tags1, 'end', perms_dict)
+
+        if main_args.shards:
+            # Budynki i punkty adresowe kazdego wojewodztwa zapisujemy rownolegle w osobnych bazach czesciowych
+            build_shards(bdot10k_args, prg_args, main_args.workers)
+        else:
+            # Tworzymy tabelę 'BDOT10K_TABLE' z danymi o budynkach
+            BDOT10kDataParser(*bdot10k_args)
+
+            # Dzielimy obszar Polski na sektory (liscie drzewa czworkowego) wedlug liczby budynkow w komorkach siatki
+            create_sectors_tree()
+
+            # Tworzymy tabelę SQL z punktami adresowymi PRG
+            PRGDataParser(*prg_args)
+
+        # Uzupelniamy tablice R*Tree i indeksy, zapisujemy wersje schematu i sprawdzamy kompletnosc nowej kopii bazy
+        # danych - opublikowane kopie nie sa juz modyfikowane, bo inne procesy otwieraja je w trybie niezmiennym
+        for db_engine in get_data_engines():
+            sync_rtree_tables(db_engine)
+            sync_table_indexes(db_engine)
+
+        set_schema_version()
+        validate_snapshot(snap_version)
+
+        # Zapisujemy kolumnowa kopie bazy danych w plikach Parquet - katalog plikow jest czescia nowej kopii, wiec
+        # procesy czytajace poprzednia kopie nie widza czesciowo zapisanych plikow
+        export_snapshot(get_snapshot_path("PARQUET_PATH", snap_version))
+
+        # Publikujemy nowa kopie bazy danych i usuwamy najstarsze kopie (razem z ich plikami Parquet)
+        publish_snapshot(snap_version, main_args.keep)
+
+    if main_args.no_gui:
+        sys.exit(0)
+
+    # Tworzmy GUI wyswietlajace mape
+    geo_app = QtWidgets.QApplication(sys.argv)
+    geo_app.setStyleSheet('''QWidget {background-color: rgb(255, 255, 255);}''')
+    my_geo_gui = MyGeoGUI()
+    my_geo_gui.show()
+
+    # Dodajemy do loggera infomracje o czasie wykonania
+    logging.getLogger('root').info("Łączny czas wykonywania programu - {:.2f} sekundy.".format(time.time() - s_time))
+
+    # Zamykamy okno aplikaji
+    sys.exit(geo_app.exec_())
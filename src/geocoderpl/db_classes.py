@@ -1,6 +1,9 @@
 """ Module that defines SQL database classes in the GeocoderPL project """
 
 import os
+import sqlite3
+from typing import Callable, Dict, Optional, Tuple
+from urllib.request import pathname2url
 
 import sqlalchemy as sa
 from dotenv import load_dotenv
@@ -14,8 +17,161 @@ parent_path = os.path.join(os.getcwd()[:os.getcwd().index("GeocoderPL")], "Geoco
 load_dotenv(os.path.join(parent_path, ".env"))
 os.environ["PARENT_PATH"] = parent_path
 
-# Deklarujemy silnik SQL
-SQL_ENGINE = sa.create_engine("sqlite:///" + os.path.join(os.environ["PARENT_PATH"], os.environ["DB_PATH"]))
+
+def get_snapshot_pointer() -> str:
+    """
+    Function that returns path to the file containing version of the published database snapshot
+
+    :return: Path to the file
+    """
+
+    return os.path.join(os.environ["PARENT_PATH"], os.environ["DB_PATH"]) + ".current"
+
+
+def get_snapshot_version(build_flag: bool = True) -> str:
+    """
+    Function that returns version of the database snapshot used by the project - version of the snapshot which is being
+    built (variable 'SNAPSHOT_BUILD'), version of the last published snapshot or empty string if no snapshot has been
+    published (database is stored directly under the path 'DB_PATH')
+
+    :param build_flag: Flag indicating if version of the snapshot which is being built is returned
+    :return: Version of the database snapshot
+    """
+
+    if build_flag and os.environ.get("SNAPSHOT_BUILD"):
+        return os.environ["SNAPSHOT_BUILD"]
+
+    try:
+        with open(get_snapshot_pointer(), 'r', encoding='utf-8') as file:
+            return file.read().strip()
+    except FileNotFoundError:
+        return ""
+
+
+def get_snapshot_path(env_name: str, snap_version: Optional[str] = None) -> str:
+    """
+    Function that returns path to the file of a given version of the database snapshot - version is inserted before
+    extension of the path defined by environment variable (e.g. 'geocoderpl_database.20240101_120000.db')
+
+    :param env_name: Name of the environment variable defining path to the file ('DB_PATH', 'ADDRS_PATH' or
+                     'PARQUET_PATH')
+    :param snap_version: Version of the snapshot or None (version returned by function "get_snapshot_version")
+    :return: Path to the file
+    """
+
+    c_path = os.path.join(os.environ["PARENT_PATH"], os.environ[env_name])
+    snap_version = get_snapshot_version() if snap_version is None else snap_version
+
+    if snap_version == "":
+        return c_path
+
+    c_root, c_ext = os.path.splitext(c_path)
+    return c_root + "." + snap_version + c_ext
+
+
+# Deklarujemy silnik SQL - sciezka do bazy danych ustalana jest przy otwieraniu kazdego nowego polaczenia, wiec po
+# opublikowaniu nowej kopii bazy danych wystarczy zamknac polaczenia z puli (metoda "dispose")
+SQL_ENGINE = sa.create_engine("sqlite:///" + os.path.join(os.environ["PARENT_PATH"], os.environ["DB_PATH"]),
+                              creator=lambda: sqlite3.connect(get_snapshot_path("DB_PATH"), check_same_thread=False))
+
+
+def connect_read_db(db_path: str) -> sqlite3.Connection:
+    """
+    Function that opens read-only connection to a given database file - published snapshots are never modified, so
+    they are opened in immutable mode (without file locking and checking for changes), while files of other databases
+    are only opened in read-only mode. Pragmas are set once, when the connection is added to the pool
+
+    :param db_path: Path to the database file
+    :return: Connection to the database
+    """
+
+    # Podczas budowy nowej kopii bazy danych pliki sa wciaz zapisywane, wiec otwieramy je w zwyklym trybie
+    if os.environ.get("SNAPSHOT_BUILD"):
+        return sqlite3.connect(db_path, check_same_thread=False)
+
+    db_uri = "file:" + pathname2url(os.path.abspath(db_path)) + "?mode=ro&cache=shared"
+
+    if get_snapshot_version() != "":
+        db_uri += "&immutable=1"
+
+    db_conn = sqlite3.connect(db_uri, uri=True, check_same_thread=False)
+    db_conn.execute("PRAGMA mmap_size=" + str(int(os.environ["READ_MMAP_SIZE"])))
+    db_conn.execute("PRAGMA cache_size=-" + str(int(os.environ["READ_CACHE_SIZE"])))
+    return db_conn
+
+
+def create_read_engine(db_url: str, path_func: Callable[[], str]) -> sa.engine.Engine:
+    """
+    Function that creates SQL engine used only for reading of the database - connections are opened by function
+    "connect_read_db" and are kept in the pool between queries
+
+    :param db_url: URL of the database (path to the file is resolved at opening of every new connection)
+    :param path_func: Function returning path to the database file
+    :return: SQL engine
+    """
+
+    return sa.create_engine(db_url, creator=lambda: connect_read_db(path_func()), poolclass=sa.pool.QueuePool,
+                            pool_size=int(os.environ["READ_POOL_SIZE"]), max_overflow=-1)
+
+
+# Deklarujemy silnik SQL tylko do odczytu wykorzystywany przez zapytania GUI i benchmarku
+READ_ENGINE = create_read_engine(str(SQL_ENGINE.url), lambda: get_snapshot_path("DB_PATH"))
+
+
+def get_shard_path(shard_name: str, snap_version: Optional[str] = None) -> str:
+    """
+    Function that returns path to the file of a given shard (database containing PRG points and BDOT10k buildings of a
+    single voivodeship) of a given version of the database snapshot (e.g. 'geocoderpl_database.20240101_120000_02.db')
+
+    :param shard_name: Name of the shard (TERYT code of the voivodeship)
+    :param snap_version: Version of the snapshot or None (version returned by function "get_snapshot_version")
+    :return: Path to the file
+    """
+
+    c_root, c_ext = os.path.splitext(get_snapshot_path("DB_PATH", snap_version))
+    return c_root + "_" + shard_name + c_ext
+
+
+# Deklarujemy silniki SQL baz czesciowych (shardow) utworzone w biezacym procesie (kluczem jest nazwa bazy czesciowej
+# i flaga silnika tylko do odczytu)
+SHARD_ENGINES: Dict[Tuple[str, bool], sa.engine.Engine] = {}
+
+
+def get_shard_engine(shard_name: str, read_flag: bool = False) -> sa.engine.Engine:
+    """
+    Function that returns (created only once) SQL engine of a given shard - similarly to "SQL_ENGINE" path to the file
+    of the shard is resolved at opening of every new connection
+
+    :param shard_name: Name of the shard (TERYT code of the voivodeship)
+    :param read_flag: Flag indicating if engine used only for reading of the shard is returned
+    :return: SQL engine of the shard
+    """
+
+    if (shard_name, read_flag) not in SHARD_ENGINES:
+        shard_url = "sqlite:///" + get_shard_path(shard_name, "")
+
+        if read_flag:
+            SHARD_ENGINES[shard_name, read_flag] = create_read_engine(shard_url, lambda: get_shard_path(shard_name))
+        else:
+            SHARD_ENGINES[shard_name, read_flag] = sa.create_engine(
+                shard_url, creator=lambda: sqlite3.connect(get_shard_path(shard_name), check_same_thread=False))
+
+    return SHARD_ENGINES[shard_name, read_flag]
+
+
+# Definiujemy wersje schematu bazy danych zapisywana w pliku bazy danych ('PRAGMA user_version') - wersje zwiekszamy
+# przy kazdej zmianie tablic, po ktorej bazy danych zbudowane przez poprzednie wersje projektu musza zostac zbudowane
+# od nowa (np. kody sektorow zapisywane jako liczby calkowite i kolumny zapisywane w tablicach slownikowych)
+SCHEMA_VERSION = 2
+
+# Definiujemy kolumny tablic PRG i BDOT10k, ktorych powtarzajace sie wartosci zapisywane sa w tablicach slownikowych
+# (tablice PRG i BDOT10k przechowuja jedynie indeksy tych wartosci)
+DICT_COLS = {"PRG_TABLE": ("WOJEWODZTWO", "POWIAT", "GMINA", "MIEJSCOWOSC", "ULICA", "STATUS", "ZRODLO"),
+             "BDOT10K_TABLE": ("KATEGORIA_BUDYNKU", "NAZWA_KARTOGRAFICZNA", "STAN_BUDYNKU", "FUNKCJA_BUDYNKU")}
+DICT_TABLES = {col_name: sa.Table(col_name + "_DICT", BASE.metadata,
+                                  sa.Column("DICT_ID", sa.Integer, primary_key=True),
+                                  sa.Column("DICT_VALUE", sa.String, nullable=False, unique=True))
+               for dict_cols in DICT_COLS.values() for col_name in dict_cols}
 
 
 class BDOT10K(BASE):
@@ -26,11 +182,14 @@ class BDOT10K(BASE):
 
     # Definiujemy kolumny tabeli
     bdot10k_bubd_id = sa.Column('BDOT10K_BUBD_ID', sa.Integer, primary_key=True)
-    kod_sektora = sa.Column('KOD_SEKTORA', sa.String, nullable=False, index=True)
-    kat_budynku = sa.Column('KATEGORIA_BUDYNKU', sa.String, nullable=False)
-    nazwa_kart = sa.Column('NAZWA_KARTOGRAFICZNA', sa.String, nullable=False)
-    stan_budynku = sa.Column('STAN_BUDYNKU', sa.String, nullable=False)
-    funkcja_budynku = sa.Column('FUNKCJA_BUDYNKU', sa.String, nullable=False)
+    kod_sektora = sa.Column('KOD_SEKTORA', sa.Integer, nullable=False, index=True)
+    kat_budynku = sa.Column('KATEGORIA_BUDYNKU', sa.Integer, sa.ForeignKey('KATEGORIA_BUDYNKU_DICT.DICT_ID'),
+                            nullable=False)
+    nazwa_kart = sa.Column('NAZWA_KARTOGRAFICZNA', sa.Integer, sa.ForeignKey('NAZWA_KARTOGRAFICZNA_DICT.DICT_ID'),
+                           nullable=False)
+    stan_budynku = sa.Column('STAN_BUDYNKU', sa.Integer, sa.ForeignKey('STAN_BUDYNKU_DICT.DICT_ID'), nullable=False)
+    funkcja_budynku = sa.Column('FUNKCJA_BUDYNKU', sa.Integer, sa.ForeignKey('FUNKCJA_BUDYNKU_DICT.DICT_ID'),
+                                nullable=False)
     liczba_kond = sa.Column('LICZBA_KONDYGNACJI', sa.Float, nullable=False)
     czy_zabytek = sa.Column('CZY_ZABYTEK', sa.Integer, nullable=False)
     opis_budynku = sa.Column('OPIS_BUDYNKU', sa.String, nullable=False)
@@ -42,17 +201,17 @@ class BDOT10K(BASE):
     # Definiujemy połaczenie do klasy PRG
     children = sa.orm.relationship("PRG")
 
-    def __init__(self, kod_sektora: str, kat_budynku: str, nazwa_kart: str, stan_budynku: str, funkcja_budynku: str,
+    def __init__(self, kod_sektora: int, kat_budynku: int, nazwa_kart: int, stan_budynku: int, funkcja_budynku: int,
                  liczba_kond: float, czy_zabytek: int, opis_budynku: str, powierzchnia: float, centr_lat: float,
                  centr_long: float, bubd_geojson: str) -> None:
         """
         Method that creates objects from a class "BDOT10K"
 
-        :param kod_sektora: Code of the sector in which the building is located
-        :param kat_budynku: Type of building
-        :param nazwa_kart: Cartographic name of the building
-        :param stan_budynku: Condition of the building
-        :param funkcja_budynku: Function of the building
+        :param kod_sektora: Code of the sector in which the building is located (table "SEKT_TABLE")
+        :param kat_budynku: Index of the type of building (table "KATEGORIA_BUDYNKU_DICT")
+        :param nazwa_kart: Index of the cartographic name of the building (table "NAZWA_KARTOGRAFICZNA_DICT")
+        :param stan_budynku: Index of the condition of the building (table "STAN_BUDYNKU_DICT")
+        :param funkcja_budynku: Index of the function of the building (table "FUNKCJA_BUDYNKU_DICT")
         :param liczba_kond: Number of storeys in the building
         :param czy_zabytek: Flag indicating whether a building is a historic building
         :param opis_budynku: Brief description of the building
@@ -96,50 +255,54 @@ class PRG(BASE):
 
     # Definiujemy kolumny tabeli
     prg_point_id = sa.Column('PRG_POINT_ID', sa.Integer, primary_key=True)
-    wojewodztwo = sa.Column('WOJEWODZTWO', sa.String, nullable=False)
-    powiat = sa.Column('POWIAT', sa.String, nullable=False)
-    gmina = sa.Column('GMINA', sa.String, nullable=False)
-    miejscowosc = sa.Column('MIEJSCOWOSC', sa.String, nullable=False)
+    wojewodztwo = sa.Column('WOJEWODZTWO', sa.Integer, sa.ForeignKey('WOJEWODZTWO_DICT.DICT_ID'), nullable=False)
+    powiat = sa.Column('POWIAT', sa.Integer, sa.ForeignKey('POWIAT_DICT.DICT_ID'), nullable=False, index=True)
+    gmina = sa.Column('GMINA', sa.Integer, sa.ForeignKey('GMINA_DICT.DICT_ID'), nullable=False, index=True)
+    miejscowosc = sa.Column('MIEJSCOWOSC', sa.Integer, sa.ForeignKey('MIEJSCOWOSC_DICT.DICT_ID'), nullable=False,
+                            index=True)
     miejscowosc2 = sa.Column('MIEJSCOWOSC2', sa.String, nullable=False)
-    ulica = sa.Column('ULICA', sa.String, nullable=False)
+    ulica = sa.Column('ULICA', sa.Integer, sa.ForeignKey('ULICA_DICT.DICT_ID'), nullable=False)
     numer = sa.Column('NUMER', sa.String, nullable=False)
     kod_pocztowy = sa.Column('KOD_POCZTOWY', sa.String, nullable=False)
-    status = sa.Column('STATUS', sa.String, nullable=False)
+    status = sa.Column('STATUS', sa.Integer, sa.ForeignKey('STATUS_DICT.DICT_ID'), nullable=False)
     szerokosc = sa.Column('SZEROKOSC', sa.Float, nullable=False)
     dlugosc = sa.Column('DLUGOSC', sa.Float, nullable=False)
-    zrodlo = sa.Column('ZRODLO', sa.String, nullable=False)
+    zrodlo = sa.Column('ZRODLO', sa.Integer, sa.ForeignKey('ZRODLO_DICT.DICT_ID'), nullable=False)
     czy_poprawny = sa.Column('CZY_POPRAWNY', sa.Integer, nullable=False)
     odleglosc_od_gminy = sa.Column('ODLEGLOSC_OD_GMINY', sa.Float, nullable=False)
     bdot10_bubd_id = sa.Column('BDOT10K_BUBD_ID', sa.Integer, sa.ForeignKey('BDOT10K_TABLE.BDOT10K_BUBD_ID'),
-                               nullable=False)
+                               nullable=False, index=True)
     odleglosc_od_budynku = sa.Column('ODLEGLOSC_OD_BUDYNKU', sa.Float, nullable=False)
-    kod_sektora = sa.Column('KOD_SEKTORA', sa.String, nullable=False, index=True)
+    kod_sektora = sa.Column('KOD_SEKTORA', sa.Integer, nullable=False, index=True)
     dodatkowy_opis = sa.Column('DODATKOWY_OPIS', sa.String, nullable=False)
 
-    def __init__(self, wojewodztwo: str, powiat: str, gmina: str, miejscowosc: str, miejscowosc2: str, ulica: str,
-                 numer: str, kod_pocztowy: str, status: str, szerokosc: float, dlugosc: float, zrodlo: str,
+    def __init__(self, wojewodztwo: int, powiat: int, gmina: int, miejscowosc: int, miejscowosc2: str, ulica: int,
+                 numer: str, kod_pocztowy: str, status: int, szerokosc: float, dlugosc: float, zrodlo: int,
                  czy_poprawny: int, odleglosc_od_gminy: float, bdot10_bubd_id: int, odleglosc_od_budynku: float,
-                 kod_sektora: str, dodatkowy_opis: str) -> None:
+                 kod_sektora: int, dodatkowy_opis: str) -> None:
         """
         Method that creates objects from a class "PRG"
 
-        :param wojewodztwo: Name of the province in which the address point is located
-        :param powiat: Name of the county in which the address point is located
-        :param gmina: Name of the municipality in which the address point is located
-        :param miejscowosc: Name of the town in which the address point is located
+        :param wojewodztwo: Index of the name of the province in which the address point is located (table
+                            "WOJEWODZTWO_DICT")
+        :param powiat: Index of the name of the county in which the address point is located (table "POWIAT_DICT")
+        :param gmina: Index of the name of the municipality in which the address point is located (table "GMINA_DICT")
+        :param miejscowosc: Index of the name of the town in which the address point is located (table
+                            "MIEJSCOWOSC_DICT")
         :param miejscowosc2: Additional name of the town where the address point is located
-        :param ulica: Name of the street in which the address point is located
+        :param ulica: Index of the name of the street in which the address point is located (table "ULICA_DICT")
         :param numer: Number of the building in which the address point is located
         :param kod_pocztowy: Postcode where the address point is located
-        :param status: Status of a given address point
+        :param status: Index of the status of a given address point (table "STATUS_DICT")
         :param szerokosc: Longitude of a given address point
         :param dlugosc: Latitude of a given address point
-        :param zrodlo: Source of data from which information on a given address point is derived
+        :param zrodlo: Index of the source of data from which information on a given address point is derived (table
+                       "ZRODLO_DICT")
         :param czy_poprawny: Flag indicating whether an address point is correct
         :param odleglosc_od_gminy: The distance of a given point from the contour of its municipality (in meters)
         :param bdot10_bubd_id: D of the nearest building in the BDOT10k database
         :param odleglosc_od_budynku: Distance of a given address point from the nearest building
-        :param kod_sektora: Code of the sector in which given point is located
+        :param kod_sektora: Code of the sector in which given point is located (table "SEKT_TABLE")
         :param dodatkowy_opis: Additional description of the address point
         :return: The method does not return any values
         """
@@ -242,7 +405,7 @@ class TerytCodes(BASE):
 
 
 class RegJSON(BASE):
-    """ Class that defines regional JSON files """
+    """ Class that defines shapes of regions """
 
     # Defniujemy nazwę tabeli
     __tablename__ = 'JSON_TABLE'
@@ -250,22 +413,35 @@ class RegJSON(BASE):
     # Definiujemy kolumny tabeli
     json_id = sa.Column('JSON_ID', sa.Integer, primary_key=True)
     json_name = sa.Column('JSON_NAME', sa.String, primary_key=False)
-    json_teryt = sa.Column('JSON_TERYT', sa.String, primary_key=False)
-    json_shape = sa.Column('JSON_SHAPE', sa.Text, primary_key=False)
-
-    def __init__(self, json_name: str, json_teryt: str, json_shape: str) -> None:
+    json_teryt = sa.Column('JSON_TERYT', sa.String, primary_key=False, unique=True)
+    json_wkb = sa.Column('JSON_WKB', sa.LargeBinary, primary_key=False)
+    min_long = sa.Column('MIN_LONG', sa.Float, primary_key=False)
+    max_long = sa.Column('MAX_LONG', sa.Float, primary_key=False)
+    min_lat = sa.Column('MIN_LAT', sa.Float, primary_key=False)
+    max_lat = sa.Column('MAX_LAT', sa.Float, primary_key=False)
+
+    def __init__(self, json_name: str, json_teryt: str, json_wkb: bytes, min_long: float, max_long: float,
+                 min_lat: float, max_lat: float) -> None:
         """
         Method that creates objects from a class "RegJSON"
 
-        :param json_name: Name of the reginal JSON file
-        :param json_teryt: TERYT code of the reginal JSON file
-        :param json_shape: JSON shape of region
+        :param json_name: Name of the region
+        :param json_teryt: TERYT code of the region
+        :param json_wkb: Shape of the region (exterior rings of its polygons) as WKB multipolygon
+        :param min_long: Minimum longitude of the bounding box of the region
+        :param max_long: Maximum longitude of the bounding box of the region
+        :param min_lat: Minimum latitude of the bounding box of the region
+        :param max_lat: Maximum latitude of the bounding box of the region
         :return: The method does not return any values
         """
 
         self.json_name = json_name
         self.json_teryt = json_teryt
-        self.json_shape = json_shape
+        self.json_wkb = json_wkb
+        self.min_long = min_long
+        self.max_long = max_long
+        self.min_lat = min_lat
+        self.max_lat = max_lat
 
     def __repr__(self) -> str:
         """
@@ -274,4 +450,151 @@ class RegJSON(BASE):
         :return: String that represents objects of the class "RegJSON"
         """
 
-        return "<RegJSON('%s', '%s', '%s')>" % (self.json_name, self.json_teryt, self.json_shape)
+        return "<RegJSON('%s', '%s', '%s', '%s', '%s', '%s', '%s')>" % \
+               (self.json_name, self.json_teryt, self.json_wkb, self.min_long, self.max_long, self.min_lat,
+                self.max_lat)
+
+
+class SektTree(BASE):
+    """ Class that defines sectors - leaves of the quadtree built on the grid of SEKT_NUM x SEKT_NUM cells """
+
+    # Defniujemy nazwę tabeli
+    __tablename__ = 'SEKT_TABLE'
+
+    # Definiujemy kolumny tabeli
+    kod_sektora = sa.Column('KOD_SEKTORA', sa.Integer, primary_key=True, autoincrement=False)
+    min_wiersz = sa.Column('MIN_WIERSZ', sa.Integer, nullable=False)
+    max_wiersz = sa.Column('MAX_WIERSZ', sa.Integer, nullable=False)
+    min_kolumna = sa.Column('MIN_KOLUMNA', sa.Integer, nullable=False)
+    max_kolumna = sa.Column('MAX_KOLUMNA', sa.Integer, nullable=False)
+
+    def __init__(self, kod_sektora: int, min_wiersz: int, max_wiersz: int, min_kolumna: int, max_kolumna: int) -> None:
+        """
+        Method that creates objects from a class "SektTree"
+
+        :param kod_sektora: Code of the sector (position of the leaf in the quadtree traversed in Z-order)
+        :param min_wiersz: First row of cells of the sector
+        :param max_wiersz: Row of cells following the last row of the sector
+        :param min_kolumna: First column of cells of the sector
+        :param max_kolumna: Column of cells following the last column of the sector
+        :return: The method does not return any values
+        """
+
+        self.kod_sektora = kod_sektora
+        self.min_wiersz = min_wiersz
+        self.max_wiersz = max_wiersz
+        self.min_kolumna = min_kolumna
+        self.max_kolumna = max_kolumna
+
+    def __repr__(self) -> str:
+        """
+        Method that represents an objects in a class "SektTree" as a string
+
+        :return: String that represents objects of the class "SektTree"
+        """
+
+        return "<SektTree('%s', '%s', '%s', '%s', '%s')>" % \
+               (self.kod_sektora, self.min_wiersz, self.max_wiersz, self.min_kolumna, self.max_kolumna)
+
+
+class ShardInfo(BASE):
+    """ Class that defines shards - databases containing PRG points and BDOT10k buildings of single voivodeships """
+
+    # Defniujemy nazwę tabeli
+    __tablename__ = 'SHARD_TABLE'
+
+    # Definiujemy kolumny tabeli
+    shard_id = sa.Column('SHARD_ID', sa.Integer, primary_key=True, autoincrement=False)
+    shard_name = sa.Column('SHARD_NAME', sa.String, nullable=False, unique=True)
+    min_long = sa.Column('MIN_LONG', sa.Float, nullable=True)
+    max_long = sa.Column('MAX_LONG', sa.Float, nullable=True)
+    min_lat = sa.Column('MIN_LAT', sa.Float, nullable=True)
+    max_lat = sa.Column('MAX_LAT', sa.Float, nullable=True)
+
+    def __init__(self, shard_id: int, shard_name: str, min_long: Optional[float] = None,
+                 max_long: Optional[float] = None, min_lat: Optional[float] = None,
+                 max_lat: Optional[float] = None) -> None:
+        """
+        Method that creates objects from a class "ShardInfo"
+
+        :param shard_id: Index of the shard (indices of rows of the shard start from shard_id * SHARD_ID_STEP)
+        :param shard_name: Name of the shard (TERYT code of the voivodeship)
+        :param min_long: Minimum longitude of the bounding box of PRG points and BDOT10k buildings of the shard
+        :param max_long: Maximum longitude of the bounding box of PRG points and BDOT10k buildings of the shard
+        :param min_lat: Minimum latitude of the bounding box of PRG points and BDOT10k buildings of the shard
+        :param max_lat: Maximum latitude of the bounding box of PRG points and BDOT10k buildings of the shard
+        :return: The method does not return any values
+        """
+
+        self.shard_id = shard_id
+        self.shard_name = shard_name
+        self.min_long = min_long
+        self.max_long = max_long
+        self.min_lat = min_lat
+        self.max_lat = max_lat
+
+    def __repr__(self) -> str:
+        """
+        Method that represents an objects in a class "ShardInfo" as a string
+
+        :return: String that represents objects of the class "ShardInfo"
+        """
+
+        return "<ShardInfo('%s', '%s', '%s', '%s', '%s', '%s')>" % \
+               (self.shard_id, self.shard_name, self.min_long, self.max_long, self.min_lat, self.max_lat)
+
+
+class ShardSekt(BASE):
+    """ Class that defines sectors containing PRG points or BDOT10k buildings of given shards """
+
+    # Defniujemy nazwę tabeli
+    __tablename__ = 'SHARD_SEKT_TABLE'
+
+    # Definiujemy kolumny tabeli
+    kod_sektora = sa.Column('KOD_SEKTORA', sa.Integer, primary_key=True, autoincrement=False)
+    shard_id = sa.Column('SHARD_ID', sa.Integer, primary_key=True, autoincrement=False)
+
+    def __init__(self, kod_sektora: int, shard_id: int) -> None:
+        """
+        Method that creates objects from a class "ShardSekt"
+
+        :param kod_sektora: Code of the sector
+        :param shard_id: Index of the shard
+        :return: The method does not return any values
+        """
+
+        self.kod_sektora = kod_sektora
+        self.shard_id = shard_id
+
+    def __repr__(self) -> str:
+        """
+        Method that represents an objects in a class "ShardSekt" as a string
+
+        :return: String that represents objects of the class "ShardSekt"
+        """
+
+        return "<ShardSekt('%s', '%s')>" % (self.kod_sektora, self.shard_id)
+
+
+# Definiujemy tablice zapisywane w kazdej bazie czesciowej (pozostale tablice zapisywane sa tylko w glownej bazie)
+SHARD_TABLES = [BDOT10K.__table__, PRG.__table__, UniqPhrs.__table__, *DICT_TABLES.values()]
+
+# Definiujemy wirtualne tablice R*Tree przechowujace prostokaty ograniczajace budynkow BDOT10k oraz punkty adresowe PRG
+# (tablice te nie naleza do schematu 'BASE', bo tworzone sa poleceniem 'CREATE VIRTUAL TABLE')
+RTREE_META = sa.MetaData()
+BDOT10K_RTREE = sa.Table("BDOT10K_RTREE", RTREE_META, sa.Column("ID", sa.Integer, primary_key=True),
+                         sa.Column("MIN_LONG", sa.Float), sa.Column("MAX_LONG", sa.Float),
+                         sa.Column("MIN_LAT", sa.Float), sa.Column("MAX_LAT", sa.Float))
+PRG_RTREE = sa.Table("PRG_RTREE", RTREE_META, sa.Column("ID", sa.Integer, primary_key=True),
+                     sa.Column("MIN_LONG", sa.Float), sa.Column("MAX_LONG", sa.Float),
+                     sa.Column("MIN_LAT", sa.Float), sa.Column("MAX_LAT", sa.Float))
+
+# Definiujemy widoki tablic PRG i BDOT10k, w ktorych indeksy z tablic slownikowych zastapione sa wartosciami z tych
+# tablic - widoki maja takie same nazwy kolumn jak tablice PRG i BDOT10k (widoki tworzone sa poleceniem 'CREATE VIEW')
+VIEW_META = sa.MetaData()
+PRG_VIEW = sa.Table("PRG_VIEW", VIEW_META, *[sa.Column(c_col.name, sa.String if c_col.name in DICT_TABLES else
+                                                       c_col.type, primary_key=c_col.primary_key)
+                                             for c_col in PRG.__table__.columns])
+BDOT10K_VIEW = sa.Table("BDOT10K_VIEW", VIEW_META, *[sa.Column(c_col.name, sa.String if c_col.name in DICT_TABLES
+                                                               else c_col.type, primary_key=c_col.primary_key)
+                                                     for c_col in BDOT10K.__table__.columns])
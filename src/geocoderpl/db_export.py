@@ -0,0 +1,198 @@
+""" Module that exports database of the GeocoderPL project to columnar Parquet snapshot and loads this snapshot """
+
+import shutil
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from pyarrow import fs
+from typing import Any, Iterator, Optional, Sequence
+
+from db_classes import BDOT10K_VIEW, PRG_VIEW, get_snapshot_path
+from db_queries import decode_bubd_ids, get_data_engines
+from geo_utilities import *
+
+# Definiujemy widoki eksportowanych tablic, ich schematy, kolumny wspolrzednych oraz kolumny, wedlug ktorych dzielone
+# sa pliki
+SNAPSHOT_META = {
+    "prg": (PRG_VIEW, pa.schema([
+        ("PRG_POINT_ID", pa.int64()), ("WOJEWODZTWO", pa.string()), ("POWIAT", pa.string()), ("GMINA", pa.string()),
+        ("MIEJSCOWOSC", pa.string()), ("MIEJSCOWOSC2", pa.string()), ("ULICA", pa.string()), ("NUMER", pa.string()),
+        ("KOD_POCZTOWY", pa.string()), ("STATUS", pa.string()), ("SZEROKOSC", pa.float64()),
+        ("DLUGOSC", pa.float64()), ("ZRODLO", pa.string()), ("CZY_POPRAWNY", pa.int8()),
+        ("ODLEGLOSC_OD_GMINY", pa.float64()), ("BDOT10K_BUBD_ID", pa.int64()), ("ODLEGLOSC_OD_BUDYNKU", pa.float64()),
+        ("KOD_SEKTORA", pa.int32()), ("DODATKOWY_OPIS", pa.string()), ("KOD_BLOKU", pa.int32())]),
+            ("SZEROKOSC", "DLUGOSC"), ("WOJEWODZTWO", "KOD_BLOKU")),
+    "bdot10k": (BDOT10K_VIEW, pa.schema([
+        ("BDOT10K_BUBD_ID", pa.int64()), ("KOD_SEKTORA", pa.int32()), ("KATEGORIA_BUDYNKU", pa.string()),
+        ("NAZWA_KARTOGRAFICZNA", pa.string()), ("STAN_BUDYNKU", pa.string()), ("FUNKCJA_BUDYNKU", pa.string()),
+        ("LICZBA_KONDYGNACJI", pa.float64()), ("CZY_ZABYTEK", pa.int8()), ("OPIS_BUDYNKU", pa.string()),
+        ("POWIERZCHNIA", pa.float64()), ("CENTROID_LAT", pa.float64()), ("CENTROID_LONG", pa.float64()),
+        ("BUBD_GEOJSON", pa.string()), ("KOD_BLOKU", pa.int32())]),
+                ("CENTROID_LAT", "CENTROID_LONG"), ("KOD_BLOKU",))}
+
+
+def get_block_codes(sekt_codes: np.ndarray) -> np.ndarray:
+    """
+    Function that returns codes of blocks of sectors (ranges of PARQUET_BLOCK consecutive codes of sectors) for given
+    codes of sectors - codes of sectors follow Z-order curve, so every block covers compact area. Blocks of sectors are
+    used for partitioning of Parquet files
+
+    :param sekt_codes: Numpy array containing codes of sectors
+    :return: Numpy array containing codes of blocks of sectors
+    """
+
+    return np.asarray(sekt_codes, dtype=np.int64) // int(os.environ["PARQUET_BLOCK"])
+
+
+def get_snapshot_batches(snap_name: str) -> Iterator[pa.RecordBatch]:
+    """
+    Generator that reads table from database in chunks and converts these chunks to Arrow record batches
+
+    :param snap_name: Name of the exported table ("prg" or "bdot10k")
+    :return: Generator of Arrow record batches
+    """
+
+    db_table, snap_schema, _, part_cols = SNAPSHOT_META[snap_name]
+
+    # Jesli baza danych podzielona jest na bazy czesciowe (shardy), to odczytujemy kolejno wszystkie bazy czesciowe
+    for db_engine in get_data_engines():
+        with db_engine.connect() as db_conn:
+            for c_chunk in pd.read_sql(sa.select(db_table), db_conn, chunksize=int(os.environ['DB_SAVE_FREQ'])):
+                if snap_name == "prg":
+                    c_chunk["BDOT10K_BUBD_ID"] = decode_bubd_ids(c_chunk["BDOT10K_BUBD_ID"])
+
+                # Sortujemy wiersze wedlug sektorow, zeby statystyki grup wierszy pozwalaly pomijac niepotrzebne
+                # sektory
+                c_chunk["KOD_BLOKU"] = get_block_codes(c_chunk["KOD_SEKTORA"].to_numpy())
+                c_chunk = c_chunk.sort_values(list(part_cols) + ["KOD_SEKTORA"], kind="stable")
+                yield pa.RecordBatch.from_pandas(c_chunk, schema=snap_schema, preserve_index=False)
+
+
+@time_decorator
+def export_snapshot(snap_path: str) -> None:
+    """
+    Function that exports PRG and BDOT10k tables to Parquet files partitioned by voivodeships (PRG only) and blocks of
+    sectors - every table is saved in a separate subdirectory of the snapshot directory
+
+    :param snap_path: Path to the snapshot directory
+    :return: The method does not return any values
+    """
+
+    # Usuwamy caly katalog poprzedniego eksportu - nadpisywane sa tylko zapisywane ponownie partycje, wiec partycje
+    # sektorow, ktorych nie ma w nowej kopii bazy danych, zostalyby w katalogu
+    shutil.rmtree(snap_path, ignore_errors=True)
+    group_rows = int(os.environ["PARQUET_GROUP_ROWS"])
+
+    for snap_name, (_, snap_schema, _, part_cols) in SNAPSHOT_META.items():
+        part_schema = pa.schema([snap_schema.field(col) for col in part_cols])
+        ds.write_dataset(get_snapshot_batches(snap_name), os.path.join(snap_path, snap_name), schema=snap_schema,
+                         format="parquet", partitioning=ds.partitioning(part_schema, flavor="hive"),
+                         basename_template="part-{i}.parquet", existing_data_behavior="error",
+                         min_rows_per_group=min(group_rows, 1024), max_rows_per_group=group_rows)
+
+
+def open_snapshot(snap_path: str, snap_name: str) -> ds.Dataset:
+    """
+    Function that opens Parquet snapshot of a given table - files are memory-mapped and read only when they are scanned
+
+    :param snap_path: Path to the snapshot directory
+    :param snap_name: Name of the table ("prg" or "bdot10k")
+    :return: Arrow dataset
+    """
+
+    snap_schema = SNAPSHOT_META[snap_name][1]
+    return ds.dataset(os.path.join(snap_path, snap_name), schema=snap_schema, format="parquet",
+                      partitioning="hive", filesystem=fs.LocalFileSystem(use_mmap=True))
+
+
+def get_snapshot_filter(snap_name: str, woj_names: Optional[Sequence[str]] = None,
+                        sekt_codes: Optional[Sequence[int]] = None,
+                        bbox: Optional[Tuple[float, float, float, float]] = None) -> Optional[ds.Expression]:
+    """
+    Function that creates predicate of snapshot scan - conditions on partitioning columns allow skipping whole files
+    and conditions on other columns allow skipping row groups on the basis of their statistics
+
+    :param snap_name: Name of the table ("prg" or "bdot10k")
+    :param woj_names: Names of voivodeships (PRG only) or None
+    :param sekt_codes: Codes of sectors or None
+    :param bbox: Minimum latitude, minimum longitude, maximum latitude and maximum longitude of bounding box or None
+    :return: Arrow expression or None if there are no conditions
+    """
+
+    lat_col, long_col = SNAPSHOT_META[snap_name][2]
+    filt_list = []
+
+    if woj_names is not None:
+        filt_list.append(pc.field("WOJEWODZTWO").isin(list(woj_names)))
+
+    if sekt_codes is not None:
+        sekt_codes = np.unique(np.asarray(sekt_codes, dtype=np.int64))
+        filt_list.append(pc.field("KOD_BLOKU").isin(np.unique(get_block_codes(sekt_codes)).tolist()))
+        filt_list.append(pc.field("KOD_SEKTORA").isin(sekt_codes.tolist()))
+
+    if bbox is not None:
+        min_lat, min_long, max_lat, max_long = bbox
+        bbox_sekts = get_sectors_tree().get_bbox_sectors(min_lat, min_long, max_lat, max_long)
+        filt_list.append(pc.field("KOD_BLOKU").isin(np.unique(get_block_codes(bbox_sekts)).tolist()))
+        filt_list.append((pc.field(lat_col) >= min_lat) & (pc.field(lat_col) <= max_lat) &
+                         (pc.field(long_col) >= min_long) & (pc.field(long_col) <= max_long))
+
+    return functools.reduce(lambda x, y: x & y, filt_list) if filt_list else None
+
+
+def load_snapshot(snap_path: str, snap_name: str, columns: Optional[List[str]] = None,
+                  woj_names: Optional[Sequence[str]] = None, sekt_codes: Optional[Sequence[int]] = None,
+                  bbox: Optional[Tuple[float, float, float, float]] = None) -> pa.Table:
+    """
+    Function that reads selected columns and rows of Parquet snapshot of a given table
+
+    :param snap_path: Path to the snapshot directory
+    :param snap_name: Name of the table ("prg" or "bdot10k")
+    :param columns: Names of read columns or None (all columns)
+    :param woj_names: Names of voivodeships (PRG only) or None
+    :param sekt_codes: Codes of sectors or None
+    :param bbox: Minimum latitude, minimum longitude, maximum latitude and maximum longitude of bounding box or None
+    :return: Arrow table
+    """
+
+    return open_snapshot(snap_path, snap_name).to_table(columns=columns, filter=get_snapshot_filter(
+        snap_name, woj_names, sekt_codes, bbox))
+
+
+def load_linked_snapshot(snap_path: str, prg_columns: Optional[List[str]] = None,
+                         bubd_columns: Optional[List[str]] = None, woj_names: Optional[Sequence[str]] = None,
+                         sekt_codes: Optional[Sequence[int]] = None,
+                         bbox: Optional[Tuple[float, float, float, float]] = None) -> pa.Table:
+    """
+    Function that reads PRG points from Parquet snapshot along with BDOT10k buildings assigned to them
+
+    :param snap_path: Path to the snapshot directory
+    :param prg_columns: Names of read columns of PRG table or None (all columns)
+    :param bubd_columns: Names of read columns of BDOT10k table or None (all columns)
+    :param woj_names: Names of voivodeships or None
+    :param sekt_codes: Codes of sectors of PRG points or None
+    :param bbox: Bounding box of PRG points (minimum latitude, minimum longitude, maximum latitude, maximum longitude)
+                 or None
+    :return: Arrow table
+    """
+
+    if prg_columns is not None and "BDOT10K_BUBD_ID" not in prg_columns:
+        prg_columns = prg_columns + ["BDOT10K_BUBD_ID"]
+
+    prg_tab = load_snapshot(snap_path, "prg", prg_columns, woj_names, sekt_codes, bbox)
+    bubd_ids = pc.unique(prg_tab["BDOT10K_BUBD_ID"])
+
+    # Wczytujemy tylko budynki przypisane do wybranych punktow PRG (kolumny wspolne dla obu tablic pomijamy)
+    bubd_cols = [col for col in (bubd_columns or SNAPSHOT_META["bdot10k"][1].names)
+                 if col == "BDOT10K_BUBD_ID" or col not in prg_tab.column_names]
+    bubd_cols = bubd_cols if "BDOT10K_BUBD_ID" in bubd_cols else ["BDOT10K_BUBD_ID"] + bubd_cols
+    bubd_tab = open_snapshot(snap_path, "bdot10k").to_table(columns=bubd_cols,
+                                                            filter=pc.field("BDOT10K_BUBD_ID").isin(bubd_ids))
+    return prg_tab.join(bubd_tab, keys="BDOT10K_BUBD_ID", join_type="left outer")
+
+
+if __name__ == "__main__":
+    # Eksportujemy opublikowana kopie bazy danych do plikow Parquet
+    create_logger('root')
+    export_snapshot(get_snapshot_path("PARQUET_PATH"))
@@ -0,0 +1,725 @@
+""" Module that defines data access functions based on cached SQL statements in the GeocoderPL project """
+
+import os
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from db_classes import BDOT10K, BDOT10K_RTREE, BDOT10K_VIEW, DICT_COLS, DICT_TABLES, PRG, PRG_RTREE, PRG_VIEW, \
+    READ_ENGINE, SCHEMA_VERSION, SQL_ENGINE, ShardInfo, ShardSekt, get_shard_engine
+
+# Definiujemy kolumny pobierane w poszczegolnych zapytaniach oraz kolumny, po ktorych te zapytania sa filtrowane
+QUERY_COLS = {
+    "prg_info": ((PRG_VIEW.c.MIEJSCOWOSC, PRG_VIEW.c.ULICA, PRG_VIEW.c.NUMER, PRG_VIEW.c.KOD_POCZTOWY, PRG_VIEW.c.GMINA,
+                  PRG_VIEW.c.POWIAT, PRG_VIEW.c.WOJEWODZTWO, PRG_VIEW.c.DODATKOWY_OPIS, PRG_VIEW.c.SZEROKOSC,
+                  PRG_VIEW.c.DLUGOSC, PRG_VIEW.c.BDOT10K_BUBD_ID), PRG_VIEW.c.PRG_POINT_ID),
+    "bdot10k_info": ((BDOT10K_VIEW.c.KATEGORIA_BUDYNKU, BDOT10K_VIEW.c.NAZWA_KARTOGRAFICZNA,
+                      BDOT10K_VIEW.c.STAN_BUDYNKU, BDOT10K_VIEW.c.FUNKCJA_BUDYNKU, BDOT10K_VIEW.c.LICZBA_KONDYGNACJI,
+                      BDOT10K_VIEW.c.CZY_ZABYTEK, BDOT10K_VIEW.c.POWIERZCHNIA, BDOT10K_VIEW.c.OPIS_BUDYNKU,
+                      BDOT10K_VIEW.c.BUBD_GEOJSON), BDOT10K_VIEW.c.BDOT10K_BUBD_ID),
+    "bdot10k_sekts": ((BDOT10K.bdot10k_bubd_id, BDOT10K.opis_budynku, BDOT10K.bubd_geojson, BDOT10K.centr_long,
+                       BDOT10K.centr_lat, BDOT10K.kod_sektora), BDOT10K.kod_sektora),
+    "bdot10k_prg": ((PRG_VIEW.c.BDOT10K_BUBD_ID, PRG_VIEW.c.PRG_POINT_ID, PRG_VIEW.c.MIEJSCOWOSC, PRG_VIEW.c.ULICA,
+                     PRG_VIEW.c.NUMER, PRG_VIEW.c.KOD_POCZTOWY, PRG_VIEW.c.SZEROKOSC, PRG_VIEW.c.DLUGOSC,
+                     PRG_VIEW.c.ODLEGLOSC_OD_BUDYNKU), PRG_VIEW.c.BDOT10K_BUBD_ID),
+    "prg_bdot10k": ((PRG.prg_point_id, PRG.bdot10_bubd_id), PRG.prg_point_id),
+    "prg_labels": ((PRG_VIEW.c.PRG_POINT_ID, PRG_VIEW.c.MIEJSCOWOSC, PRG_VIEW.c.ULICA, PRG_VIEW.c.NUMER,
+                    PRG_VIEW.c.KOD_POCZTOWY, PRG_VIEW.c.GMINA, PRG_VIEW.c.POWIAT, PRG_VIEW.c.WOJEWODZTWO,
+                    PRG_VIEW.c.DODATKOWY_OPIS, PRG_VIEW.c.SZEROKOSC, PRG_VIEW.c.DLUGOSC, PRG_VIEW.c.BDOT10K_BUBD_ID),
+                   PRG_VIEW.c.PRG_POINT_ID),
+    "bdot10k_popups": ((BDOT10K_VIEW.c.BDOT10K_BUBD_ID, BDOT10K_VIEW.c.KATEGORIA_BUDYNKU,
+                        BDOT10K_VIEW.c.NAZWA_KARTOGRAFICZNA, BDOT10K_VIEW.c.STAN_BUDYNKU,
+                        BDOT10K_VIEW.c.FUNKCJA_BUDYNKU, BDOT10K_VIEW.c.LICZBA_KONDYGNACJI, BDOT10K_VIEW.c.CZY_ZABYTEK,
+                        BDOT10K_VIEW.c.POWIERZCHNIA, BDOT10K_VIEW.c.OPIS_BUDYNKU, BDOT10K_VIEW.c.BUBD_GEOJSON),
+                       BDOT10K_VIEW.c.BDOT10K_BUBD_ID),
+    "prg_gmina": ((PRG_VIEW.c.PRG_POINT_ID, PRG_VIEW.c.SZEROKOSC, PRG_VIEW.c.DLUGOSC, PRG_VIEW.c.POWIAT,
+                   PRG_VIEW.c.WOJEWODZTWO), PRG_VIEW.c.GMINA)}
+
+# Definiujemy sposob wyboru baz czesciowych (shardow), do ktorych wysylane sa poszczegolne zapytania - wedlug indeksow
+# wierszy (kazda baza czesciowa ma wlasny przedzial indeksow), wedlug kodow sektorow lub do wszystkich baz czesciowych
+# (punkty adresowe przy granicy wojewodztwa moga byc przypisane do budynkow z bazy czesciowej sasiedniego wojewodztwa)
+QUERY_ROUTES = {"prg_info": "id", "bdot10k_info": "id", "bdot10k_sekts": "sekt", "bdot10k_prg": "all",
+                "prg_bdot10k": "id", "prg_labels": "id", "bdot10k_popups": "id", "prg_gmina": "all"}
+
+# Definiujemy kolumny pobierane w zapytaniach przestrzennych oraz tablice R*Tree, przez ktore te zapytania sa filtrowane
+BBOX_COLS = {
+    "prg_bbox": ((PRG.prg_point_id, PRG.szerokosc, PRG.dlugosc), PRG.prg_point_id, PRG_RTREE),
+    "bdot10k_bbox": ((BDOT10K.bdot10k_bubd_id, BDOT10K.opis_budynku, BDOT10K.bubd_geojson, BDOT10K.centr_long,
+                      BDOT10K.centr_lat, BDOT10K.kod_sektora), BDOT10K.bdot10k_bubd_id, BDOT10K_RTREE)}
+
+# Definiujemy polecenia synchronizujace tablice R*Tree z tablicami PRG i BDOT10k - dopisywane sa tylko wiersze o
+# indeksach wiekszych od najwiekszego indeksu zapisanego w tablicy R*Tree (odczytywanego z tablicy pomocniczej
+# '<nazwa>_rowid', ktora SQLite tworzy dla kazdej tablicy R*Tree). Prostokaty ograniczajace budynkow wyliczane sa z
+# zewnetrznego pierscienia wielokata zapisanego w GeoJSON
+RTREE_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS PRG_RTREE USING rtree(ID, MIN_LONG, MAX_LONG, MIN_LAT, MAX_LAT)",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS BDOT10K_RTREE USING rtree(ID, MIN_LONG, MAX_LONG, MIN_LAT, MAX_LAT)",
+    "INSERT INTO PRG_RTREE SELECT PRG_POINT_ID, DLUGOSC, DLUGOSC, SZEROKOSC, SZEROKOSC FROM PRG_TABLE WHERE " +
+    "PRG_POINT_ID > (SELECT IFNULL(MAX(rowid), 0) FROM PRG_RTREE_rowid)",
+    "INSERT INTO BDOT10K_RTREE SELECT BDOT10K_BUBD_ID, MIN(json_extract(c_pt.value, '$[0]')), " +
+    "MAX(json_extract(c_pt.value, '$[0]')), MIN(json_extract(c_pt.value, '$[1]')), " +
+    "MAX(json_extract(c_pt.value, '$[1]')) FROM BDOT10K_TABLE, json_each(BUBD_GEOJSON, '$.coordinates[0]') AS c_pt " +
+    "WHERE BDOT10K_BUBD_ID > (SELECT IFNULL(MAX(rowid), 0) FROM BDOT10K_RTREE_rowid) GROUP BY BDOT10K_BUBD_ID")
+
+# Definiujemy widoki laczace tablice PRG i BDOT10k z ich tablicami slownikowymi
+VIEW_TABLES = ((PRG_VIEW, PRG.__table__), (BDOT10K_VIEW, BDOT10K.__table__))
+
+# Definiujemy przyblizona dlugosc jednego stopnia szerokosci geograficznej (w metrach)
+EARTH_DEG = 111320.0
+
+# Definiujemy tymczasowe tablice przechowujace duze zbiory wartosci filtrow
+TEMP_META = sa.MetaData()
+TEMP_INT_TABLE = sa.Table("TEMP_INT_VALS", TEMP_META, sa.Column("VAL", sa.Integer, primary_key=True),
+                          prefixes=["TEMPORARY"])
+TEMP_STR_TABLE = sa.Table("TEMP_STR_VALS", TEMP_META, sa.Column("VAL", sa.String, primary_key=True),
+                          prefixes=["TEMPORARY"])
+
+
+def get_temp_table(stmt_name: str) -> sa.Table:
+    """
+    Function that returns temporary table matching type of the column filtering given query
+
+    :param stmt_name: Name of the query
+    :return: Temporary table storing values of filter
+    """
+
+    return TEMP_INT_TABLE if isinstance(QUERY_COLS[stmt_name][1].type, sa.Integer) else TEMP_STR_TABLE
+
+
+@lru_cache(maxsize=None)
+def get_in_stmt(stmt_name: str, temp_flag: bool) -> sa.sql.Select:
+    """
+    Function that creates (only once) SQL statement selecting rows with values of filtering column belonging to the
+    given set - set of values is bound as an expanding parameter "in_vals" or joined from temporary table
+
+    :param stmt_name: Name of the query
+    :param temp_flag: Flag indicating if values of filter should be joined from temporary table
+    :return: SQL statement
+    """
+
+    sel_cols, filt_col = QUERY_COLS[stmt_name]
+
+    if temp_flag:
+        temp_table = get_temp_table(stmt_name)
+        return sa.select(*sel_cols).join(temp_table, filt_col == temp_table.c.VAL)
+
+    return sa.select(*sel_cols).where(filt_col.in_(sa.bindparam("in_vals", expanding=True)))
+
+
+@lru_cache(maxsize=None)
+def get_bbox_stmt(stmt_name: str) -> sa.sql.Select:
+    """
+    Function that creates (only once) SQL statement selecting rows with bounding boxes intersecting given bounding box
+    (parameters "min_lat", "min_long", "max_lat", "max_long") - rows are found in R*Tree table
+
+    :param stmt_name: Name of the query
+    :return: SQL statement
+    """
+
+    sel_cols, id_col, rtree_table = BBOX_COLS[stmt_name]
+    return sa.select(*sel_cols).join(rtree_table, id_col == rtree_table.c.ID).where(
+        rtree_table.c.MAX_LONG >= sa.bindparam("min_long"), rtree_table.c.MIN_LONG <= sa.bindparam("max_long"),
+        rtree_table.c.MAX_LAT >= sa.bindparam("min_lat"), rtree_table.c.MIN_LAT <= sa.bindparam("max_lat"))
+
+
+@lru_cache(maxsize=None)
+def get_shards_meta() -> pd.DataFrame:
+    """
+    Function that reads (only once) names and bounding boxes of shards from the table "SHARD_TABLE"
+
+    :return: Dataframe indexed by indices of shards (empty if the database is not divided into shards)
+    """
+
+    with SQL_ENGINE.connect() as db_conn:
+        if not sa.inspect(db_conn).has_table(ShardInfo.__tablename__):
+            return pd.DataFrame(columns=["SHARD_NAME", "MIN_LONG", "MAX_LONG", "MIN_LAT", "MAX_LAT"])
+
+        return pd.read_sql(sa.select(ShardInfo.__table__).order_by(ShardInfo.shard_id), db_conn, index_col="SHARD_ID")
+
+
+@lru_cache(maxsize=None)
+def get_sekts_shards() -> Dict[int, List[int]]:
+    """
+    Function that reads (only once) indices of shards containing PRG points or BDOT10k buildings of given sectors
+
+    :return: Dictionary mapping codes of sectors to lists of indices of shards
+    """
+
+    sekts_shards = {}
+
+    with SQL_ENGINE.connect() as db_conn:
+        for sekt_code, shard_id in db_conn.execute(sa.select(ShardSekt.kod_sektora, ShardSekt.shard_id)):
+            sekts_shards.setdefault(sekt_code, []).append(shard_id)
+
+    return sekts_shards
+
+
+def get_data_engines() -> List[sa.engine.Engine]:
+    """
+    Function that returns SQL engines of databases containing PRG and BDOT10k tables - engines of all shards or
+    "SQL_ENGINE" if the database is not divided into shards
+
+    :return: List of SQL engines
+    """
+
+    shards_meta = get_shards_meta()
+
+    if shards_meta.empty:
+        return [SQL_ENGINE]
+
+    return [get_shard_engine(shard_name) for shard_name in shards_meta["SHARD_NAME"]]
+
+
+def route_in_vals(stmt_name: str, in_vals: List[Any]) -> List[Tuple[sa.engine.Engine, List[Any]]]:
+    """
+    Function that assigns values of filtering column of a given query to shards containing rows with these values -
+    query is sent only to shards whose range of indices or set of sectors contains given values (through their
+    read-only engines)
+
+    :param stmt_name: Name of the query
+    :param in_vals: Values of filtering column
+    :return: List of SQL engines of shards and values of filtering column sent to these shards
+    """
+
+    shards_meta = get_shards_meta()
+
+    if shards_meta.empty:
+        return [(READ_ENGINE, in_vals)]
+
+    if QUERY_ROUTES[stmt_name] == "all":
+        return [(get_shard_engine(shard_name, True), in_vals) for shard_name in shards_meta["SHARD_NAME"]]
+
+    if QUERY_ROUTES[stmt_name] == "id":
+        shard_step = int(os.environ["SHARD_ID_STEP"])
+        vals_shards = [(c_val, [int(c_val) // shard_step]) for c_val in in_vals]
+    else:
+        sekts_shards = get_sekts_shards()
+        vals_shards = [(c_val, sekts_shards.get(c_val, [])) for c_val in in_vals]
+
+    shards_vals = {}
+
+    for c_val, shard_ids in vals_shards:
+        for shard_id in shard_ids:
+            if shard_id in shards_meta.index:
+                shards_vals.setdefault(shard_id, []).append(c_val)
+
+    # Jesli zadna baza czesciowa nie zawiera szukanych wartosci, to wysylamy puste zapytanie, zeby zwrocic pusta tablice
+    # z wlasciwymi kolumnami
+    if not shards_vals:
+        return [(get_shard_engine(shards_meta["SHARD_NAME"].iloc[0], True), [])]
+
+    return [(get_shard_engine(shards_meta.at[shard_id, "SHARD_NAME"], True), shard_vals)
+            for shard_id, shard_vals in shards_vals.items()]
+
+
+def concat_frames(data_frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Function that concatenates results of a query sent to many shards
+
+    :param data_frames: List of dataframes returned by shards
+    :return: Concatenated dataframe
+    """
+
+    return data_frames[0] if len(data_frames) == 1 else pd.concat(data_frames, ignore_index=True)
+
+
+def read_sql_in(stmt_name: str, in_vals: Sequence[Any]) -> pd.DataFrame:
+    """
+    Function that reads from database rows with values of filtering column belonging to the given set
+
+    :param stmt_name: Name of the query
+    :param in_vals: Values of filtering column
+    :return: Dataframe containing selected rows
+    """
+
+    # Pozbywamy sie duplikatow i typow numpy, ktorych nie obsluguje sterownik sqlite3
+    in_vals = np.unique(np.asarray(in_vals)).tolist()
+    return concat_frames([read_engine_in(db_engine, stmt_name, shard_vals) for db_engine, shard_vals in
+                          route_in_vals(stmt_name, in_vals)])
+
+
+def read_engine_in(db_engine: sa.engine.Engine, stmt_name: str, in_vals: List[Any]) -> pd.DataFrame:
+    """
+    Function that reads from a given database rows with values of filtering column belonging to the given set
+
+    :param db_engine: SQL engine of the database
+    :param stmt_name: Name of the query
+    :param in_vals: Unique values of filtering column
+    :return: Dataframe containing selected rows
+    """
+
+    with db_engine.connect() as db_conn:
+        if len(in_vals) <= int(os.environ["SQL_IN_MAX"]):
+            return pd.read_sql(get_in_stmt(stmt_name, False), db_conn, params={"in_vals": in_vals})
+
+        # Duze zbiory wartosci zapisujemy w tymczasowej tablicy polaczenia i laczymy ja z przeszukiwana tablica
+        temp_table = get_temp_table(stmt_name)
+        temp_table.create(db_conn, checkfirst=True)
+        db_conn.execute(temp_table.delete())
+        db_conn.execute(temp_table.insert(), [{"VAL": val} for val in in_vals])
+        return pd.read_sql(get_in_stmt(stmt_name, True), db_conn)
+
+
+def read_sql_bbox(stmt_name: str, min_lat: float, min_long: float, max_lat: float, max_long: float) -> pd.DataFrame:
+    """
+    Function that reads from database rows with bounding boxes intersecting given bounding box
+
+    :param stmt_name: Name of the query
+    :param min_lat: Minimum latitude of bounding box
+    :param min_long: Minimum longitude of bounding box
+    :param max_lat: Maximum latitude of bounding box
+    :param max_long: Maximum longitude of bounding box
+    :return: Dataframe containing selected rows
+    """
+
+    bbox_params = {"min_lat": float(min_lat), "min_long": float(min_long), "max_lat": float(max_lat),
+                   "max_long": float(max_long)}
+    bbox_frames = []
+
+    for db_engine in get_bbox_engines(min_lat, min_long, max_lat, max_long):
+        with db_engine.connect() as db_conn:
+            bbox_frames.append(pd.read_sql(get_bbox_stmt(stmt_name), db_conn, params=bbox_params))
+
+    return concat_frames(bbox_frames)
+
+
+def get_bbox_engines(min_lat: float, min_long: float, max_lat: float, max_long: float) -> List[sa.engine.Engine]:
+    """
+    Function that returns read-only SQL engines of shards whose bounding boxes intersect given bounding box
+
+    :param min_lat: Minimum latitude of bounding box
+    :param min_long: Minimum longitude of bounding box
+    :param max_lat: Maximum latitude of bounding box
+    :param max_long: Maximum longitude of bounding box
+    :return: List of SQL engines (at least one engine, so that query returns dataframe with proper columns)
+    """
+
+    shards_meta = get_shards_meta()
+
+    if shards_meta.empty:
+        return [READ_ENGINE]
+
+    bbox_mask = (shards_meta["MAX_LONG"] >= min_long) & (shards_meta["MIN_LONG"] <= max_long) & \
+                (shards_meta["MAX_LAT"] >= min_lat) & (shards_meta["MIN_LAT"] <= max_lat)
+    bbox_names = shards_meta.loc[bbox_mask, "SHARD_NAME"].tolist() or shards_meta["SHARD_NAME"].tolist()[:1]
+    return [get_shard_engine(shard_name, True) for shard_name in bbox_names]
+
+
+def get_radius_bbox(c_lat: float, c_long: float, c_rad: float) -> Tuple[float, float, float, float]:
+    """
+    Function that returns bounding box of the circle with a given radius
+
+    :param c_lat: Latitude of the centre of the circle
+    :param c_long: Longitude of the centre of the circle
+    :param c_rad: Radius of the circle (in meters)
+    :return: Minimum latitude, minimum longitude, maximum latitude and maximum longitude of bounding box
+    """
+
+    # Jeden stopien szerokosci geograficznej to okolo 111 km, a stopien dlugosci geograficznej maleje wraz z cosinusem
+    # szerokosci geograficznej
+    lat_rad = c_rad / EARTH_DEG
+    long_rad = c_rad / (EARTH_DEG * np.cos(np.radians(c_lat)))
+    return c_lat - lat_rad, c_long - long_rad, c_lat + lat_rad, c_long + long_rad
+
+
+def get_crds_dists(c_lat: float, c_long: float, lats_arr: np.ndarray, longs_arr: np.ndarray) -> np.ndarray:
+    """
+    Function that calculates approximate distances (in meters) between given point and array of points
+
+    :param c_lat: Latitude of the point
+    :param c_long: Longitude of the point
+    :param lats_arr: Numpy array containing latitudes of points
+    :param longs_arr: Numpy array containing longitudes of points
+    :return: Numpy array containing distances
+    """
+
+    # Na odleglosciach rzedu kilku kilometrow rzut rownoodlegly jest wystarczajaco dokladny
+    lats_arr = np.asarray(lats_arr, dtype=float)
+    longs_arr = np.asarray(longs_arr, dtype=float)
+    return EARTH_DEG * np.sqrt((lats_arr - c_lat) ** 2 + ((longs_arr - c_long) * np.cos(np.radians(c_lat))) ** 2)
+
+
+def sync_rtree_tables(db_engine: sa.engine.Engine = SQL_ENGINE) -> None:
+    """
+    Function that creates R*Tree tables (if they do not exist) and adds to them PRG points and BDOT10k buildings
+    missing in these tables
+
+    :param db_engine: SQL engine of the database (main database or shard)
+    :return: The method does not return any values
+    """
+
+    with db_engine.begin() as db_conn:
+        for c_sql in RTREE_SQL:
+            db_conn.execute(sa.text(c_sql))
+
+
+def sync_table_indexes(db_engine: sa.engine.Engine = SQL_ENGINE) -> None:
+    """
+    Function that creates indices of PRG and BDOT10k tables missing in the database (e.g. indices added to the schema
+    after the database has been built)
+
+    :param db_engine: SQL engine of the database (main database or shard)
+    :return: The method does not return any values
+    """
+
+    with db_engine.begin() as db_conn:
+        for db_index in (*PRG.__table__.indexes, *BDOT10K.__table__.indexes):
+            db_index.create(db_conn, checkfirst=True)
+
+
+def get_schema_version(db_engine: sa.engine.Engine = SQL_ENGINE) -> int:
+    """
+    Function that returns version of the schema saved in the database file - databases built before introduction of
+    versions of the schema have version 0
+
+    :param db_engine: SQL engine of the database
+    :return: Version of the schema
+    """
+
+    with db_engine.connect() as db_conn:
+        return db_conn.execute(sa.text("PRAGMA user_version")).scalar()
+
+
+def set_schema_version(db_engine: sa.engine.Engine = SQL_ENGINE) -> None:
+    """
+    Function that saves current version of the schema (SCHEMA_VERSION) in the database file
+
+    :param db_engine: SQL engine of the database
+    :return: The method does not return any values
+    """
+
+    with db_engine.begin() as db_conn:
+        db_conn.execute(sa.text("PRAGMA user_version = " + str(SCHEMA_VERSION)))
+
+
+def get_view_sql(view_table: sa.Table, db_table: sa.Table) -> str:
+    """
+    Function that creates SQL statement creating view of a given table, in which indices of values from lookup tables
+    are replaced by these values
+
+    :param view_table: View of the table
+    :param db_table: Table containing indices of values from lookup tables
+    :return: SQL statement
+    """
+
+    dict_cols = DICT_COLS[db_table.name]
+    view_join = db_table
+
+    for col_name in dict_cols:
+        view_join = view_join.join(DICT_TABLES[col_name], DICT_TABLES[col_name].c.DICT_ID == db_table.c[col_name])
+
+    view_sel = sa.select(*[DICT_TABLES[c_col.name].c.DICT_VALUE.label(c_col.name) if c_col.name in dict_cols else
+                           c_col for c_col in db_table.columns]).select_from(view_join)
+    return "CREATE VIEW IF NOT EXISTS " + view_table.name + " AS " + str(view_sel.compile(SQL_ENGINE))
+
+
+def create_dict_views(db_engine: sa.engine.Engine = SQL_ENGINE) -> None:
+    """
+    Function that creates views of PRG and BDOT10k tables (if they do not exist)
+
+    :param db_engine: SQL engine of the database (main database or shard)
+    :return: The method does not return any values
+    """
+
+    with db_engine.begin() as db_conn:
+        for view_table, db_table in VIEW_TABLES:
+            db_conn.execute(sa.text(get_view_sql(view_table, db_table)))
+
+
+class DictEncoder:
+    """ Class that replaces repeated values of columns of PRG and BDOT10k tables with indices from lookup tables """
+
+    def __init__(self, db_table: sa.Table, db_engine: sa.engine.Engine = SQL_ENGINE) -> None:
+        """
+        Method that creates objects from a class "DictEncoder" - values already saved in lookup tables are read from
+        database
+
+        :param db_table: Table whose columns are encoded
+        :param db_engine: SQL engine of the database (main database or shard) in which encoded rows are saved
+        :return: The method does not return any values
+        """
+
+        self.dict_cols = DICT_COLS[db_table.name]
+
+        # Zapamietujemy pozycje kodowanych kolumn w argumentach konstruktorow klas PRG i BDOT10K (bez klucza glownego)
+        self.cols_pos = [(i, c_col.name) for i, c_col in enumerate([c_col for c_col in db_table.columns
+                                                                   if not c_col.primary_key])
+                         if c_col.name in self.dict_cols]
+        self.dict_vals = {}
+        self.new_vals = {col_name: [] for col_name in self.dict_cols}
+
+        with db_engine.connect() as db_conn:
+            for col_name in self.dict_cols:
+                dict_table = DICT_TABLES[col_name]
+                self.dict_vals[col_name] = dict(db_conn.execute(sa.select(dict_table.c.DICT_VALUE,
+                                                                          dict_table.c.DICT_ID)).all())
+
+        self.max_ids = {col_name: max(c_dict.values(), default=0) for col_name, c_dict in self.dict_vals.items()}
+
+    def encode(self, col_name: str, c_val: str) -> int:
+        """
+        Method that returns index of a given value of a column - new values get next free indices
+
+        :param col_name: Name of the column
+        :param c_val: Value of the column
+        :return: Index of the value in lookup table
+        """
+
+        c_val = str(c_val)
+        c_id = self.dict_vals[col_name].get(c_val)
+
+        if c_id is None:
+            self.max_ids[col_name] += 1
+            c_id = self.max_ids[col_name]
+            self.dict_vals[col_name][c_val] = c_id
+            self.new_vals[col_name].append({"DICT_ID": c_id, "DICT_VALUE": c_val})
+
+        return c_id
+
+    def encode_row(self, c_row: Sequence[Any]) -> List[Any]:
+        """
+        Method that encodes row passed to the constructor of classes "PRG" or "BDOT10K"
+
+        :param c_row: Values of columns of the table (without primary key)
+        :return: List of values with indices from lookup tables
+        """
+
+        enc_row = list(c_row)
+
+        for i, col_name in self.cols_pos:
+            enc_row[i] = self.encode(col_name, enc_row[i])
+
+        return enc_row
+
+    def encode_dict(self, c_row: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Method that encodes row inserted directly into the table
+
+        :param c_row: Dictionary mapping names of columns to their values
+        :return: Dictionary with indices from lookup tables
+        """
+
+        return {col_name: self.encode(col_name, c_val) if col_name in self.dict_cols else c_val
+                for col_name, c_val in c_row.items()}
+
+    def save(self, db_conn: Union[sa.engine.Connection, Session]) -> None:
+        """
+        Method that saves new values to lookup tables - it should be called in the same transaction in which encoded
+        rows are saved
+
+        :param db_conn: Database connection or session
+        :return: The method does not return any values
+        """
+
+        for col_name in self.dict_cols:
+            if self.new_vals[col_name]:
+                db_conn.execute(DICT_TABLES[col_name].insert(), self.new_vals[col_name])
+                self.new_vals[col_name] = []
+
+
+def decode_bubd_ids(bubd_ids: Sequence[Any]) -> np.ndarray:
+    """
+    Function that converts indices of BDOT10k buildings stored in PRG table (as integers or as bytes of integers saved
+    by the PRG parser) to integers
+
+    :param bubd_ids: Sequence of indices of BDOT10k buildings
+    :return: Numpy array containing indices of BDOT10k buildings
+    """
+
+    return np.asarray([int.from_bytes(c_id, "little", signed=True) if isinstance(c_id, bytes) else int(c_id)
+                       for c_id in bubd_ids], dtype=np.int64)
+
+
+def get_prg_info(prg_ids: Sequence[int]) -> np.ndarray:
+    """
+    Function that returns descriptions and coordinates of PRG points with given indices
+
+    :param prg_ids: Indices of PRG points
+    :return: Numpy array containing information about PRG points
+    """
+
+    return read_sql_in("prg_info", [int(prg_id) for prg_id in prg_ids]).to_numpy()
+
+
+def get_prg_labels_info(prg_ids: Sequence[int]) -> np.ndarray:
+    """
+    Function that returns indices, descriptions and coordinates of PRG points with given indices
+
+    :param prg_ids: Indices of PRG points
+    :return: Numpy array containing index and information about every PRG point
+    """
+
+    return read_sql_in("prg_labels", [int(prg_id) for prg_id in prg_ids]).to_numpy()
+
+
+def get_prg_gmina(gmina: str, powiat: str, wojewodztwo: str) -> np.ndarray:
+    """
+    Function that returns indices and coordinates of all PRG points in a given municipality - municipality is
+    identified by its name and the names of its district and voivodeship, because names of municipalities and
+    districts are not unique
+
+    :param gmina: Name of the municipality
+    :param powiat: Name of the district in which the municipality is located
+    :param wojewodztwo: Name of the voivodeship in which the municipality is located
+    :return: Numpy array containing indices and coordinates of PRG points
+    """
+
+    prg_pts = read_sql_in("prg_gmina", [gmina]).to_numpy()
+    return prg_pts[(prg_pts[:, 3] == powiat) & (prg_pts[:, 4] == wojewodztwo), :3]
+
+
+def get_prg_bbox(min_lat: float, min_long: float, max_lat: float, max_long: float) -> np.ndarray:
+    """
+    Function that returns indices and coordinates of PRG points located inside given bounding box
+
+    :param min_lat: Minimum latitude of bounding box
+    :param min_long: Minimum longitude of bounding box
+    :param max_lat: Maximum latitude of bounding box
+    :param max_long: Maximum longitude of bounding box
+    :return: Numpy array containing indices and coordinates of PRG points
+    """
+
+    prg_pts = read_sql_bbox("prg_bbox", min_lat, min_long, max_lat, max_long).to_numpy()
+
+    # Tablica R*Tree przechowuje wspolrzedne z pojedyncza precyzja, wiec odrzucamy punkty lezace tuz poza prostokatem
+    in_mask = (prg_pts[:, 1] >= min_lat) & (prg_pts[:, 1] <= max_lat) & (prg_pts[:, 2] >= min_long) & \
+              (prg_pts[:, 2] <= max_long)
+    return prg_pts[in_mask]
+
+
+def get_prg_radius(c_lat: float, c_long: float, c_rad: float) -> np.ndarray:
+    """
+    Function that returns indices, coordinates and distances of PRG points located within given radius
+
+    :param c_lat: Latitude of the centre of the circle
+    :param c_long: Longitude of the centre of the circle
+    :param c_rad: Radius of the circle (in meters)
+    :return: Numpy array containing indices, coordinates and distances of PRG points sorted by distance
+    """
+
+    prg_pts = get_prg_bbox(*get_radius_bbox(c_lat, c_long, c_rad))
+    pts_dists = get_crds_dists(c_lat, c_long, prg_pts[:, 1], prg_pts[:, 2])
+    dists_ids = np.argsort(pts_dists)
+    dists_ids = dists_ids[pts_dists[dists_ids] <= c_rad]
+    return np.column_stack((prg_pts[dists_ids], pts_dists[dists_ids]))
+
+
+def get_nearest_prg(c_coords: np.ndarray) -> Optional[list]:
+    """
+    Function that returns description and coordinates of PRG point located closest to given coordinates - PRG points
+    are searched within the radius NEAREST_RAD from given coordinates
+
+    :param c_coords: Numpy array containing latitude and longitude
+    :return: List containing information about PRG point or None if there are no PRG points near given coordinates
+    """
+
+    prg_id = get_nearest_prg_id(c_coords)
+    return get_prg_info([prg_id])[0].tolist() if prg_id is not None else None
+
+
+def get_nearest_prg_id(c_coords: np.ndarray) -> Optional[int]:
+    """
+    Function that returns index of PRG point located closest to given coordinates - PRG points are searched within the
+    radius NEAREST_RAD from given coordinates
+
+    :param c_coords: Numpy array containing latitude and longitude
+    :return: Index of PRG point or None if there are no PRG points near given coordinates
+    """
+
+    prg_pts = get_prg_radius(c_coords[0], c_coords[1], float(os.environ["NEAREST_RAD"]))
+    return int(prg_pts[0, 0]) if len(prg_pts) > 0 else None
+
+
+def get_bdot10k_info(bubd_id: int) -> Optional[np.ndarray]:
+    """
+    Function that returns description and GeoJSON shape of a BDOT10k building with given index
+
+    :param bubd_id: Index of BDOT10k building
+    :return: Numpy array containing information about building or None if there is no such building
+    """
+
+    bubd_rows = read_sql_in("bdot10k_info", [int(bubd_id)]).to_numpy()
+    return bubd_rows[0] if len(bubd_rows) > 0 else None
+
+
+def get_bdot10k_popups_info(bubd_ids: Sequence[int]) -> np.ndarray:
+    """
+    Function that returns indices, descriptions and GeoJSON shapes of BDOT10k buildings with given indices
+
+    :param bubd_ids: Indices of BDOT10k buildings
+    :return: Numpy array containing index and information about every building
+    """
+
+    return read_sql_in("bdot10k_popups", [int(bubd_id) for bubd_id in bubd_ids]).to_numpy()
+
+
+def get_bdot10k_bbox(min_lat: float, min_long: float, max_lat: float, max_long: float) -> np.ndarray:
+    """
+    Function that returns BDOT10k buildings with bounding boxes intersecting given bounding box
+
+    :param min_lat: Minimum latitude of bounding box
+    :param min_long: Minimum longitude of bounding box
+    :param max_lat: Maximum latitude of bounding box
+    :param max_long: Maximum longitude of bounding box
+    :return: Numpy array containing information about buildings
+    """
+
+    return read_sql_bbox("bdot10k_bbox", min_lat, min_long, max_lat, max_long).to_numpy()
+
+
+def get_bdot10k_radius(c_lat: float, c_long: float, c_rad: float) -> np.ndarray:
+    """
+    Function that returns BDOT10k buildings with centroids located within given radius
+
+    :param c_lat: Latitude of the centre of the circle
+    :param c_long: Longitude of the centre of the circle
+    :param c_rad: Radius of the circle (in meters)
+    :return: Numpy array containing information about buildings sorted by distance of centroids
+    """
+
+    bubd_arr = get_bdot10k_bbox(*get_radius_bbox(c_lat, c_long, c_rad))
+    bubd_dists = get_crds_dists(c_lat, c_long, bubd_arr[:, 4], bubd_arr[:, 3])
+    dists_ids = np.argsort(bubd_dists)
+    return bubd_arr[dists_ids[bubd_dists[dists_ids] <= c_rad]]
+
+
+def get_bdot10k_sekts(sekt_codes: Sequence[int]) -> np.ndarray:
+    """
+    Function that returns BDOT10k buildings located in given sectors
+
+    :param sekt_codes: Codes of the sectors
+    :return: Numpy array containing information about buildings
+    """
+
+    return read_sql_in("bdot10k_sekts", sekt_codes).to_numpy()
+
+
+def get_bdot10k_prg(bubd_ids: Sequence[int]) -> np.ndarray:
+    """
+    Function that returns PRG points assigned to BDOT10k buildings with given indices (all buildings are read in a
+    single query through the index of the column "BDOT10K_BUBD_ID")
+
+    :param bubd_ids: Indices of BDOT10k buildings
+    :return: Numpy array containing index of the building, index, address, coordinates and distance from the building
+             of every PRG point
+    """
+
+    bdot10k_prg = read_sql_in("bdot10k_prg", [int(bubd_id) for bubd_id in bubd_ids])
+    bdot10k_prg["BDOT10K_BUBD_ID"] = decode_bubd_ids(bdot10k_prg["BDOT10K_BUBD_ID"])
+    return bdot10k_prg.to_numpy()
+
+
+def get_prg_bdot10k(prg_ids: Sequence[int]) -> Dict[int, int]:
+    """
+    Function that returns indices of BDOT10k buildings assigned to PRG points with given indices
+
+    :param prg_ids: Indices of PRG points
+    :return: Dictionary mapping indices of PRG points to indices of BDOT10k buildings
+    """
+
+    prg_bubd = read_sql_in("prg_bdot10k", [int(prg_id) for prg_id in prg_ids]).to_numpy()
+    return dict(zip(prg_bubd[:, 0].tolist(), decode_bubd_ids(prg_bubd[:, 1]).tolist()))
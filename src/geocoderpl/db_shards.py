@@ -0,0 +1,283 @@
+""" Module that builds database of the GeocoderPL project divided into shards - databases of single voivodeships """
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from db_classes import BASE, READ_ENGINE, SHARD_ENGINES, SHARD_TABLES, ShardInfo, ShardSekt, get_shard_engine, \
+    get_snapshot_path
+from db_queries import create_dict_views, get_data_engines, get_sekts_shards, get_shards_meta
+from geo_search import save_addr_phrases
+from geo_utilities import *
+from xml_parsers import BDOT10kDataParser, PRGDataParser
+
+
+def get_bdot10k_shard_id(woj_name: str) -> int:
+    """
+    Function that returns index of the shard of a given BDOT10k file of a province - index of the shard is equal to
+    TERYT code of the province, which is read from the name of the file (e.g. 'PL.PZGiK.994.02__OT_BDOT10k.zip')
+
+    :param woj_name: Name of the BDOT10k file of a province
+    :return: Index of the shard
+    """
+
+    woj_match = re.search(r"(?<![0-9A-Za-z])(\d{2})(?![0-9A-Za-z])", os.path.basename(woj_name))
+
+    if woj_match is None:
+        raise Exception("Nie udało się odczytać kodu TERYT województwa z nazwy pliku BDOT10k: '" + woj_name + "'!")
+
+    return int(woj_match.group(1))
+
+
+def get_prg_shard_id(woj_name: str, teryt_dict: Dict[str, str]) -> int:
+    """
+    Function that returns index of the shard of a given PRG file of a province - index of the shard is equal to TERYT
+    code of the province, which is found by name of the province read from the name of the file
+
+    :param woj_name: Name of the PRG file of a province
+    :param teryt_dict: Dictionary mapping names of regions to their TERYT codes
+    :return: Index of the shard
+    """
+
+    reg_name = unidecode(woj_name[woj_name.rfind("_") + 1:-4].upper())
+
+    if reg_name not in teryt_dict:
+        raise Exception("Nie udało się ustalić kodu TERYT województwa dla pliku PRG: '" + woj_name + "'!")
+
+    return int(teryt_dict[reg_name].split(";")[0])
+
+
+def get_shard_name(shard_id: int) -> str:
+    """
+    Function that returns name of the shard with a given index (two-digit TERYT code of the province)
+
+    :param shard_id: Index of the shard
+    :return: Name of the shard
+    """
+
+    return "%02d" % shard_id
+
+
+def group_woj_names(woj_names: List[str], shard_ids: List[int]) -> Dict[int, List[str]]:
+    """
+    Function that groups names of files of provinces by indices of their shards
+
+    :param woj_names: Names of files of provinces
+    :param shard_ids: Indices of shards of these files
+    :return: Dictionary mapping indices of shards to lists of names of files
+    """
+
+    shards_woj = {}
+
+    for woj_name, shard_id in zip(woj_names, shard_ids):
+        shards_woj.setdefault(shard_id, []).append(woj_name)
+
+    return shards_woj
+
+
+def create_shards(shard_ids: List[int]) -> None:
+    """
+    Function that creates empty shards with given indices and registers them in the table "SHARD_TABLE" of the main
+    database - shards are switched to WAL mode, so that build workers can read shards written by other workers
+
+    :param shard_ids: Indices of shards
+    :return: The method does not return any values
+    """
+
+    for shard_id in shard_ids:
+        shard_engine = get_shard_engine(get_shard_name(shard_id))
+        BASE.metadata.create_all(shard_engine, tables=SHARD_TABLES)
+        create_dict_views(shard_engine)
+
+        with shard_engine.connect() as db_conn:
+            db_conn.execute(sa.text("PRAGMA journal_mode=WAL"))
+
+        with shard_engine.begin() as db_conn:
+            db_conn.execute(UniqPhrs.__table__.insert(), [{"UNIQ_PHRS": ""}])
+
+    with SQL_ENGINE.begin() as db_conn:
+        db_conn.execute(ShardInfo.__table__.delete())
+        db_conn.execute(ShardInfo.__table__.insert(), [{"SHARD_ID": shard_id, "SHARD_NAME": get_shard_name(shard_id)}
+                                                       for shard_id in shard_ids])
+
+    get_shards_meta.cache_clear()
+
+
+def update_shards_meta() -> None:
+    """
+    Function that saves to the main database bounding boxes of shards and sectors containing PRG points or BDOT10k
+    buildings of every shard - these data are used for routing of queries to shards
+
+    :return: The method does not return any values
+    """
+
+    shards_rows = []
+    sekts_rows = []
+    shard_step = int(os.environ["SHARD_ID_STEP"])
+
+    for shard_id, shard_name in get_shards_meta()["SHARD_NAME"].items():
+        with get_shard_engine(shard_name).connect() as db_conn:
+            max_id = db_conn.execute(sa.text("SELECT MAX(ROW_ID) FROM (SELECT PRG_POINT_ID AS ROW_ID FROM PRG_TABLE " +
+                                             "UNION ALL SELECT BDOT10K_BUBD_ID FROM BDOT10K_TABLE)")).scalar()
+
+            # Indeksy wierszy kazdej bazy czesciowej musza lezec w jej przedziale, bo inaczej zapytania kierowane
+            # wedlug indeksow trafialyby do sasiedniej bazy czesciowej
+            if max_id is not None and max_id >= (shard_id + 1) * shard_step:
+                raise Exception("Indeksy wierszy bazy częściowej '" + shard_name + "' przekraczają jej przedział. " +
+                                "Zwiększ wartość zmiennej 'SHARD_ID_STEP' i zbuduj bazę danych ponownie!")
+
+            shard_bbox = db_conn.execute(sa.text(
+                "SELECT MIN(MIN_LONG), MAX(MAX_LONG), MIN(MIN_LAT), MAX(MAX_LAT) FROM (SELECT * FROM PRG_RTREE " +
+                "UNION ALL SELECT * FROM BDOT10K_RTREE)")).one()
+            shard_sekts = db_conn.execute(sa.text("SELECT KOD_SEKTORA FROM PRG_TABLE UNION SELECT KOD_SEKTORA FROM " +
+                                                  "BDOT10K_TABLE")).scalars().all()
+
+        shards_rows.append({"SHARD_ID": shard_id, "SHARD_NAME": shard_name,
+                            **dict(zip(("MIN_LONG", "MAX_LONG", "MIN_LAT", "MAX_LAT"), shard_bbox))})
+        sekts_rows += [{"KOD_SEKTORA": sekt_code, "SHARD_ID": shard_id} for sekt_code in shard_sekts]
+
+    with SQL_ENGINE.begin() as db_conn:
+        db_conn.execute(ShardInfo.__table__.delete())
+        db_conn.execute(ShardInfo.__table__.insert(), shards_rows)
+        db_conn.execute(ShardSekt.__table__.delete())
+
+        if sekts_rows:
+            db_conn.execute(ShardSekt.__table__.insert(), sekts_rows)
+
+    get_shards_meta.cache_clear()
+    get_sekts_shards.cache_clear()
+
+
+def build_bdot10k_shard(bdot10k_args: tuple, shard_id: int, woj_names: List[str]) -> None:
+    """
+    Function (executed by build workers) that saves BDOT10k buildings of given provinces to a given shard
+
+    :param bdot10k_args: Arguments of the class "BDOT10kDataParser" (path, tags, type of event, tags of dicts and
+                         tags dict)
+    :param shard_id: Index of the shard
+    :param woj_names: Names of BDOT10k files of provinces
+    :return: The method does not return any values
+    """
+
+    BDOT10kDataParser(*bdot10k_args, woj_names=woj_names, db_engine=get_shard_engine(get_shard_name(shard_id)),
+                      id_start=shard_id * int(os.environ["SHARD_ID_STEP"]))
+
+
+def build_prg_shard(prg_args: tuple, shard_id: int, woj_names: List[str]) -> np.ndarray:
+    """
+    Function (executed by build workers) that saves PRG points of given provinces to a given shard
+
+    :param prg_args: Arguments of the class "PRGDataParser" (path, tags, type of event and superpermutations dict)
+    :param shard_id: Index of the shard
+    :param woj_names: Names of PRG files of provinces
+    :return: Numpy array containing address phrases of sectors (indexed by codes of sectors)
+    """
+
+    prg_parser = PRGDataParser(*prg_args, woj_names=woj_names, db_engine=get_shard_engine(get_shard_name(shard_id)),
+                               id_start=shard_id * int(os.environ["SHARD_ID_STEP"]), save_flag=False)
+    return prg_parser.sekt_addr_phrs
+
+
+def run_workers(worker_func: Callable, worker_args: tuple, shards_woj: Dict[int, List[str]],
+                workers_num: int) -> list:
+    """
+    Function that executes a given function for every shard in separate processes
+
+    :param worker_func: Function executed by workers
+    :param worker_args: Arguments of the parser passed to the function
+    :param shards_woj: Dictionary mapping indices of shards to lists of names of files of provinces
+    :param workers_num: Number of workers
+    :return: List of values returned by the function
+    """
+
+    # Zamykamy polaczenia z bazami danych, zeby nie byly wspoldzielone z procesami roboczymi
+    SQL_ENGINE.dispose()
+    READ_ENGINE.dispose()
+
+    for shard_engine in SHARD_ENGINES.values():
+        shard_engine.dispose()
+
+    with ProcessPoolExecutor(max_workers=workers_num, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=create_logger, initargs=('root',)) as pool:
+        shards_futs = [pool.submit(worker_func, worker_args, shard_id, woj_names)
+                       for shard_id, woj_names in shards_woj.items()]
+        return [shard_fut.result() for shard_fut in shards_futs]
+
+
+@time_decorator
+def build_shards(bdot10k_args: tuple, prg_args: tuple, workers_num: int) -> None:
+    """
+    Function that builds database divided into shards - BDOT10k buildings and PRG points of every province are saved
+    by independent workers to the shard of this province, while main database stores sectors, regions, unique address
+    phrases and metadata of shards used for routing of queries
+
+    :param bdot10k_args: Arguments of the class "BDOT10kDataParser" (path, tags, type of event, tags of dicts and
+                         tags dict)
+    :param prg_args: Arguments of the class "PRGDataParser" (path, tags, type of event and superpermutations dict)
+    :param workers_num: Number of workers
+    :return: The method does not return any values
+    """
+
+    with SQL_ENGINE.connect() as db_conn:
+        teryt_dict = dict(db_conn.execute(sa.select(TerytCodes.teryt_name, TerytCodes.teryt_code)).all())
+
+    # Przypisujemy pliki wojewodztw do baz czesciowych wedlug kodow TERYT wojewodztw
+    with zipfile.ZipFile(bdot10k_args[0], "r") as zfile:
+        bdot10k_names = zfile.namelist()
+
+    prg_names = PRGDataParser.extract_woj_files(prg_args[0])
+    bdot10k_woj = group_woj_names(bdot10k_names, [get_bdot10k_shard_id(woj_name) for woj_name in bdot10k_names])
+    prg_woj = group_woj_names(prg_names, [get_prg_shard_id(woj_name, teryt_dict) for woj_name in prg_names])
+    create_shards(sorted(set(bdot10k_woj) | set(prg_woj)))
+
+    # Budynki BDOT10k zapisujemy rownolegle, a nastepnie budujemy drzewo sektorow na podstawie budynkow ze wszystkich
+    # baz czesciowych
+    run_workers(build_bdot10k_shard, bdot10k_args, bdot10k_woj, workers_num)
+    create_sectors_tree()
+    update_shards_meta()
+
+    # Punkty adresowe PRG zapisujemy rownolegle - najblizsze budynki wyszukiwane sa we wszystkich bazach czesciowych
+    sekt_addr_phrs = np.full(shape=len(get_sectors_tree()), fill_value='', dtype=object)
+
+    for shard_phrs in run_workers(build_prg_shard, prg_args, prg_woj, workers_num):
+        sekt_addr_phrs += shard_phrs
+
+    save_addr_phrases(sekt_addr_phrs, get_snapshot_path("ADDRS_PATH"))
+    merge_uniq_phrases()
+    update_shards_meta()
+    close_shards()
+
+
+def merge_uniq_phrases() -> None:
+    """
+    Function that saves to the main database unique address phrases of all shards
+
+    :return: The method does not return any values
+    """
+
+    uniq_words = {}
+
+    for db_engine in get_data_engines():
+        with Session(db_engine) as db_session:
+            uniq_words.update(dict.fromkeys(db_session.query(UniqPhrs.uniq_phrs).all()[0][0].split()))
+
+    with Session(SQL_ENGINE) as db_session:
+        db_session.query(UniqPhrs).filter(UniqPhrs.uniq_id == 1).update({'uniq_phrs': " ".join(uniq_words) + " "})
+        db_session.commit()
+
+
+def close_shards() -> None:
+    """
+    Function that switches shards back from WAL mode to rollback journal mode - every shard is then stored in a single
+    file, which can be published and removed together with other files of the database snapshot
+
+    :return: The method does not return any values
+    """
+
+    for shard_name in get_shards_meta()["SHARD_NAME"]:
+        shard_engine = get_shard_engine(shard_name)
+        shard_engine.dispose()
+
+        with shard_engine.connect() as db_conn:
+            db_conn.execute(sa.text("PRAGMA journal_mode=DELETE"))
+
+        shard_engine.dispose()
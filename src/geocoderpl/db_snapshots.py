@@ -0,0 +1,218 @@
+""" Module that builds versioned snapshots of the database of the GeocoderPL project and publishes them atomically """
+
+import glob
+import shutil
+
+from db_classes import READ_ENGINE, SHARD_ENGINES, get_snapshot_path, get_snapshot_pointer, get_snapshot_version
+from db_queries import get_sekts_shards, get_shards_meta
+from geo_search import AddrPhrases
+from geo_utilities import *
+
+# Definiujemy tablice, ktore w kazdej kopii bazy danych musza zawierac wiersze, oraz pary tablic (widokow), ktore musza
+# zawierac tyle samo wierszy
+SNAPSHOT_TABLES = ("PRG_TABLE", "BDOT10K_TABLE", "SEKT_TABLE", "TERYT_TABLE", "JSON_TABLE")
+SNAPSHOT_PAIRS = (("PRG_VIEW", "PRG_TABLE"), ("BDOT10K_VIEW", "BDOT10K_TABLE"), ("PRG_RTREE", "PRG_TABLE"),
+                  ("BDOT10K_RTREE", "BDOT10K_TABLE"))
+
+# Definiujemy pliki (oraz katalog kolumnowej kopii w formacie Parquet) wchodzace w sklad kazdej kopii bazy danych
+SNAPSHOT_FILES = ("DB_PATH", "ADDRS_PATH", "PARQUET_PATH")
+
+
+def create_snapshot_version() -> str:
+    """
+    Function that starts building of a new database snapshot - until the snapshot is published, new connections of
+    "SQL_ENGINE" and paths returned by function "get_snapshot_path" point to files of this snapshot, while other
+    processes still read the last published snapshot
+
+    :return: Version of the new snapshot
+    """
+
+    snap_version = time.strftime("%Y%m%d_%H%M%S")
+
+    for env_name in SNAPSHOT_FILES:
+        if os.path.exists(get_snapshot_path(env_name, snap_version)):
+            raise Exception("Kopia bazy danych w wersji '" + snap_version + "' już istnieje!")
+
+    os.environ["SNAPSHOT_BUILD"] = snap_version
+    reopen_snapshot()
+    return snap_version
+
+
+def get_shard_paths(snap_version: str) -> List[str]:
+    """
+    Function that returns paths to files of shards of a given database snapshot
+
+    :param snap_version: Version of the snapshot
+    :return: List of paths to files of shards
+    """
+
+    c_root, c_ext = os.path.splitext(get_snapshot_path("DB_PATH", snap_version))
+    return sorted(glob.glob(glob.escape(c_root) + "_[0-9][0-9]" + c_ext))
+
+
+def get_snapshot_counts(snap_version: str) -> Dict[str, int]:
+    """
+    Function that returns numbers of rows of tables and views of a given database snapshot (tables missing in the
+    snapshot are skipped) and result of integrity check of the database files (key 'QUICK_CHECK') - rows of the main
+    database and all its shards are counted together
+
+    :param snap_version: Version of the snapshot
+    :return: Dictionary mapping names of tables and views to their numbers of rows
+    """
+
+    snap_names = set(SNAPSHOT_TABLES).union(*SNAPSHOT_PAIRS)
+    snap_counts = {"QUICK_CHECK": 1}
+
+    for db_path in [get_snapshot_path("DB_PATH", snap_version)] + get_shard_paths(snap_version):
+        snap_engine = sa.create_engine("sqlite:///" + db_path)
+
+        try:
+            with snap_engine.connect() as db_conn:
+                db_names = set(db_conn.execute(sa.text("SELECT name FROM sqlite_master")).scalars())
+
+                for c_name in snap_names & db_names:
+                    snap_counts[c_name] = snap_counts.get(c_name, 0) + db_conn.execute(
+                        sa.text("SELECT COUNT(*) FROM " + c_name)).scalar()
+
+                if db_conn.execute(sa.text("PRAGMA quick_check")).scalar() != "ok":
+                    snap_counts["QUICK_CHECK"] = 0
+        finally:
+            snap_engine.dispose()
+
+    return snap_counts
+
+
+def validate_snapshot(snap_version: str) -> None:
+    """
+    Function that checks if a given database snapshot is complete - tables cannot be empty, views and R*Tree tables
+    must contain all rows of their tables, phrase file must contain all sectors and numbers of rows cannot drop below
+    SNAPSHOT_MIN_RATIO of numbers of rows of the last published snapshot
+
+    :param snap_version: Version of the snapshot
+    :return: The method does not return any values
+    """
+
+    snap_counts = get_snapshot_counts(snap_version)
+    snap_errs = ["plik bazy danych jest uszkodzony"] if snap_counts.pop("QUICK_CHECK") == 0 else []
+    snap_errs += ["tablica '" + c_name + "' jest pusta" for c_name in SNAPSHOT_TABLES if not snap_counts.get(c_name)]
+    snap_errs += ["'" + c_view + "' i '" + c_name + "' zawierają różną liczbę wierszy" for c_view, c_name in
+                  SNAPSHOT_PAIRS if snap_counts.get(c_view) != snap_counts.get(c_name)]
+
+    # Macierz adresow musi zawierac wszystkie sektory zapisane w bazie danych
+    addr_phrs = AddrPhrases(get_snapshot_path("ADDRS_PATH", snap_version))
+
+    if addr_phrs.sekts_num != snap_counts.get("SEKT_TABLE"):
+        snap_errs.append("macierz adresów zawiera inną liczbę sektorów niż tablica 'SEKT_TABLE'")
+
+    addr_phrs.close()
+
+    # Liczby wierszy porownujemy z ostatnio opublikowana kopia, zeby nie opublikowac kopii z niepelnych danych
+    prev_version = get_snapshot_version(False)
+
+    if os.path.isfile(get_snapshot_path("DB_PATH", prev_version)):
+        prev_counts = get_snapshot_counts(prev_version)
+        min_ratio = float(os.environ["SNAPSHOT_MIN_RATIO"])
+        snap_errs += ["tablica '" + c_name + "' zawiera " + str(snap_counts.get(c_name, 0)) + " wierszy, a w " +
+                      "poprzedniej kopii zawierała " + str(prev_counts[c_name]) + " wierszy"
+                      for c_name in SNAPSHOT_TABLES if c_name in prev_counts and
+                      snap_counts.get(c_name, 0) < min_ratio * prev_counts[c_name]]
+
+    if snap_errs:
+        raise Exception("Kopia bazy danych w wersji '" + snap_version + "' nie przeszła walidacji: " +
+                        "; ".join(snap_errs) + "!")
+
+    logging.info("Liczby wierszy kopii bazy danych " + snap_version + ": " + str(snap_counts))
+
+
+def publish_snapshot(snap_version: str, snaps_keep: int) -> None:
+    """
+    Function that atomically publishes a given database snapshot (by replacing the pointer file) and removes the oldest
+    snapshots
+
+    :param snap_version: Version of the snapshot
+    :param snaps_keep: Number of the newest snapshots which are not removed
+    :return: The method does not return any values
+    """
+
+    # Wersje zapisujemy do pliku tymczasowego, a nastepnie podmieniamy plik wskaznika jedna operacja - procesy czytajace
+    # baze danych widza zawsze cala poprzednia albo cala nowa kopie bazy danych
+    snap_pointer = get_snapshot_pointer()
+    temp_path = snap_pointer + ".tmp"
+
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        file.write(snap_version)
+        file.flush()
+        os.fsync(file.fileno())
+
+    os.replace(temp_path, snap_pointer)
+    os.environ.pop("SNAPSHOT_BUILD", None)
+    reopen_snapshot()
+    remove_old_snapshots(snaps_keep)
+
+
+def get_snapshot_versions() -> List[str]:
+    """
+    Function that returns sorted versions of all database snapshots stored on disk
+
+    :return: List of versions of snapshots (from the oldest to the newest)
+    """
+
+    snap_versions = set()
+
+    for env_name in SNAPSHOT_FILES:
+        c_root, c_ext = os.path.splitext(os.path.join(os.environ["PARENT_PATH"], os.environ[env_name]))
+
+        for c_path in glob.glob(glob.escape(c_root) + ".*" + c_ext):
+            c_match = re.fullmatch(r"\d{8}_\d{6}", c_path[len(c_root) + 1:len(c_path) - len(c_ext)])
+
+            if c_match is not None:
+                snap_versions.add(c_match.group(0))
+
+    return sorted(snap_versions)
+
+
+def remove_old_snapshots(snaps_keep: int) -> None:
+    """
+    Function that removes files of database snapshots older than the published snapshot except the newest ones - files
+    which cannot be removed (e.g. still opened by other processes) are removed during the next call
+
+    :param snaps_keep: Number of the newest snapshots (including the published one) which are not removed
+    :return: The method does not return any values
+    """
+
+    # Kopie nowsze od opublikowanej kopii moga byc wlasnie budowane przez inne procesy, wiec ich nie usuwamy
+    curr_version = get_snapshot_version(False)
+    old_versions = [snap_version for snap_version in get_snapshot_versions() if snap_version <= curr_version]
+
+    for snap_version in old_versions[:-max(snaps_keep, 1)]:
+        if snap_version != curr_version:
+            for snap_path in [get_snapshot_path(env_name, snap_version) for env_name in SNAPSHOT_FILES] + \
+                    get_shard_paths(snap_version):
+                try:
+                    if os.path.isdir(snap_path):
+                        shutil.rmtree(snap_path)
+                    else:
+                        os.remove(snap_path)
+                except FileNotFoundError:
+                    pass
+                except OSError:
+                    logging.warning("Nie udało się usunąć pliku: '" + snap_path + "'")
+
+
+def reopen_snapshot() -> None:
+    """
+    Function that closes connections to the previous database snapshot and clears data read from this snapshot - new
+    connections are opened to the current snapshot
+
+    :return: The method does not return any values
+    """
+
+    SQL_ENGINE.dispose()
+    READ_ENGINE.dispose()
+
+    for shard_engine in SHARD_ENGINES.values():
+        shard_engine.dispose()
+
+    get_sectors_tree.cache_clear()
+    get_shards_meta.cache_clear()
+    get_sekts_shards.cache_clear()
@@ -0,0 +1,384 @@
+""" Module that measures latency and memory allocations of the query paths of the GeocoderPL search engine """
+
+import argparse
+import json
+import re
+import time
+import tracemalloc
+from typing import Any, Optional
+
+from db_classes import BASE, PRG, READ_ENGINE, get_snapshot_path
+from db_queries import DictEncoder, create_dict_views, get_nearest_prg_id, get_prg_info, sync_rtree_tables
+from geo_labels import LabelsCache
+from geo_search import AddrPhrases, AddrSearch, FuzzyIndex, PrefixCache, normalize_text, save_addr_phrases
+from geo_utilities import *
+
+# Slowniki, z ktorych losowane sa syntetyczne punkty adresowe
+BENCH_CITIES = ("WARSZAWA", "KRAKOW", "LODZ", "WROCLAW", "POZNAN", "GDANSK", "SZCZECIN", "BYDGOSZCZ", "LUBLIN",
+                "BIALYSTOK", "KATOWICE", "GDYNIA", "CZESTOCHOWA", "RADOM", "TORUN", "KIELCE", "RZESZOW", "GLIWICE",
+                "ZABRZE", "OLSZTYN", "BIELSKO-BIALA", "BYTOM", "ZIELONA GORA", "RYBNIK", "OPOLE", "ELBLAG", "PLOCK",
+                "WALBRZYCH", "GORZOW WIELKOPOLSKI", "TARNOW")
+BENCH_STREETS = ("MARSZALKOWSKA", "DLUGA", "KROTKA", "POLNA", "LESNA", "SLONECZNA", "OGRODOWA", "LIPOWA", "SZKOLNA",
+                 "KOSCIUSZKI", "MICKIEWICZA", "SIENKIEWICZA", "KOLEJOWA", "PARKOWA", "KWIATOWA", "LAKOWA",
+                 "ZIELONA", "SPORTOWA", "KONOPNICKIEJ", "JANA PAWLA II", "PIASTOWSKA", "RYNEK", "WSPOLNA",
+                 "PIEKNA", "ZLOTA", "NOWY SWIAT", "GRUNWALDZKA", "WOJSKA POLSKIEGO", "DWORCOWA", "MLYNSKA")
+BENCH_FUNCS = ("budynek mieszkalny jednorodzinny", "budynek wielorodzinny", "budynek handlowo-usługowy",
+               "budynek biurowy", "szkoła", "kościół")
+
+
+def create_bench_db(prg_num: int, seed: int) -> None:
+    """
+    Function that fills empty database and address phrases file (paths defined by variables 'DB_PATH' and
+    'ADDRS_PATH') with synthetic PRG points and BDOT10k buildings
+
+    :param prg_num: Number of synthetic PRG points
+    :param seed: Seed of the random numbers generator
+    :return: The method does not return any values
+    """
+
+    addrs_path = get_snapshot_path("ADDRS_PATH")
+
+    if sa.inspect(SQL_ENGINE).has_table("PRG_TABLE") or os.path.exists(addrs_path):
+        raise Exception("Baza danych lub macierz adresów już istnieją - dane syntetyczne można zapisać tylko do " +
+                        "nowych plików wskazanych przez zmienne 'DB_PATH' i 'ADDRS_PATH'!")
+
+    c_rng = np.random.default_rng(seed)
+    perms_dict = get_super_permut_dict(int(os.environ['SUPPERM_MAX']))
+
+    # Losujemy polozenie miast oraz punktow adresowych rozrzuconych wokol nich
+    city_crds = np.column_stack((c_rng.uniform(49.5, 54.3, len(BENCH_CITIES)),
+                                 c_rng.uniform(14.5, 23.5, len(BENCH_CITIES))))
+    city_ids = c_rng.integers(0, len(BENCH_CITIES), prg_num)
+    street_ids = c_rng.integers(0, len(BENCH_STREETS), prg_num)
+    prg_crds = np.round(city_crds[city_ids] + c_rng.normal(0, 0.03, (prg_num, 2)), int(os.environ["COORDS_PREC"]))
+    cell_codes = get_cell_codes(prg_crds[:, 0], prg_crds[:, 1])
+    bubd_flags = c_rng.random(prg_num) < 0.8
+    prg_rows = []
+    bubd_rows = []
+    prg_phrs = []
+    addr_phrs_uniq = ""
+
+    for i in range(prg_num):
+        city = BENCH_CITIES[city_ids[i]]
+        street = BENCH_STREETS[street_ids[i]]
+        numer = str(c_rng.integers(1, 200))
+        kod_pocztowy = str(c_rng.integers(10, 99)) + "-" + str(c_rng.integers(100, 999))
+        bubd_id = len(bubd_rows) + 1 if bubd_flags[i] else 0
+
+        if bubd_flags[i]:
+            lat, lon = prg_crds[i]
+            bubd_poly = [[[lon - 0.0001, lat - 0.0001], [lon + 0.0001, lat - 0.0001], [lon + 0.0001, lat + 0.0001],
+                          [lon - 0.0001, lat + 0.0001], [lon - 0.0001, lat - 0.0001]]]
+            bubd_rows.append({"BDOT10K_BUBD_ID": bubd_id, "KOD_SEKTORA": int(cell_codes[i]),
+                              "KATEGORIA_BUDYNKU": "BUBD", "NAZWA_KARTOGRAFICZNA": "", "STAN_BUDYNKU": "Eksploatowany",
+                              "FUNKCJA_BUDYNKU": BENCH_FUNCS[i % len(BENCH_FUNCS)], "LICZBA_KONDYGNACJI": 2.0,
+                              "CZY_ZABYTEK": 0, "OPIS_BUDYNKU": "", "POWIERZCHNIA": 150.0, "CENTROID_LAT": lat,
+                              "CENTROID_LONG": lon,
+                              "BUBD_GEOJSON": json.dumps({"type": "Polygon", "coordinates": bubd_poly})})
+
+        prg_rows.append({"WOJEWODZTWO": "mazowieckie", "POWIAT": city.lower(), "GMINA": city.title(),
+                         "MIEJSCOWOSC": city.title(), "MIEJSCOWOSC2": "", "ULICA": street.title(), "NUMER": numer,
+                         "KOD_POCZTOWY": kod_pocztowy, "STATUS": "istniejacy", "SZEROKOSC": prg_crds[i, 0],
+                         "DLUGOSC": prg_crds[i, 1], "ZRODLO": "PRG", "CZY_POPRAWNY": 1, "ODLEGLOSC_OD_GMINY": 0.0,
+                         "BDOT10K_BUBD_ID": bubd_id, "ODLEGLOSC_OD_BUDYNKU": 0.0,
+                         "KOD_SEKTORA": 0, "DODATKOWY_OPIS": ""})
+
+        # Tworzymy ciag adresowy punktu w taki sam sposob jak parser PRG
+        uniq_addr, uniq_ids = np.unique(np.asarray([city, street, numer, kod_pocztowy]), return_index=True)
+        addr_arr = uniq_addr[np.argsort(uniq_ids)]
+        prg_phrs.append(" " + " ".join(addr_arr[perms_dict[len(addr_arr)]].tolist()) + " [" + str(i + 1) + "]\n")
+
+        for el in addr_arr:
+            if el not in addr_phrs_uniq:
+                addr_phrs_uniq += el + " "
+
+    BASE.metadata.create_all(SQL_ENGINE)
+    create_dict_views()
+    bubd_enc = DictEncoder(BDOT10K.__table__)
+    prg_enc = DictEncoder(PRG.__table__)
+
+    with SQL_ENGINE.begin() as db_conn:
+        db_conn.execute(UniqPhrs.__table__.insert(), [{"UNIQ_PHRS": addr_phrs_uniq}])
+        db_conn.execute(BDOT10K.__table__.insert(), [bubd_enc.encode_dict(c_row) for c_row in bubd_rows])
+        bubd_enc.save(db_conn)
+
+    # Tak jak podczas budowy bazy danych drzewo sektorow tworzymy po zapisaniu budynkow, a przed zapisaniem punktow PRG
+    create_sectors_tree()
+    sekts_tree = get_sectors_tree()
+    prg_sekts = sekts_tree.get_sectors(prg_crds[:, 0], prg_crds[:, 1])
+    sekt_addr_phrs = np.full(shape=len(sekts_tree), fill_value='', dtype=object)
+
+    for i, c_row in enumerate(prg_rows):
+        c_row["KOD_SEKTORA"] = int(prg_sekts[i])
+        sekt_addr_phrs[prg_sekts[i]] += prg_phrs[i]
+
+    with SQL_ENGINE.begin() as db_conn:
+        db_conn.execute(PRG.__table__.insert(), [prg_enc.encode_dict(c_row) for c_row in prg_rows])
+        prg_enc.save(db_conn)
+
+    sync_rtree_tables()
+    save_addr_phrases(sekt_addr_phrs, addrs_path)
+
+
+def create_bench_corpus(corpus_path: str, queries_num: int, seed: int) -> None:
+    """
+    Function that creates replayable corpus of typed queries and coordinates sampled from PRG points stored in database
+
+    :param corpus_path: Path to the corpus file (JSON lines)
+    :param queries_num: Number of queries of each type
+    :param seed: Seed of the random numbers generator
+    :return: The method does not return any values
+    """
+
+    c_rng = np.random.default_rng(seed)
+
+    with SQL_ENGINE.connect() as db_conn:
+        prg_num = db_conn.execute(sa.select(sa.func.max(PRG.prg_point_id))).scalar()
+
+    prg_rows = get_prg_info(c_rng.choice(np.arange(1, prg_num + 1), min(queries_num, prg_num), replace=False))
+
+    with open(corpus_path, 'w', encoding='utf-8') as file:
+        for i, c_row in enumerate(prg_rows):
+            # Zapytania tekstowe wpisywane sa w roznej kolejnosci, a co czwarte z nich zawiera literowke
+            c_text = c_row[0] + " " + c_row[1] + " " + c_row[2] if i % 2 == 0 else c_row[1] + " " + c_row[2] + ", " + \
+                c_row[0]
+
+            if i % 4 == 3:
+                typo_idx = int(c_rng.integers(1, len(c_text) - 1))
+                c_text = c_text[:typo_idx] + c_text[typo_idx + 1] + c_text[typo_idx] + c_text[typo_idx + 2:]
+
+            file.write(json.dumps({"type": "text", "query": c_text}, ensure_ascii=False) + "\n")
+
+            # Wspolrzedne przesuwamy o kilkadziesiat metrow wzgledem punktu adresowego
+            c_coords = np.round(np.asarray(c_row[8:10], dtype=float) + c_rng.normal(0, 0.0003, 2), 6)
+            file.write(json.dumps({"type": "coords", "query": c_coords.tolist()}) + "\n")
+
+
+def load_bench_corpus(corpus_path: str) -> Tuple[List[str], List[np.ndarray]]:
+    """
+    Function that reads corpus of queries and expands typed queries into sequences of keystrokes
+
+    :param corpus_path: Path to the corpus file (JSON lines)
+    :return:
+        - keys_list (:py:class:`list`) - list of texts after every keystroke of typed queries
+        - crds_list (:py:class:`list`) - list of coordinates of reverse geocoding queries
+    """
+
+    keys_list = []
+    crds_list = []
+
+    with open(corpus_path, 'r', encoding='utf-8') as file:
+        for c_line in file:
+            c_query = json.loads(c_line)
+
+            if c_query["type"] == "text":
+                keys_list += [c_query["query"][:i] for i in range(1, len(c_query["query"]) + 1)]
+            else:
+                crds_list.append(np.asarray(c_query["query"], dtype=float))
+
+    return keys_list, crds_list
+
+
+class QueryPaths(object):
+    """ Class that reproduces query paths of the GUI window without creating any widgets """
+
+    def __init__(self) -> None:
+        """
+        Method that creates objects from a class "QueryPaths"
+
+        :return: The method does not return any values
+        """
+
+        self.c_ptrn = re.compile(os.environ["RE_PATTERN"])
+        self.max_sekts = int(os.environ["MAX_SEKTS"])
+        self.addrs_num = 5
+
+        with READ_ENGINE.connect() as db_conn:
+            self.addr_uniq_words = db_conn.execute(sa.select(UniqPhrs.uniq_phrs).limit(1)).scalar()
+
+        self.addr_phrs = AddrPhrases(get_snapshot_path("ADDRS_PATH"))
+        self.sekts_tree = get_sectors_tree()
+        self.start_sekt = int(self.sekts_tree.get_sectors(float(os.environ["START_LAT"]),
+                                                          float(os.environ["START_LONG"])))
+        self.prefix_cache = PrefixCache(int(os.environ["PREFIX_CACHE_SIZE"]), int(os.environ["PREFIX_CACHE_LINES"]))
+        self.fuzzy_index = FuzzyIndex(self.addr_uniq_words, int(os.environ["FUZZY_MAX_DIST"]),
+                                      int(os.environ["FUZZY_MAX_CANDS"]))
+        self.fuzzy_index.build_index()
+        self.addr_search = None
+        self.labels_cache = None
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Method that restores initial order of sectors and clears caches of search results and descriptions of PRG
+        points
+
+        :return: The method does not return any values
+        """
+
+        self.prefix_cache.clear()
+        self.addr_search = AddrSearch(self.addr_phrs, self.addr_uniq_words, self.sekts_tree.sekts_bounds,
+                                      self.start_sekt, self.max_sekts, self.prefix_cache, self.fuzzy_index, self.c_ptrn)
+        self.reset_labels()
+
+    def reset_labels(self) -> None:
+        """
+        Method that clears cache of descriptions of PRG points, so descriptions and popups are read again from the
+        database
+
+        :return: The method does not return any values
+        """
+
+        self.labels_cache = LabelsCache(int(os.environ["LABELS_CACHE_SIZE"]))
+
+    def text_changed(self, start_text: str) -> List[str]:
+        """
+        Method that reproduces keystroke path of the GUI window (method "search_text" without time limit of the search)
+
+        :param start_text: Text typed by the user
+        :return: List of descriptions of suggested PRG points
+        """
+
+        search_ids = self.addr_search.search_text(start_text, *normalize_text(start_text), self.addrs_num)
+
+        if search_ids is None or not search_ids[0]:
+            return []
+
+        return [prg_point[0] for prg_point in self.labels_cache.get_points(search_ids[0]).values()]
+
+    def coords_selected(self, c_coords: np.ndarray) -> Optional[int]:
+        """
+        Method that reproduces reverse geocoding path of the GUI window (coordinates branch of "on_text_selected")
+
+        :param c_coords: Numpy array containing latitude and longitude
+        :return: Index of the closest PRG point or None
+        """
+
+        c_sekt = int(self.sekts_tree.get_sectors(*c_coords))
+        prg_id = get_nearest_prg_id(c_coords)
+
+        if prg_id is not None:
+            self.addr_search.change_sekts_order(c_sekt)
+            self.labels_cache.get_popup(prg_id)
+
+        return prg_id
+
+    def popup_fetched(self, prg_id: int) -> Optional[Tuple[float, float, str, str]]:
+        """
+        Method that reproduces selection of the suggestion in the GUI window - popup of PRG point is read from the
+        database, unless it has been already read in the same repetition
+
+        :param prg_id: Index of PRG point
+        :return: Coordinates, popup and GeoJSON shape of the building of PRG point
+        """
+
+        return self.labels_cache.get_popup(prg_id)
+
+
+def measure_path(path_func: Callable, path_args: List[Any], repeats: int,
+                 reset_func: Optional[Callable] = None) -> Dict[str, float]:
+    """
+    Function that measures latency and memory allocations of subsequent calls of a given query path
+
+    :param path_func: Function implementing query path
+    :param path_args: List of arguments of subsequent calls
+    :param repeats: Number of repetitions of the whole list of calls
+    :param reset_func: Function restoring initial state before every repetition (or None)
+    :return: Dictionary containing statistics of latency (in milliseconds) and allocations (in kilobytes)
+    """
+
+    lat_list = []
+    alloc_list = []
+
+    for _ in range(repeats):
+        if reset_func is not None:
+            reset_func()
+
+        for c_arg in path_args:
+            s_time = time.perf_counter()
+            path_func(c_arg)
+            lat_list.append((time.perf_counter() - s_time) * 1000)
+
+    # Alokacje mierzymy w osobnym przebiegu, bo sledzenie pamieci spowalnia wykonywanie kodu
+    if reset_func is not None:
+        reset_func()
+
+    tracemalloc.start()
+
+    for c_arg in path_args:
+        tracemalloc.clear_traces()
+        path_func(c_arg)
+        alloc_list.append(tracemalloc.get_traced_memory()[1] / 1024)
+
+    tracemalloc.stop()
+    lat_arr = np.asarray(lat_list) if lat_list else np.zeros(1)
+    alloc_arr = np.asarray(alloc_list) if alloc_list else np.zeros(1)
+    return {"calls": len(lat_list), "p50_ms": np.percentile(lat_arr, 50), "p95_ms": np.percentile(lat_arr, 95),
+            "p99_ms": np.percentile(lat_arr, 99), "max_ms": lat_arr.max(), "mean_peak_kb": alloc_arr.mean(),
+            "p99_peak_kb": np.percentile(alloc_arr, 99)}
+
+
+def run_benchmarks(corpus_path: str, repeats: int) -> Dict[str, Dict[str, float]]:
+    """
+    Function that measures all query paths for a given corpus of queries
+
+    :param corpus_path: Path to the corpus file (JSON lines)
+    :param repeats: Number of repetitions of the corpus
+    :return: Dictionary containing statistics of every query path
+    """
+
+    keys_list, crds_list = load_bench_corpus(corpus_path)
+    query_paths = QueryPaths()
+    prg_ids = [prg_id for prg_id in (query_paths.coords_selected(c_crds) for c_crds in crds_list) if prg_id is not None]
+    bench_res = OrderedDict()
+    bench_res["on_text_changed"] = measure_path(query_paths.text_changed, keys_list, repeats, query_paths.reset)
+    bench_res["on_text_selected_coords"] = measure_path(query_paths.coords_selected, crds_list, repeats,
+                                                        query_paths.reset)
+    bench_res["popup_fetch"] = measure_path(query_paths.popup_fetched, prg_ids, repeats, query_paths.reset_labels)
+    return bench_res
+
+
+def print_bench_results(bench_res: Dict[str, Dict[str, float]]) -> None:
+    """
+    Function that prints table of benchmark results
+
+    :param bench_res: Dictionary containing statistics of every query path
+    :return: The method does not return any values
+    """
+
+    stat_names = ("calls", "p50_ms", "p95_ms", "p99_ms", "max_ms", "mean_peak_kb", "p99_peak_kb")
+    print("{:<26}".format("path") + "".join(["{:>14}".format(name) for name in stat_names]))
+
+    for path_name, path_stats in bench_res.items():
+        print("{:<26}".format(path_name) + "".join(["{:>14.3f}".format(path_stats[name]) if name != "calls" else
+                                                   "{:>14d}".format(path_stats[name]) for name in stat_names]))
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Benchmark ścieżek zapytań wyszukiwarki GeocoderPL. Baza " +
+                                                     "danych i macierz adresów wskazywane są przez zmienne 'DB_PATH' " +
+                                                     "i 'ADDRS_PATH' (zmienne środowiskowe mają pierwszeństwo przed " +
+                                                     "plikiem .env).")
+    arg_parser.add_argument("--synthetic", type=int, default=0, metavar="PRG_NUM",
+                            help="utwórz syntetyczną bazę danych z podaną liczbą punktów adresowych")
+    bench_corpus = os.path.join(os.environ["PARENT_PATH"], os.environ["BENCH_CORPUS_PATH"])
+    arg_parser.add_argument("--corpus", default=bench_corpus,
+                            help="ścieżka do pliku z zapytaniami (tworzony, jeżeli nie istnieje)")
+    arg_parser.add_argument("--queries", type=int, default=200, help="liczba zapytań w tworzonym pliku z zapytaniami")
+    arg_parser.add_argument("--repeats", type=int, default=3, help="liczba powtórzeń pliku z zapytaniami")
+    arg_parser.add_argument("--seed", type=int, default=2022, help="ziarno generatora liczb losowych")
+    arg_parser.add_argument("--output", default="", help="ścieżka do pliku JSON z wynikami")
+    bench_args = arg_parser.parse_args()
+
+    if bench_args.synthetic > 0:
+        create_bench_db(bench_args.synthetic, bench_args.seed)
+
+    if not os.path.exists(bench_args.corpus):
+        create_bench_corpus(bench_args.corpus, bench_args.queries, bench_args.seed)
+
+    fin_res = run_benchmarks(bench_args.corpus, bench_args.repeats)
+    print_bench_results(fin_res)
+
+    if bench_args.output != "":
+        with open(bench_args.output, 'w') as f:
+            json.dump(fin_res, f, indent=4, default=float)
@@ -2,19 +2,506 @@
 
 import io
 import json
-import pickle
-import struct
-from itertools import cycle
+from typing import Optional
 
 import folium
+from branca.element import MacroElement
+from jinja2 import Template
 from PyQt5 import QtWidgets, QtCore
-from PyQt5.QtGui import QIcon, QPixmap
+from PyQt5.QtGui import QCloseEvent, QFont, QIcon, QKeySequence, QPaintEvent, QPixmap
 from PyQt5.QtWebEngineWidgets import QWebEngineView
 from folium.plugins import MousePosition
 
-from db_classes import PRG
+from db_classes import READ_ENGINE, get_snapshot_path, get_snapshot_version
+from db_queries import get_nearest_prg_id, get_prg_gmina, get_prg_info
+from db_snapshots import reopen_snapshot
+from geo_labels import LabelsCache
+from geo_stats import LatencyStats
+from geo_search import PART_IDX, AddrPhrases, AddrSearch, FuzzyIndex, PrefixCache, normalize_text
+from geo_tiles import TileCache, encode_points, start_tile_server
 from geo_utilities import *
 
+# Definiujemy style listy podpowiedzi dla znalezionych adresow i dla komunikatow
+NORMAL_STYLE = "font-size: 20px; font-style: normal; color: black;"
+INFO_STYLE = "font-size: 18px; font-style: italic; color: gray;"
+
+
+class MapBridge(MacroElement):
+    """ Class that adds to the folium map JavaScript functions changing content of the map without reloading it """
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            var geo_marker_layer = L.featureGroup().addTo({{ this._parent.get_name() }});
+            var geo_bubd_layer = L.featureGroup().addTo({{ this._parent.get_name() }});
+
+            function geoSetView(c_lat, c_long, c_zoom) {
+                {{ this._parent.get_name() }}.setView([c_lat, c_long], c_zoom);
+            }
+
+            function geoSetMarker(c_lat, c_long, popup_html, popup_width) {
+                var c_icon = L.AwesomeMarkers.icon({icon: "globe", markerColor: "red", iconColor: "white",
+                                                    prefix: "glyphicon"});
+                geo_marker_layer.clearLayers();
+                L.marker([c_lat, c_long], {icon: c_icon}).bindPopup(popup_html, {maxWidth: popup_width})
+                    .addTo(geo_marker_layer);
+            }
+
+            function geoSetBuilding(bubd_geojson) {
+                geo_bubd_layer.clearLayers();
+
+                if (bubd_geojson !== null) {
+                    L.geoJSON(bubd_geojson, {style: {fillColor: "orange", fillOpacity: 0.5, color: "red"}})
+                        .addTo(geo_bubd_layer);
+                }
+            }
+        {% endmacro %}
+        """)
+
+    def __init__(self) -> None:
+        """
+        Method that creates objects from a class "MapBridge"
+
+        :return: The method does not return any values
+        """
+
+        super().__init__()
+        self._name = "MapBridge"
+
+
+class BuildingsLayer(folium.map.Layer):
+    """
+    Class that adds to the folium map layer of outlines of BDOT10k buildings read from the local server of GeoJSON map
+    tiles - outlines of a tile are drawn on a common canvas when the tile appears in the viewport and removed when the
+    tile leaves the viewport
+    """
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = L.gridLayer({minZoom: {{ this.min_zoom }}, maxZoom: 22});
+            var {{ this.get_name() }}_tiles = {};
+            var {{ this.get_name() }}_canvas = L.canvas({padding: 0.5});
+
+            {{ this.get_name() }}.createTile = function(coords) {
+                var c_key = coords.z + "/" + coords.x + "/" + coords.y;
+                var c_tile = {geojson: null};
+                {{ this.get_name() }}_tiles[c_key] = c_tile;
+
+                fetch("{{ this.tiles_url }}/" + c_key + ".geojson")
+                    .then(function(c_resp) { return c_resp.json(); })
+                    .then(function(c_json) {
+                        if ({{ this.get_name() }}_tiles[c_key] === c_tile && {{ this.get_name() }}._map) {
+                            c_tile.geojson = L.geoJSON(c_json, {renderer: {{ this.get_name() }}_canvas,
+                                style: {color: "#555555", weight: 1, fillColor: "#999999", fillOpacity: 0.3}})
+                                .addTo({{ this.get_name() }}._map);
+                        }
+                    })
+                    .catch(function() {});
+
+                return document.createElement("div");
+            };
+
+            {{ this.get_name() }}.on("tileunload", function(c_event) {
+                var c_key = c_event.coords.z + "/" + c_event.coords.x + "/" + c_event.coords.y;
+                var c_tile = {{ this.get_name() }}_tiles[c_key];
+
+                if (c_tile !== undefined) {
+                    delete {{ this.get_name() }}_tiles[c_key];
+
+                    if (c_tile.geojson !== null) {
+                        c_tile.geojson.remove();
+                    }
+                }
+            });
+        {% endmacro %}
+        """)
+
+    def __init__(self, tiles_url: str, min_zoom: int) -> None:
+        """
+        Method that creates objects from a class "BuildingsLayer"
+
+        :param tiles_url: Address of the server of map tiles with outlines of buildings
+        :param min_zoom: Minimum zoom level of the map on which outlines of buildings are shown
+        :return: The method does not return any values
+        """
+
+        super().__init__(name="Budynki BDOT10k", overlay=True, control=True)
+        self._name = "BuildingsLayer"
+        self.tiles_url = tiles_url
+        self.min_zoom = min_zoom
+
+
+class PointsLayer(folium.map.Layer):
+    """
+    Class that adds to the folium map layer of large sets of points (e.g. all PRG points in a municipality) - points are
+    sent to the map page as typed arrays sorted by longitude and drawn on canvas map tiles, where only one point is
+    drawn in every cell of a few pixels, so dense sets of points are drawn quickly. Popup of the clicked point is read
+    from the local server only after the click
+    """
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = L.gridLayer({pane: "overlayPane", maxZoom: 22});
+            var {{ this.get_name() }}_pts = {lats: new Float32Array(0), longs: new Float32Array(0),
+                                             ids: new Uint32Array(0)};
+
+            // Funkcje "_first" i "_scan" odpowiadaja funkcji "scan_points" modulu "geo_tiles"
+            function {{ this.get_name() }}_first(c_long) {
+                var c_longs = {{ this.get_name() }}_pts.longs;
+                var c_low = 0, c_high = c_longs.length;
+
+                while (c_low < c_high) {
+                    var c_mid = (c_low + c_high) >> 1;
+
+                    if (c_longs[c_mid] < c_long) {
+                        c_low = c_mid + 1;
+                    } else {
+                        c_high = c_mid;
+                    }
+                }
+
+                return c_low;
+            }
+
+            function {{ this.get_name() }}_scan(c_sw, c_ne, c_func) {
+                var c_pts = {{ this.get_name() }}_pts;
+
+                for (var i = {{ this.get_name() }}_first(c_sw.lng); i < c_pts.longs.length &&
+                     c_pts.longs[i] <= c_ne.lng; i++) {
+                    if (c_pts.lats[i] >= c_sw.lat && c_pts.lats[i] <= c_ne.lat) {
+                        c_func(c_pts.lats[i], c_pts.longs[i], c_pts.ids[i]);
+                    }
+                }
+            }
+
+            {{ this.get_name() }}.createTile = function(coords) {
+                var c_tile = document.createElement("canvas");
+                var c_size = this.getTileSize();
+                var c_rad = {{ this.point_radius }};
+                var c_map = this._map;
+                var c_nw = coords.scaleBy(c_size);
+                var c_ctx = c_tile.getContext("2d");
+                var c_cells = {};
+                c_tile.width = c_size.x;
+                c_tile.height = c_size.y;
+                c_ctx.fillStyle = "{{ this.point_color }}";
+                c_ctx.strokeStyle = "white";
+
+                {{ this.get_name() }}_scan(c_map.unproject(c_nw.add([-c_rad, c_size.y + c_rad]), coords.z),
+                                           c_map.unproject(c_nw.add([c_size.x + c_rad, -c_rad]), coords.z),
+                                           function(c_lat, c_long, c_id) {
+                    var c_px = c_map.project([c_lat, c_long], coords.z).subtract(c_nw);
+                    var c_cell = Math.round(c_px.x / c_rad) + "_" + Math.round(c_px.y / c_rad);
+
+                    if (c_cells[c_cell] === undefined) {
+                        c_cells[c_cell] = true;
+                        c_ctx.beginPath();
+                        c_ctx.arc(c_px.x, c_px.y, c_rad, 0, 2 * Math.PI);
+                        c_ctx.fill();
+                        c_ctx.stroke();
+                    }
+                });
+
+                return c_tile;
+            };
+
+            {{ this._parent.get_name() }}.on("click", function(c_event) {
+                var c_map = {{ this._parent.get_name() }};
+
+                if (!c_map.hasLayer({{ this.get_name() }})) {
+                    return;
+                }
+
+                var c_px = c_map.latLngToContainerPoint(c_event.latlng);
+                var c_rad = {{ this.point_radius }} + 2;
+                var c_best = null, c_dist = Infinity;
+
+                {{ this.get_name() }}_scan(c_map.containerPointToLatLng(c_px.add([-c_rad, c_rad])),
+                                           c_map.containerPointToLatLng(c_px.add([c_rad, -c_rad])),
+                                           function(c_lat, c_long, c_id) {
+                    var c_pt_dist = c_px.distanceTo(c_map.latLngToContainerPoint([c_lat, c_long]));
+
+                    if (c_pt_dist < c_dist) {
+                        c_best = c_id;
+                        c_dist = c_pt_dist;
+                    }
+                });
+
+                if (c_best === null) {
+                    return;
+                }
+
+                fetch("{{ this.popup_url }}/" + c_best)
+                    .then(function(c_resp) { return c_resp.json(); })
+                    .then(function(c_json) {
+                        geoSetBuilding(c_json.building);
+                        geoSetMarker(c_json.lat, c_json.long, c_json.popup, 470);
+                        geo_marker_layer.eachLayer(function(c_marker) { c_marker.openPopup(); });
+                    })
+                    .catch(function() {});
+            });
+
+            function geoSetPoints(pts_b64) {
+                var c_bytes = Uint8Array.from(atob(pts_b64), function(c_char) { return c_char.charCodeAt(0); });
+                var c_num = c_bytes.length / 12;
+                var c_pts = {lats: new Float32Array(c_bytes.buffer, 0, c_num),
+                             longs: new Float32Array(c_bytes.buffer, 4 * c_num, c_num),
+                             ids: new Uint32Array(c_bytes.buffer, 8 * c_num, c_num)};
+                var c_map = {{ this._parent.get_name() }};
+                {{ this.get_name() }}_pts = c_pts;
+
+                if (!c_map.hasLayer({{ this.get_name() }})) {
+                    {{ this.get_name() }}.addTo(c_map);
+                }
+
+                {{ this.get_name() }}.redraw();
+
+                if (c_num > 0) {
+                    var c_min = Infinity, c_max = -Infinity;
+
+                    for (var i = 0; i < c_num; i++) {
+                        c_min = Math.min(c_min, c_pts.lats[i]);
+                        c_max = Math.max(c_max, c_pts.lats[i]);
+                    }
+
+                    c_map.fitBounds([[c_min, c_pts.longs[0]], [c_max, c_pts.longs[c_num - 1]]]);
+                }
+            }
+        {% endmacro %}
+        """)
+
+    def __init__(self, popup_url: str, point_radius: int = 4, point_color: str = "#d62728") -> None:
+        """
+        Method that creates objects from a class "PointsLayer"
+
+        :param popup_url: Address of the server of popups of PRG points
+        :param point_radius: Radius of drawn points (in pixels)
+        :param point_color: Colour of drawn points
+        :return: The method does not return any values
+        """
+
+        super().__init__(name="Punkty adresowe", overlay=True, control=True)
+        self._name = "PointsLayer"
+        self.popup_url = popup_url
+        self.point_radius = point_radius
+        self.point_color = point_color
+
+
+class SearchSignals(QtCore.QObject):
+    """ Class that defines signals sent by search workers to the GUI window """
+
+    finished = QtCore.pyqtSignal(int, object)
+    loaded = QtCore.pyqtSignal(object)
+    points = QtCore.pyqtSignal(object)
+    nearest = QtCore.pyqtSignal(object, object)
+
+
+class SnapshotData(object):
+    """
+    Class that keeps search structures of a single database snapshot - the GUI window replaces the whole object at once,
+    so threads reading these structures never see structures of two different snapshots
+    """
+
+    def __init__(self, snap_version: str, addr_search: AddrSearch, labels_cache: LabelsCache,
+                 sekts_tree: SectorsTree) -> None:
+        """
+        Method that creates objects from a class "SnapshotData"
+
+        :param snap_version: Version of the database snapshot
+        :param addr_search: Search of address phrases of the snapshot
+        :param labels_cache: Object keeping in memory descriptions and popups of PRG points of the snapshot
+        :param sekts_tree: Quadtree of sectors of the snapshot
+        :return: The method does not return any values
+        """
+
+        self.snap_version = snap_version
+        self.addr_search = addr_search
+        self.labels_cache = labels_cache
+        self.sekts_tree = sekts_tree
+
+
+class SearchWorker(QtCore.QRunnable):
+    """ Class that searches for address points matching text typed in the GUI window outside of the main thread """
+
+    def __init__(self, geo_gui: "MyGeoGUI", query_id: int, start_text: str) -> None:
+        """
+        Method that creates objects from a class "SearchWorker"
+
+        :param geo_gui: GUI window
+        :param query_id: Index of the query (queries are numbered in order of typing)
+        :param start_text: Text typed in the GUI window
+        :return: The method does not return any values
+        """
+
+        super().__init__()
+        self.geo_gui = geo_gui
+        self.query_id = query_id
+        self.start_text = start_text
+
+    def run(self) -> None:
+        """
+        Method that searches for address points and sends results to the GUI window - search is executed in steps
+        limited by SEARCH_BUDGET milliseconds, results found so far are sent after every step in which they changed,
+        and next steps are skipped when the query becomes outdated
+
+        :return: The method does not return any values
+        """
+
+        prev_res = None
+
+        while self.query_id == self.geo_gui.query_id:
+            search_res, part_flag = self.geo_gui.search_text(self.start_text,
+                                                             time.perf_counter() + self.geo_gui.search_budget)
+
+            if search_res != prev_res or not part_flag:
+                self.geo_gui.search_signals.finished.emit(self.query_id, search_res)
+                prev_res = search_res
+
+            if not part_flag:
+                break
+
+
+class LoadWorker(QtCore.QRunnable):
+    """ Class that reads data of the database snapshot used by the search outside of the main thread """
+
+    def __init__(self, geo_gui: "MyGeoGUI", reopen_flag: bool) -> None:
+        """
+        Method that creates objects from a class "LoadWorker"
+
+        :param geo_gui: GUI window
+        :param reopen_flag: Flag indicating if connections to the previous database snapshot should be closed
+        :return: The method does not return any values
+        """
+
+        super().__init__()
+        self.geo_gui = geo_gui
+        self.reopen_flag = reopen_flag
+
+    def run(self) -> None:
+        """
+        Method that reads data of the current database snapshot and sends them to the GUI window, which starts using
+        them - searches started earlier are finished before reading of the data, because the search pool has only one
+        thread
+
+        :return: The method does not return any values
+        """
+
+        if self.reopen_flag:
+            reopen_snapshot()
+
+        self.geo_gui.search_signals.loaded.emit(self.geo_gui.load_snapshot())
+
+
+class PointsWorker(QtCore.QRunnable):
+    """ Class that reads PRG points shown on the map outside of the main thread """
+
+    def __init__(self, geo_gui: "MyGeoGUI", prg_id: int) -> None:
+        """
+        Method that creates objects from a class "PointsWorker"
+
+        :param geo_gui: GUI window
+        :param prg_id: Index of PRG point located in the municipality whose PRG points are shown on the map
+        :return: The method does not return any values
+        """
+
+        super().__init__()
+        self.geo_gui = geo_gui
+        self.prg_id = prg_id
+
+    def run(self) -> None:
+        """
+        Method that reads PRG points of the municipality and sends them to the GUI window
+
+        :return: The method does not return any values
+        """
+
+        self.geo_gui.search_signals.points.emit(self.geo_gui.get_gmina_points(self.prg_id))
+
+
+class NearestWorker(QtCore.QRunnable):
+    """ Class that finds PRG point nearest to coordinates typed by the user outside of the main thread """
+
+    def __init__(self, geo_gui: "MyGeoGUI", snap_data: SnapshotData, c_coords: np.ndarray) -> None:
+        """
+        Method that creates objects from a class "NearestWorker"
+
+        :param geo_gui: GUI window
+        :param snap_data: Search structures of the database snapshot
+        :param c_coords: Numpy array containing latitude and longitude
+        :return: The method does not return any values
+        """
+
+        super().__init__()
+        self.geo_gui = geo_gui
+        self.snap_data = snap_data
+        self.c_coords = c_coords
+
+    def run(self) -> None:
+        """
+        Method that finds the nearest PRG point, reads its popup and centres order of sectors on the sector of given
+        coordinates - order of sectors is changed only by the search pool, because the search pool has only one thread
+        and searches never run at the same time as the change
+
+        :return: The method does not return any values
+        """
+
+        c_sekt = int(self.snap_data.sekts_tree.get_sectors(*self.c_coords))
+        prg_id = get_nearest_prg_id(self.c_coords)
+
+        if prg_id is not None:
+            self.snap_data.labels_cache.get_popup(prg_id)
+            self.snap_data.addr_search.change_sekts_order(c_sekt)
+
+        self.geo_gui.search_signals.nearest.emit(self.snap_data, prg_id)
+
+
+class CloseWorker(QtCore.QRunnable):
+    """ Class that closes address phrases of the previous database snapshot outside of the main thread """
+
+    def __init__(self, addr_phrs: AddrPhrases) -> None:
+        """
+        Method that creates objects from a class "CloseWorker"
+
+        :param addr_phrs: Memory-mapped address phrases of the previous database snapshot
+        :return: The method does not return any values
+        """
+
+        super().__init__()
+        self.addr_phrs = addr_phrs
+
+    def run(self) -> None:
+        """
+        Method that closes address phrases - searches of the previous database snapshot are finished before, because
+        the search pool has only one thread
+
+        :return: The method does not return any values
+        """
+
+        self.addr_phrs.close()
+
+
+class TilesWorker(QtCore.QRunnable):
+    """ Class that reads files of map tiles cached by previous runs of the application outside of the main thread """
+
+    def __init__(self, tile_cache: TileCache) -> None:
+        """
+        Method that creates objects from a class "TilesWorker"
+
+        :param tile_cache: Cache of map tiles of the local tile server
+        :return: The method does not return any values
+        """
+
+        super().__init__()
+        self.tile_cache = tile_cache
+
+    def run(self) -> None:
+        """
+        Method that restores order of using of cached tiles - tile server serves tiles also during reading of files
+
+        :return: The method does not return any values
+        """
+
+        self.tile_cache.load_tiles()
+
 
 class MyGeoGUI(QtWidgets.QWidget):
     """ Class that creates GUI window """
@@ -29,23 +516,8 @@ class MyGeoGUI(QtWidgets.QWidget):
         # Ustalamy patern przeszukiwania
         super().__init__()
         self.c_ptrn = re.compile(os.environ["RE_PATTERN"])
-        self.sekt_num = int(os.environ["SEKT_NUM"])
         self.max_sekts = int(os.environ["MAX_SEKTS"])
 
-        # Pobieramy z bazy danych unikalne ciagi znakow i adressy
-        with sa.orm.Session(SQL_ENGINE) as db_session:
-            self.addr_uniq_words = db_session.query(UniqPhrs.uniq_phrs).all()[0][0]
-
-        addr_arr_path = os.path.join(os.environ["PARENT_PATH"], os.environ['ADDRS_PATH'])
-
-        try:
-            with open(addr_arr_path, 'rb') as file:
-                self.addr_arr = pickle.load(file)
-
-        except FileNotFoundError:
-            raise Exception("Pod podanym adresem: '" + addr_arr_path + "' nie ma pliku z macierzą adresów. Uzupełnij " +
-                            "ten plik i uruchom program ponownie!")
-
         # Ustalamy najważniejsze parametry okna mapy
         self.setWindowTitle("GeocoderPL")
         icon_path = os.environ["ICON_PATH"]
@@ -61,13 +533,7 @@ class MyGeoGUI(QtWidgets.QWidget):
         self.map_layout = QtWidgets.QVBoxLayout()
         self.map_layout.setContentsMargins(0, 0, 0, 0)  # Usuwamy marginesy pomiedzy mapa a oknem
         self.setLayout(self.map_layout)
-        self.na_strings = ("", "brak numeru rejestru zabytków", ".")
         self.prev_kol = [0, 1, 2]
-        self.inf_names = ["<b>Miejscowość: </b>", "<b>Ulica: </b>", "<b>Numer budynku: </b>", "<b>Kod pocztowy: </b>",
-                          "<b>Gmina: </b>", "<b>Powiat: </b>", "<b>Województwo: </b>"]
-        self.bubd_names = ["<b>Kategoria budynku: </b>", "<b>Nazwa kartograficzna: </b>", "<b>Stan budynku: </b>",
-                           "<b>Funkcja budynku: </b>", "<b>Liczba kondygnacji: </b>", "<b>Zabytek: </b>",
-                           "<b>Szacunkowa powierzchnia: </b>"]
         self.res_coords = {}
         self.start_coords = np.asarray((float(os.environ["START_LAT"]), float(os.environ["START_LONG"])))
         self.c_map = folium.Map(title="GEO PYTHON", zoom_start=19, location=self.start_coords, control_scale=True,
@@ -79,9 +545,21 @@ class MyGeoGUI(QtWidgets.QWidget):
                                    lng_formatter=form_lng)
         self.m_pos.add_to(self.c_map)
 
-        # Dodajemy warstwy do mapy
+        # Uruchamiamy lokalny serwer kafelkow z obrysami budynkow i podkladem mapy dostepnym bez dostepu do sieci -
+        # pliki kafelkow zapisane w poprzednich uruchomieniach odczytujemy dopiero po wyswietleniu okna
+        self.tile_server = start_tile_server()
+        tiles_url = "http://127.0.0.1:" + str(self.tile_server.server_address[1])
+        basemap_tiles = self.tile_server.basemap_tiles
+
+        # Dodajemy warstwy do mapy - jesli istnieje lokalny podklad mapy, to zdalne podklady sa domyslnie ukryte
+        if basemap_tiles is not None:
+            self.local_map = folium.TileLayer(tiles=tiles_url + "/basemap/{z}/{x}/{y}", attr="GeocoderPL",
+                                              name='Mapa offline', overlay=True, control=True, max_zoom=22,
+                                              max_native_zoom=int(basemap_tiles.tiles_meta.get("maxzoom", 19)))
+            self.local_map.add_to(self.c_map)
+
         self.st_map = folium.TileLayer(tiles='http://tile.stamen.com/toner/{z}/{x}/{y}.png', attr="toner-bcg",
-                                       name='Stamen Toner', overlay=True, control=True)
+                                       name='Stamen Toner', overlay=True, control=True, show=basemap_tiles is None)
         self.st_map.add_to(self.c_map)
         self.os_map = folium.TileLayer(tiles='OpenStreetMap', name='OpenStreetMap', overlay=True, control=True,
                                        show=False)
@@ -90,8 +568,17 @@ class MyGeoGUI(QtWidgets.QWidget):
                                         name='Google Satellite', overlay=True, control=True,
                                         show=False)
         self.gog_map.add_to(self.c_map)
+
+        # Obrysy budynkow w widocznym obszarze mapy pobieramy z lokalnego serwera kafelkow
+        BuildingsLayer(tiles_url + "/bubd", int(os.environ["TILES_MIN_ZOOM"])).add_to(self.c_map)
+
+        # Duze zbiory punktow adresowych rysujemy na kafelkach canvas, a ich opisy pobieramy dopiero po kliknieciu
+        PointsLayer(tiles_url + "/popup").add_to(self.c_map)
         self.c_map.add_child(folium.LayerControl())
 
+        # Dodajemy do mapy funkcje JavaScript, przez ktore zmieniamy zawartosc mapy bez ponownego wczytywania strony
+        MapBridge().add_to(self.c_map)
+
         # Dodajemy wyszukiwarke
         ne_layout = QtWidgets.QHBoxLayout()
         label = QtWidgets.QLabel("Wyszukiwarka: ")
@@ -121,320 +608,473 @@ class MyGeoGUI(QtWidgets.QWidget):
         # Wywołujemy funkcję za każdym razem gdy tekst w oknie qLineEdit zmieni sie tekst
         self.line_edit.textChanged.connect(self.on_text_changed)
 
+        # Wyszukiwanie uruchamiamy dopiero po przerwie w pisaniu, w osobnym watku - watek wykonuje zapytania po kolei,
+        # bo wspoldzieli z nimi pamiec podreczna wynikow wyszukiwania
+        self.query_id = 0
+        self.search_timer = QtCore.QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(int(os.environ["SEARCH_DEBOUNCE"]))
+        self.search_timer.timeout.connect(self.start_search)
+        self.search_budget = float(os.environ["SEARCH_BUDGET"]) / 1000
+        self.search_pool = QtCore.QThreadPool(self)
+        self.search_pool.setMaxThreadCount(1)
+        self.search_signals = SearchSignals()
+        self.search_signals.finished.connect(self.on_search_finished)
+        self.search_signals.loaded.connect(self.on_snapshot_loaded)
+        self.search_signals.points.connect(self.on_points_loaded)
+        self.search_signals.nearest.connect(self.on_nearest_found)
+
         # Wywołujemy funkcję za każdym razem gdy wciśnięty zostanie klawisz "Enter" lub "Return"
         self.line_edit.returnPressed.connect(self.on_text_selected)
 
         # Parametryzujemy layout
         ne_layout.setContentsMargins(50, 10, 50, 10)
         ne_layout.addWidget(self.line_edit)
+
+        # Dodajemy przycisk wyswietlajacy na mapie wszystkie punkty adresowe gminy wybranego punktu adresowego
+        self.points_button = QtWidgets.QPushButton("Punkty gminy")
+        self.points_button.setStyleSheet("background-color: rgb(255, 255, 255); font-size: 18px;")
+        self.points_button.clicked.connect(self.show_gmina_points)
+        ne_layout.addWidget(self.points_button)
         self.map_layout.addLayout(ne_layout)
 
-        # Ustalamy indeksy sektorow zgodnie z algorytmem spirali
-        self.c_sekt = get_sector_codes(*self.start_coords)
-        self.spiral_ids_arr = np.zeros(((2 * self.sekt_num - 1) ** 2, 2), dtype=np.int16)
-        self.prev_val = tuple()
-        get_addr_spiral_ids(self.sekt_num, self.spiral_ids_arr)
-        c_inds_spiral = self.spiral_ids_arr + self.c_sekt
-        c_inds = c_inds_spiral[np.logical_and((c_inds_spiral >= 0).prod(1), (c_inds_spiral < self.sekt_num).prod(1))]
+        # Mierzymy czasy wykonania etapow wyszukiwania - statystyki wyswietlamy w ukrytym panelu diagnostycznym
+        # (skrot Ctrl+Shift+D) i zapisujemy do pliku przy zamknieciu okna
+        self.latency_stats = LatencyStats(int(os.environ["STATS_WINDOW"]))
+        self.key_time = None
+        self.stats_panel = QtWidgets.QPlainTextEdit()
+        self.stats_panel.setReadOnly(True)
+        self.stats_panel.setFont(QFont("Courier New", 10))
+        self.stats_panel.setMaximumHeight(150)
+        self.stats_panel.hide()
+        self.map_layout.addWidget(self.stats_panel)
+        self.stats_timer = QtCore.QTimer(self)
+        self.stats_timer.timeout.connect(self.update_stats_panel)
+        self.stats_shortcut = QtWidgets.QShortcut(QKeySequence("Ctrl+Shift+D"), self)
+        self.stats_shortcut.activated.connect(self.toggle_stats_panel)
+
+        # Dane opublikowanej kopii bazy danych wczytujemy dopiero po pierwszym wyswietleniu okna
+        self.prev_val = None
+        self.snap_data = None
+        self.snap_version = None
+        self.start_time = time.time()
+        self.paint_flag = False
+
+        # Cyklicznie sprawdzamy czy opublikowana zostala nowa kopia bazy danych
+        self.snap_timer = QtCore.QTimer(self)
+        self.snap_timer.timeout.connect(self.check_snapshot)
+        self.snap_timer.start(int(float(os.environ["SNAPSHOT_CHECK"]) * 1000))
+
+        # Dodajemy widget mapy - strona mapy wczytywana jest tylko raz, a pozniej zmieniamy ja funkcjami JavaScript
+        self.web_view = QWebEngineView()
+        self.map_layout.addWidget(self.web_view)
+
+    def paintEvent(self, event: QPaintEvent) -> None:
+        """
+        Method that implements event on painting of the window - after the first painting of the window time of its
+        appearance is saved to the log and loading of the map and data of the search is started
+
+        :param event: Paint event
+        :return: The method does not return any values
+        """
 
-        # Tworzymy listę sektorów posortowaną według odległosci od sektora poczatkowego zgodnie z algorytmem spirali
-        self.adds_list = self.addr_arr[c_inds[:, 0], c_inds[:, 1]].flatten()
+        super().paintEvent(event)
 
-        # Tworzymy listę ideksów posortwanych sektorów  w 'self.adds_list'
-        self.add_sekts = np.indices((self.sekt_num, self.sekt_num)).transpose(1, 2, 0)
-        self.sekts_list = self.add_sekts[c_inds[:, 0], c_inds[:, 1]]
+        if not self.paint_flag:
+            self.paint_flag = True
+            logging.getLogger('root').info("Czas do pierwszego wyświetlenia okna - {:.2f} sekundy.".format(
+                time.time() - self.start_time))
+            QtCore.QTimer.singleShot(0, self.load_data)
+
+    def load_data(self) -> None:
+        """
+        Method that loads page of the map and starts reading of data of the search in the search worker and reading of
+        cached map tiles in a separate worker (so searches do not wait for it)
+
+        :return: The method does not return any values
+        """
 
-        # Dodajemy mape z folium
+        self.search_pool.start(LoadWorker(self, False))
+        QtCore.QThreadPool.globalInstance().start(TilesWorker(self.tile_server.tile_cache))
         data = io.BytesIO()
         self.c_map.save(data, close_file=False)
-        web_view = QWebEngineView()
-        web_view.setHtml(data.getvalue().decode())
-        self.map_layout.addWidget(web_view)
+        self.web_view.setHtml(data.getvalue().decode())
 
-    def on_text_changed(self) -> None:
+    def on_snapshot_loaded(self, snap_data: SnapshotData) -> None:
         """
-        Method that implements event on text change in QLineEdit
+        Method that starts using data of the database snapshot read by the search worker and saves to the log time of
+        their reading - data of the previous snapshot are replaced at once in the main thread
 
+        :param snap_data: Search structures of the database snapshot
         :return: The method does not return any values
         """
 
-        # Dodajemy spacje (" ") na początku wyszukiwanej frazy żeby rozróżniać miasta typu: "INNOWROCLAW" i "WROCLAW"
-        start_text = self.line_edit.text()
-        org_text = " " + start_text
-        curr_text = unidecode(org_text.upper()).replace(",", "").replace("UL. ", "")
-        last_text = curr_text[max(curr_text.strip().rfind(" ") + 1, 0):].strip()
-        self.completer.popup().setStyleSheet("font-size: 20px; font-style: normal; color: black;")
-        addrs_num = 5
+        prev_data = self.snap_data
+        self.snap_data = snap_data
+        self.snap_version = snap_data.snap_version
+        self.tile_server.labels_cache = snap_data.labels_cache
+
+        # Macierz adresow poprzedniej kopii bazy danych zamykamy w watku wyszukiwania, bo moze byc jeszcze przeszukiwana
+        if prev_data is not None:
+            self.search_pool.start(CloseWorker(prev_data.addr_search.addr_phrs))
+        elif self.line_edit.text() != "":
+            self.start_search()
+
+        logging.getLogger('root').info("Dane wyszukiwarki z kopii bazy danych '" + snap_data.snap_version +
+                                       "' wczytane po {:.2f} sekundach.".format(time.time() - self.start_time))
+
+    def load_snapshot(self) -> SnapshotData:
+        """
+        Method that reads unique words, address phrases and sectors tree of the current database snapshot and creates
+        search structures based on these data (executed by the search worker)
+
+        :return: Search structures of the database snapshot
+        """
+
+        # Pobieramy z bazy danych unikalne ciagi znakow i adressy
+        snap_version = get_snapshot_version()
+
+        with READ_ENGINE.connect() as db_conn:
+            addr_uniq_words = db_conn.execute(sa.select(UniqPhrs.uniq_phrs).limit(1)).scalar()
+
+        addr_arr_path = get_snapshot_path("ADDRS_PATH", snap_version)
+
+        try:
+            addr_phrs = AddrPhrases(addr_arr_path)
+
+        except FileNotFoundError:
+            raise Exception("Pod podanym adresem: '" + addr_arr_path + "' nie ma pliku z macierzą adresów. Uzupełnij " +
+                            "ten plik i uruchom program ponownie!")
+
+        # Tworzymy pamiec podreczna opisow punktow adresowych - indeksy punktow adresowych nowej kopii bazy danych moga
+        # wskazywac na inne punkty adresowe
+        labels_cache = LabelsCache(int(os.environ["LABELS_CACHE_SIZE"]), self.latency_stats)
 
-        if start_text[:14] == "Nie znaleziono":
+        # Ustalamy sektor poczatkowy w drzewie sektorow
+        sekts_tree = get_sectors_tree()
+        c_sekt = int(sekts_tree.get_sectors(*self.start_coords))
+
+        # Tworzymy pamiec podreczna wynikow wyszukiwania dla ostatnio wpisywanych fraz
+        prefix_cache = PrefixCache(int(os.environ["PREFIX_CACHE_SIZE"]), int(os.environ["PREFIX_CACHE_LINES"]))
+
+        # Tworzymy indeks n-gramow unikalnych slow sluzacy do poprawiania literowek w wyszukiwanych frazach (indeks
+        # budujemy od razu, bo dane wczytywane sa poza watkiem glownym)
+        fuzzy_index = FuzzyIndex(addr_uniq_words, int(os.environ["FUZZY_MAX_DIST"]), int(os.environ["FUZZY_MAX_CANDS"]))
+        fuzzy_index.build_index()
+        addr_search = AddrSearch(addr_phrs, addr_uniq_words, sekts_tree.sekts_bounds, c_sekt, self.max_sekts,
+                                 prefix_cache, fuzzy_index, self.c_ptrn)
+        return SnapshotData(snap_version, addr_search, labels_cache, sekts_tree)
+
+    def check_snapshot(self) -> None:
+        """
+        Method that reopens the database if a new database snapshot has been published since the last check
+
+        :return: The method does not return any values
+        """
+
+        if self.snap_version is not None and get_snapshot_version() != self.snap_version:
+            self.snap_version = get_snapshot_version()
+            logging.getLogger('root').info("Wczytujemy nową kopię bazy danych: " + self.snap_version)
+
+            # Dane wczytujemy w watku wyszukiwania, wiec nie zamkniemy macierzy adresow uzywanej przez wyszukiwanie
+            self.search_pool.start(LoadWorker(self, True))
+
+    def on_text_changed(self) -> None:
+        """
+        Method that implements event on text change in QLineEdit - search is started after SEARCH_DEBOUNCE milliseconds
+        without further changes of the text
+
+        :return: The method does not return any values
+        """
+
+        if self.line_edit.text()[:14] == "Nie znaleziono":
             self.line_edit.setText("")
             self.completer.model().setStringList([''])
-        elif curr_text != "" and ", g" not in org_text and last_text in self.addr_uniq_words:
-            ids_row = [''] * addrs_num
-            found_flag = False
-            sek_licz = 0
-            prg_ids = ""
-
-            for i, add in enumerate(self.adds_list):
-                if add != "" and curr_text in add and '' in ids_row:
-                    found_flag = get_prg_ids(addrs_num, add, curr_text, ids_row)
-                elif found_flag and '' in ids_row and sek_licz <= self.max_sekts:
-                    sek_licz += 1
-                elif '' not in ids_row or (found_flag and sek_licz > self.max_sekts):
-                    c_prg = ", ".join(ids_row).strip().replace(" ,", "")
-                    c_prg = c_prg[:-1] if c_prg[-1] == ',' else c_prg
-                    prg_ids += c_prg
-                    self.change_sekts_order(self.sekts_list[i])
-                    break
+        else:
+            self.key_time = time.perf_counter()
+            self.search_timer.start()
 
-            if prg_ids != "":
-                prg_cols = [PRG.miejscowosc, PRG.ulica, PRG.numer, PRG.kod_pocztowy, PRG.gmina, PRG.powiat,
-                            PRG.wojewodztwo, PRG.dodatkowy_opis, PRG.szerokosc, PRG.dlugosc, PRG.bdot10_bubd_id]
-                prg_cond = sa.or_(PRG.prg_point_id == int(v) for v in prg_ids.split(", "))
-
-                with sa.orm.Session(SQL_ENGINE) as db_session:
-                    c_res = pd.read_sql(db_session.query(*prg_cols).filter(prg_cond).statement, SQL_ENGINE).to_numpy()
-
-                res_list = np.array([(", ".join(["ul. " + el if i == 1 else "gmina: " + el if i == 4 else el
-                                                 for i, el in enumerate(row) if el not in self.na_strings
-                                                 and (i < 5 or i == 7)]), row) for row in c_res], dtype=object)
-                self.completer.model().setStringList(res_list[:, 0])
-                self.res_coords.update(dict(zip(res_list[:, 0], res_list[:, 1])))
-            elif prg_ids == "" and not self.c_ptrn.match(start_text):
-                self.completer.model().setStringList(['Wśród adresów z całej Polski nie znaleziono żadnego, który ' +
-                                                      'zawierałby frazę: "' + start_text + '"'])
-                self.completer.popup().setStyleSheet("font-size: 18px; font-style: italic; color: gray;")
-            elif prg_ids == "" and self.c_ptrn.match(start_text):
-                self.completer.model().setStringList(['Wciśnij enter, żeby wyszukać punkt adresowy najbliższy podanym' +
-                                                      ' współrzędnym'])
-                self.completer.popup().setStyleSheet("font-size: 18px; font-style: italic; color: gray;")
-
-        elif last_text not in self.addr_uniq_words and not self.c_ptrn.match(start_text):
-            self.completer.model().setStringList(['Wśród adresów z całej Polski nie znaleziono żadnego, który ' +
-                                                  'zawierałby frazę: "' + start_text + '"'])
-            self.completer.popup().setStyleSheet("font-size: 18px; font-style: italic; color: gray;")
-        elif last_text not in self.addr_uniq_words and self.c_ptrn.match(start_text):
-            self.completer.model().setStringList(['Wciśnij enter, żeby wyszukać punkt adresowy najbliższy podanym' +
-                                                  ' współrzędnym'])
-            self.completer.popup().setStyleSheet("font-size: 18px; font-style: italic; color: gray;")
-
-    def change_sekts_order(self, c_sekt: np.ndarray) -> None:
-        """
-        Method that changes order of sectors in adds_list
-
-        :param c_sekt: Numpy array containing sectors numbers
-        :return: The method does not return any values
-        """
-
-        if np.abs(c_sekt - self.c_sekt).max() > self.max_sekts:
-            c_ids_spl = self.spiral_ids_arr + c_sekt
-            c_inds = c_ids_spl[np.logical_and((c_ids_spl >= 0).prod(1),
-                                              (c_ids_spl < self.sekt_num).prod(1))]
-            self.adds_list = self.addr_arr[c_inds[:, 0], c_inds[:, 1]].flatten()
-            self.sekts_list = self.add_sekts[c_inds[:, 0], c_inds[:, 1]]
-            self.c_sekt = c_sekt
+    def start_search(self) -> None:
+        """
+        Method that starts search for the current text in the search worker - results of previous queries, which are
+        still searched, are dropped
 
-    def on_text_selected(self) -> None:
+        :return: The method does not return any values
         """
-        Methond that implements event on text select in QCompleter
 
+        self.query_id += 1
+        self.search_pool.start(SearchWorker(self, self.query_id, self.line_edit.text()))
+
+    def on_search_finished(self, query_id: int, search_res: Optional[Tuple[List[str], List[int], str]]) -> None:
+        """
+        Method that puts results of the search to QCompleter (only results of the latest query)
+
+        :param query_id: Index of the query
+        :param search_res: Descriptions and indices of found address points (empty list for messages) and style of
+                           QCompleter or None if suggestions should not be changed
         :return: The method does not return any values
         """
 
-        c_row = list()
-        c_text = self.line_edit.text()
+        if query_id != self.query_id:
+            return
 
-        # Ustalamy które dane ze slownika danych adresowych mamy pobrac
-        if c_text in self.res_coords:
-            c_row = self.res_coords[c_text].tolist()
-        # Szukamy po koordynatach
-        elif self.c_ptrn.match(c_text):
-            # Wybieramy współrzędne
-            c_coords = np.asarray(c_text.split(",")).astype(float)
+        if search_res is None:
+            self.completer.popup().setStyleSheet(NORMAL_STYLE)
+            return
+
+        res_labels, res_ids, popup_style = search_res
+
+        with self.latency_stats.measure("completer"):
+            self.completer.model().setStringList(res_labels)
+            self.completer.popup().setStyleSheet(popup_style)
+            self.res_coords.update(zip(res_labels, res_ids))
+
+        # Czas od ostatniego wcisniecia klawisza do wyswietlenia pierwszych podpowiedzi obejmuje rowniez przerwe
+        # SEARCH_DEBOUNCE (kolejne, uzupelnione podpowiedzi nie sa juz mierzone)
+        if self.key_time is not None:
+            self.latency_stats.add_time("keystroke", (time.perf_counter() - self.key_time) * 1000)
+            self.key_time = None
+
+    def search_text(self, start_text: str, deadline: Optional[float] = None) -> \
+            Tuple[Optional[Tuple[List[str], List[int], str]], bool]:
+        """
+        Method that searches for address points matching a given text (executed by the search worker) - address
+        phrases are searched by the class "AddrSearch" (the same search is measured by the benchmark of query paths),
+        scanning of sectors is interrupted after a given time and resumed by the next call for the same text
+
+        :param start_text: Text typed in the GUI window
+        :param deadline: Time (returned by function "time.perf_counter") after which scanning of sectors is interrupted
+                         (None if scanning should not be interrupted)
+        :return:
+            - search_res (:py:class:`tuple`) - descriptions and indices of found address points (empty list for
+              messages) and style of QCompleter or None if suggestions should not be changed
+            - part_flag (:py:class:`bool`) - flag indicating that search was interrupted and found address points are
+              not final
+        """
+
+        with self.latency_stats.measure("normalization"):
+            curr_text, last_text = normalize_text(start_text)
+
+        none_msg = (['Wśród adresów z całej Polski nie znaleziono żadnego, który zawierałby frazę: "' + start_text +
+                     '"'], [], INFO_STYLE)
+        crds_msg = (['Wciśnij enter, żeby wyszukać punkt adresowy najbliższy podanym współrzędnym'], [], INFO_STYLE)
+        wait_msg = (['Trwa wyszukiwanie adresów zawierających frazę: "' + start_text + '"'], [], INFO_STYLE)
 
-            # Ustalamy sektory dla wybranych wspołrzędnych
-            szer, dlug = get_sector_codes(*c_coords)
+        # Dane kopii bazy danych pobieramy raz, aby cale wyszukiwanie korzystalo z danych tej samej kopii (wyszukiwanie
+        # rozpoczete przed wczytaniem danych jest ponawiane po ich wczytaniu)
+        snap_data = self.snap_data
 
-            # Pobieramy wszystkie współrzędne dla danego sektora
-            prg_cols = [PRG.prg_point_id, PRG.szerokosc, PRG.dlugosc]
-            prg_cond = sa.or_(PRG.kod_sektora == str(szer).zfill(3) + "_" + str(dlug).zfill(3))
+        if snap_data is None:
+            return None, False
 
-            with sa.orm.Session(SQL_ENGINE) as db_session:
-                sekts_coords = pd.read_sql(db_session.query(*prg_cols).filter(prg_cond).statement,
-                                           SQL_ENGINE).to_numpy()
+        with self.latency_stats.measure("index_scan"):
+            search_ids = snap_data.addr_search.search_text(start_text, curr_text, last_text, 5, deadline)
 
-            if len(sekts_coords) > 0:
-                # Wyliczamy odleglosci euklidesowe
-                eukl_dists = np.sqrt((sekts_coords[:, 1] - c_coords[0]) ** 2 + (sekts_coords[:, 2] - c_coords[1]) ** 2)
+        if search_ids is None:
+            return None, False
 
-                # Pobieramy dane dla najbliższego punktu adresowego od podanych przez użytkownika wspołrzędnych
-                prg_cols = [PRG.miejscowosc, PRG.ulica, PRG.numer, PRG.kod_pocztowy, PRG.gmina, PRG.powiat,
-                            PRG.wojewodztwo, PRG.dodatkowy_opis, PRG.szerokosc, PRG.dlugosc, PRG.bdot10_bubd_id]
-                prg_cond = PRG.prg_point_id == int(sekts_coords[eukl_dists.argmin(), 0])
+        prg_ids, stop_idx = search_ids
 
-                with sa.orm.Session(SQL_ENGINE) as db_session:
-                    c_row = db_session.query(*prg_cols).filter(prg_cond).first()
+        if prg_ids:
+            return self.get_suggestions(snap_data.labels_cache, prg_ids), stop_idx == PART_IDX
 
-                self.change_sekts_order(np.asarray([szer, dlug]))
-            else:
-                self.completer.popup().show()
-                self.completer.model().setStringList(['Współrzędne geograficzne poza granicami Polski!'])
-                self.completer.popup().setStyleSheet("font-size: 18px; font-style: italic; color: red;")
+        if stop_idx == PART_IDX:
+            return wait_msg, True
+
+        return crds_msg if self.c_ptrn.match(start_text) else none_msg, False
+
+    @staticmethod
+    def get_suggestions(labels_cache: LabelsCache, prg_ids: List[str]) -> Tuple[List[str], List[int], str]:
+        """
+        Method that returns descriptions of found address points - popups of these address points are created at the
+        same time, so selection of the suggestion does not require any queries
+
+        :param labels_cache: Object keeping in memory descriptions and popups of PRG points of the database snapshot
+        :param prg_ids: List of indices of found PRG points
+        :return: Descriptions and indices of found address points and style of QCompleter
+        """
+
+        prg_points = labels_cache.get_points(prg_ids)
+        return [prg_point[0] for prg_point in prg_points.values()], list(prg_points), NORMAL_STYLE
+
+    def on_text_selected(self) -> None:
+        """
+        Methond that implements event on text select in QCompleter
+
+        :return: The method does not return any values
+        """
+
+        # Dopoki dane wyszukiwarki nie zostana wczytane, nie obslugujemy wyboru adresu
+        snap_data = self.snap_data
+
+        if snap_data is None:
+            return
+
+        prg_id = None
+        c_text = self.line_edit.text()
+
+        # Ustalamy ktory punkt adresowy mamy wyswietlic
+        if c_text in self.res_coords:
+            prg_id = self.res_coords[c_text]
+        # Szukamy po koordynatach - najblizszy punkt adresowy wyszukujemy w watku wyszukiwania, ktory zmienia tez
+        # kolejnosc sektorow (aby nie zmieniac jej w trakcie wyszukiwania)
+        elif self.c_ptrn.match(c_text):
+            c_coords = np.asarray(c_text.split(",")).astype(float)
+            self.search_pool.start(NearestWorker(self, snap_data, c_coords))
         else:
             uni_text = unidecode(c_text.replace(",", "")).upper()
 
             for k, v in self.res_coords.items():
                 if uni_text in unidecode(k.replace(",", "")).upper():
-                    c_row = v.tolist()
+                    prg_id = v
                     self.line_edit.setText(k)
                     break
 
-        if c_row and c_row != self.prev_val:
-            self.prev_val = c_row
-            info_list = [self.inf_names[i] + el for i, el in enumerate(c_row[:-4]) if el not in self.na_strings]
-            c_crds = c_row[-3:-1]
-            f_info = ["<font size='4'><b>Dane dotyczące punktu adresowego:</b></font>"] + info_list + \
-                     ["<b>Współrzędne: </b>" + str(round(c_crds[0], 3)) + "º N, " + str(round(c_crds[1], 3)) + "º E"]
-
-            # Tworzymy mapę od nowa, żeby polygon był dobrze nakładany na wszystkie mapy
-            self.c_map = folium.Map(title="GEO PYTHON", zoom_start=19, location=(c_crds[0] + 0.0007, c_crds[1]),
-                                    control_scale=True, tiles=None)
-
-            # Pobieramy kształt budynku dla danego punktu adresowego
-            bdot10k_bubd_id = struct.unpack('i', c_row[-1])[0]
-            dod_info = ""
-
-            if bdot10k_bubd_id > 0:
-                # Pobieramy dane z tabeli budynków
-                f_info += ["", "<font size='4'><b>Dane dotyczące budynku:</b></font>"]
-                bdot10k_cols = [BDOT10K.kat_budynku, BDOT10K.nazwa_kart, BDOT10K.stan_budynku, BDOT10K.funkcja_budynku,
-                                BDOT10K.liczba_kond, BDOT10K.czy_zabytek, BDOT10K.powierzchnia, BDOT10K.opis_budynku,
-                                BDOT10K.bubd_geojson]
-                bdot10k_cond = BDOT10K.bdot10k_bubd_id == bdot10k_bubd_id
-
-                with sa.orm.Session(SQL_ENGINE) as db_session:
-                    bubd_row = db_session.query(*bdot10k_cols).filter(bdot10k_cond).first()
-
-                c_geojson = json.loads(bubd_row[-1])
-                dod_info = bubd_row[-2]
-                f_info += [self.bubd_names[i] + str(int(el)) if i == 4 else
-                           self.bubd_names[i] + "Nie" if i == 5 and el == 0 else self.bubd_names[i] + "Tak"
-                           if i == 5 and el == 1 else self.bubd_names[i] + str(int(el)) + " m²"
-                           if i == 6 else self.bubd_names[i] + str(el) for i, el in enumerate(bubd_row[:-2])
-                           if el != ""]
-
-                if dod_info != "":
-                    f_info += ["<b>Opis budynku: </b>" + dod_info]
-
-                folium.GeoJson(data=c_geojson, name="Budynek",
-                               style_function=lambda x: {'fillColor': 'orange', 'fillOpacity': 0.5,
-                                                         'color': 'red'}).add_to(self.c_map)
-            else:
-                f_info += ["", "<font size='4'><b>Dane dotyczące budynku:</b></font>", "<font color='red'>W bazie " +
-                           "BDOT10k nie znajduje się żaden budynek, który byłby", " odddalony o mniej niż 10 metrów," +
-                           " od bieżącego punktu adresowego</font>"]
-
-            # Dodajemy finalny marker do mapy
-            f_info += ["", "", '<font size="2"><i>Dane pobrane dnia 21. marca 2022 roku ze stron ' +
-                       'internetowych:<br>' + '<a href="https://dane.gov.pl/pl/dataset/726,panstwowy-rejestr-granic' +
-                       '-i-powierzchni-jednostek-podziaow-terytorialnych-kraju/resource/29538/table">https://dane.' +
-                       'gov.pl</a><br><a href="https://mapy.geoportal.gov.pl">https://mapy.geoportal.gov.pl</a>' +
-                       '</i></font>']
-            date_iframe = folium.IFrame("<br>".join(f_info), width=470, height=(len(f_info) + len(dod_info) // 30) * 22)
-            date_popup = folium.Popup(date_iframe)
-            folium.Marker(location=c_crds, popup=date_popup,
-                          icon=folium.Icon(color='red', icon_color='white', icon='globe')).add_to(self.c_map)
-
-            # Dodajemy warstwy do nowoutworzonej mapy
-            self.m_pos.add_to(self.c_map)
-            self.st_map.add_to(self.c_map)
-            self.os_map.add_to(self.c_map)
-            self.gog_map.add_to(self.c_map)
-            self.c_map.add_child(folium.LayerControl())
-            c_data = io.BytesIO()
-            self.c_map.save(c_data, close_file=False)
-            web_view = QWebEngineView()
-            web_view.setHtml(c_data.getvalue().decode())
-
-            # Usuwamy dotychczasowy widget z layoutu
-            self.map_layout.itemAt(1).widget().deleteLater()
-
-            # Dodajemy widget z nowymi wspołrzędnymi
-            self.map_layout.addWidget(web_view)
-
-
-def get_addr_spiral_ids(addr_arr_shp: int, spiral_ids_arr: np.ndarray) -> None:
-    """
-    Function that returs indices of numpy array in spiral mode up to 'add_arr' shape starting from central point
+        self.show_prg_point(snap_data, prg_id)
 
-    :param addr_arr_shp: Shape of address array
-    :param spiral_ids_arr: Numpy array with indices arranged in spirals
-    :return: The method does not return any values
-    """
+    def on_nearest_found(self, snap_data: SnapshotData, prg_id: Optional[int]) -> None:
+        """
+        Method that shows on the map PRG point nearest to coordinates typed by the user (found by the search worker) -
+        results found in the previous database snapshot are skipped
+
+        :param snap_data: Search structures of the database snapshot in which PRG point was found
+        :param prg_id: Index of the nearest PRG point or None if coordinates lie outside of Poland
+        :return: The method does not return any values
+        """
+
+        if snap_data is not self.snap_data:
+            return
 
-    # Definiujemy podstawowe parametry
-    spiral_ids_arr[0, :] = [0, 0]
-    add_list = [1, 0]
-    c_sign = [1, 1]
-    c_kier = cycle([1, 0])
-    c_ind = 0
-    i = 1
-    arr_licz = 1
-    c_sum = 0
-
-    while 1:
-        # Mnożymy razy 8, bo każdy sektor jest otoczony zawsze 8 sąsiadami
-        if arr_licz <= c_sum + 8 * i:
-            spiral_ids_arr[arr_licz, :] = add_list
-            arr_licz += 1
+        if prg_id is None:
+            self.completer.popup().show()
+            self.completer.model().setStringList(['Współrzędne geograficzne poza granicami Polski!'])
+            self.completer.popup().setStyleSheet("font-size: 18px; font-style: italic; color: red;")
         else:
-            c_sum += 8 * i
-            i += 1
+            self.show_prg_point(snap_data, prg_id)
 
-            if i == addr_arr_shp:
+    def show_prg_point(self, snap_data: SnapshotData, prg_id: Optional[int]) -> None:
+        """
+        Method that shows on the map selected PRG point along with its building
+
+        :param snap_data: Search structures of the database snapshot
+        :param prg_id: Index of PRG point or None
+        :return: The method does not return any values
+        """
+
+        if prg_id is not None and prg_id != self.prev_val:
+            # Opis punktu adresowego i budynku utworzony zostal razem z podpowiedziami wyszukiwarki (lub przy
+            # wyszukiwaniu najblizszego punktu adresowego)
+            prg_popup = snap_data.labels_cache.get_popup(prg_id)
+
+            if prg_popup is None:
                 return
 
-            add_list = list(spiral_ids_arr[arr_licz - 1, :])
-            add_list[0] += 1
-            spiral_ids_arr[arr_licz, :] = add_list
-            arr_licz += 1
+            self.prev_val = prg_id
+            c_lat, c_long, c_popup, c_geojson = prg_popup
+            render_time = time.perf_counter()
+
+            # Zmieniamy zawartosc wczytanej strony mapy - GeoJSON budynku przekazujemy bez dekodowania, bo jest
+            # poprawnym wyrazeniem JavaScript. Funkcje wykonywane sa po kolei, wiec czas zmiany mapy mierzymy do
+            # zakonczenia ostatniej funkcji
+            self.run_map_js("geoSetBuilding", c_geojson)
+            self.run_map_js("geoSetMarker", json.dumps(c_lat), json.dumps(c_long), json.dumps(c_popup), "470")
+            self.run_map_js("geoSetView", json.dumps(c_lat + 0.0007), json.dumps(c_long), "19",
+                            js_callback=lambda js_res: self.latency_stats.add_time(
+                                "map_render", (time.perf_counter() - render_time) * 1000))
+
+    def show_gmina_points(self) -> None:
+        """
+        Method that starts reading of all PRG points of the municipality of the selected PRG point in the search worker
+
+        :return: The method does not return any values
+        """
 
-        if add_list[c_ind] >= i or add_list[c_ind] <= -i:
-            c_ind = next(c_kier)
+        if self.snap_data is not None and self.prev_val is not None:
+            self.search_pool.start(PointsWorker(self, self.prev_val))
 
-            if add_list[c_ind] >= i or add_list[c_ind] <= -i:
-                c_sign[c_ind] *= -1
+    def get_gmina_points(self, prg_id: int) -> Optional[str]:
+        """
+        Method that reads all PRG points of the municipality of PRG point with a given index
 
-        add_list[c_ind] += c_sign[c_ind]
+        :param prg_id: Index of PRG point
+        :return: Indices and coordinates of PRG points packed by function "encode_points" or None if there is no such
+                 PRG point
+        """
 
+        prg_info = get_prg_info([prg_id])
 
-def get_prg_ids(prg_num: int, c_addrs: str, curr_text: str, ids_row: List[str]) -> bool:
-    """
-    Function that generates indices of points in PRG table matching current text
+        if len(prg_info) == 0:
+            return None
 
-    :param prg_num: PRG number
-    :param c_addrs: Current address
-    :param curr_text: Current text
-    :param ids_row: List of indices
-    :return: Flag indicating that current text was found in PRG table
-    """
+        prg_pts = get_prg_gmina(prg_info[0, 4], prg_info[0, 5], prg_info[0, 6])
+        return encode_points(prg_pts[:, 0], prg_pts[:, 1], prg_pts[:, 2])
 
-    # Definiujemy podstawowe parametry
-    c_start = 0
-    found_flag = False
-    empty_idx = ids_row.index('')
+    def on_points_loaded(self, pts_b64: Optional[str]) -> None:
+        """
+        Method that sends PRG points read by the search worker to the map page
 
-    for i in range(prg_num):
-        if '' not in ids_row:
-            break
+        :param pts_b64: Indices and coordinates of PRG points packed by function "encode_points"
+        :return: The method does not return any values
+        """
 
-        str_idx1 = c_addrs.find(curr_text, c_start)
+        if pts_b64 is not None:
+            self.run_map_js("geoSetPoints", json.dumps(pts_b64))
+
+    def run_map_js(self, func_name: str, *func_args: str, js_callback: Optional[Callable] = None) -> None:
+        """
+        Method that calls a given JavaScript function of the map page (functions are defined by class "MapBridge")
+
+        :param func_name: Name of the JavaScript function
+        :param func_args: Arguments of the function as JavaScript expressions
+        :param js_callback: Function called with the result of the JavaScript function after its execution
+        :return: The method does not return any values
+        """
+
+        if js_callback is None:
+            self.web_view.page().runJavaScript(func_name + "(" + ", ".join(func_args) + ");")
+        else:
+            self.web_view.page().runJavaScript(func_name + "(" + ", ".join(func_args) + ");", js_callback)
+
+    def toggle_stats_panel(self) -> None:
+        """
+        Method that shows or hides the debug panel with statistics of times of execution of stages of the search -
+        statistics are refreshed every second only when the panel is visible
 
-        if str_idx1 >= 0:
-            str_idx2 = c_addrs.find(' [', str_idx1) + 2
-            str_idx3 = c_addrs.find(']', str_idx2)
-            ids_row[empty_idx + i] = c_addrs[str_idx2:str_idx3]
-            c_start = str_idx3
-            found_flag = True
+        :return: The method does not return any values
+        """
+
+        if self.stats_panel.isVisible():
+            self.stats_timer.stop()
+            self.stats_panel.hide()
+        else:
+            self.update_stats_panel()
+            self.stats_panel.show()
+            self.stats_timer.start(1000)
+
+    def update_stats_panel(self) -> None:
+        """
+        Method that refreshes content of the debug panel
+
+        :return: The method does not return any values
+        """
+
+        self.stats_panel.setPlainText(self.latency_stats.format_summary())
+
+    def closeEvent(self, event: QCloseEvent) -> None:
+        """
+        Method that implements event on closing of the window - statistics of times of execution of stages of the
+        search are saved to file STATS_PATH
+
+        :param event: Close event
+        :return: The method does not return any values
+        """
+
+        stats_path = os.path.join(os.environ["PARENT_PATH"], os.environ["STATS_PATH"])
+
+        try:
+            self.latency_stats.dump_summary(stats_path)
+            logging.getLogger('root').info("Statystyki opóźnień wyszukiwania zapisane do pliku: " + stats_path)
+        except OSError as c_err:
+            logging.getLogger('root').error("Nie udało się zapisać statystyk opóźnień wyszukiwania: " + str(c_err))
 
-    return found_flag
+        super().closeEvent(event)
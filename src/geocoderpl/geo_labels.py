@@ -0,0 +1,169 @@
+""" Module that creates descriptions of PRG points shown in suggestions of the search engine and in popups of the map of
+the GeocoderPL project and keeps them in memory """
+
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from db_queries import decode_bubd_ids, get_bdot10k_popups_info, get_prg_labels_info
+from geo_stats import LatencyStats
+from geo_utilities import *
+
+# Definiujemy wartosci pol, ktore pomijamy w opisach punktow adresowych i budynkow
+NA_STRINGS = ("", "brak numeru rejestru zabytków", ".")
+
+# Definiujemy naglowki pol opisu punktu adresowego i budynku
+PRG_NAMES = ["<b>Miejscowość: </b>", "<b>Ulica: </b>", "<b>Numer budynku: </b>", "<b>Kod pocztowy: </b>",
+             "<b>Gmina: </b>", "<b>Powiat: </b>", "<b>Województwo: </b>"]
+BUBD_NAMES = ["<b>Kategoria budynku: </b>", "<b>Nazwa kartograficzna: </b>", "<b>Stan budynku: </b>",
+              "<b>Funkcja budynku: </b>", "<b>Liczba kondygnacji: </b>", "<b>Zabytek: </b>",
+              "<b>Szacunkowa powierzchnia: </b>"]
+
+# Definiujemy opis wyswietlany dla punktow adresowych bez budynku oraz informacje o zrodlach danych
+NO_BUBD_INFO = ["<font color='red'>W bazie BDOT10k nie znajduje się żaden budynek, który byłby",
+                " odddalony o mniej niż 10 metrów, od bieżącego punktu adresowego</font>"]
+SOURCE_INFO = '<font size="2"><i>Dane pobrane dnia 21. marca 2022 roku ze stron internetowych:<br><a href="https://' + \
+              'dane.gov.pl/pl/dataset/726,panstwowy-rejestr-granic-i-powierzchni-jednostek-podziaow-terytorialnych-' + \
+              'kraju/resource/29538/table">https://dane.gov.pl</a><br><a href="https://mapy.geoportal.gov.pl">' + \
+              'https://mapy.geoportal.gov.pl</a></i></font>'
+
+
+def create_label(prg_row: list) -> str:
+    """
+    Function that creates description of PRG point shown in suggestions of the search engine
+
+    :param prg_row: List containing description of PRG point (columns of the query "prg_info")
+    :return: Description of PRG point
+    """
+
+    return ", ".join(["ul. " + el if i == 1 else "gmina: " + el if i == 4 else el for i, el in enumerate(prg_row)
+                      if el not in NA_STRINGS and (i < 5 or i == 7)])
+
+
+def create_popup(prg_row: list, bubd_row: Optional[list]) -> str:
+    """
+    Function that creates HTML content of the popup of PRG point and the building assigned to this point
+
+    :param prg_row: List containing description and coordinates of PRG point (columns of the query "prg_info")
+    :param bubd_row: List containing description of the building (columns of the query "bdot10k_info" without GeoJSON
+                     shape) or None if there is no building assigned to PRG point
+    :return: HTML content of the popup
+    """
+
+    f_info = ["<font size='4'><b>Dane dotyczące punktu adresowego:</b></font>"] + \
+             [PRG_NAMES[i] + el for i, el in enumerate(prg_row[:7]) if el not in NA_STRINGS] + \
+             ["<b>Współrzędne: </b>" + str(round(prg_row[8], 3)) + "º N, " + str(round(prg_row[9], 3)) + "º E", "",
+              "<font size='4'><b>Dane dotyczące budynku:</b></font>"]
+
+    if bubd_row is not None:
+        f_info += [BUBD_NAMES[i] + str(int(el)) if i == 4 else BUBD_NAMES[i] + "Nie" if i == 5 and el == 0 else
+                   BUBD_NAMES[i] + "Tak" if i == 5 and el == 1 else BUBD_NAMES[i] + str(int(el)) + " m²" if i == 6
+                   else BUBD_NAMES[i] + str(el) for i, el in enumerate(bubd_row[:-1]) if el != ""]
+
+        if bubd_row[-1] != "":
+            f_info += ["<b>Opis budynku: </b>" + bubd_row[-1]]
+    else:
+        f_info += NO_BUBD_INFO
+
+    return "<br>".join(f_info + ["", "", SOURCE_INFO])
+
+
+class LabelsCache(object):
+    """
+    Class that keeps in memory descriptions, popups and GeoJSON shapes of buildings of recently found PRG points -
+    descriptions and popups of all PRG points of one batch of suggestions are created together (with one query for PRG
+    points and one query for their buildings), so selection of the suggestion does not require any queries. Least
+    recently used PRG points are removed when number of PRG points exceeds the limit
+    """
+
+    def __init__(self, max_size: int, latency_stats: Optional[LatencyStats] = None) -> None:
+        """
+        Method that creates objects from a class "LabelsCache"
+
+        :param max_size: Maximum number of PRG points kept in memory
+        :param latency_stats: Object saving times of reading of PRG points from the database and of creating their
+                              descriptions (times are not saved if it is not given)
+        :return: The method does not return any values
+        """
+
+        self.max_size = max_size
+        self.latency_stats = latency_stats if latency_stats is not None else LatencyStats(0)
+        self.cache_lock = threading.Lock()
+        self.prg_points = OrderedDict()
+
+    def get_points(self, prg_ids: List[Union[int, str]]) -> Dict[int, Tuple[str, float, float, str, str]]:
+        """
+        Method that returns descriptions, coordinates, popups and GeoJSON shapes of buildings of PRG points with given
+        indices - PRG points missing in memory are read from the database
+
+        :param prg_ids: Indices of PRG points
+        :return: Dictionary mapping indices of PRG points (in order of given indices, without indices missing in the
+                 database) to description, latitude, longitude, popup and GeoJSON shape of the building ('null' if
+                 there is no building)
+        """
+
+        prg_ids = [int(prg_id) for prg_id in prg_ids]
+
+        with self.cache_lock:
+            found_pts = {prg_id: self.prg_points[prg_id] for prg_id in prg_ids if prg_id in self.prg_points}
+
+            for prg_id in found_pts:
+                self.prg_points.move_to_end(prg_id)
+
+        # Brakujace punkty adresowe pobieramy poza blokada, zeby nie wstrzymywac watku glownego
+        new_ids = [prg_id for prg_id in prg_ids if prg_id not in found_pts]
+
+        if new_ids:
+            new_pts = self.create_points(new_ids)
+            found_pts.update(new_pts)
+
+            with self.cache_lock:
+                self.prg_points.update(new_pts)
+
+                while len(self.prg_points) > self.max_size:
+                    self.prg_points.popitem(last=False)
+
+        return OrderedDict((prg_id, found_pts[prg_id]) for prg_id in prg_ids if prg_id in found_pts)
+
+    def get_popup(self, prg_id: Union[int, str]) -> Optional[Tuple[float, float, str, str]]:
+        """
+        Method that returns coordinates, popup and GeoJSON shape of the building of PRG point with a given index
+
+        :param prg_id: Index of PRG point
+        :return: Latitude, longitude, popup and GeoJSON shape of the building ('null' if there is no building) or None
+                 if there is no such PRG point
+        """
+
+        prg_point = self.get_points([prg_id]).get(int(prg_id))
+        return prg_point[1:] if prg_point is not None else None
+
+    def create_points(self, prg_ids: List[int]) -> Dict[int, Tuple[str, float, float, str, str]]:
+        """
+        Method that reads from the database PRG points with given indices and their buildings and creates their
+        descriptions and popups
+
+        :param prg_ids: Indices of PRG points
+        :return: Dictionary mapping indices of PRG points to description, latitude, longitude, popup and GeoJSON shape
+                 of the building
+        """
+
+        with self.latency_stats.measure("sql_fetch"):
+            prg_rows = get_prg_labels_info(prg_ids)
+
+            if len(prg_rows) == 0:
+                return {}
+
+            bubd_ids = decode_bubd_ids(prg_rows[:, -1])
+            bubd_rows = {int(bubd_row[0]): bubd_row[1:].tolist() for bubd_row in
+                         get_bdot10k_popups_info(np.unique(bubd_ids[bubd_ids > 0]))}
+
+        new_pts = {}
+
+        with self.latency_stats.measure("labels"):
+            for prg_row, bubd_id in zip(prg_rows.tolist(), bubd_ids.tolist()):
+                bubd_row = bubd_rows.get(bubd_id)
+                c_popup = create_popup(prg_row[1:], bubd_row[:-1] if bubd_row is not None else None)
+                new_pts[int(prg_row[0])] = (create_label(prg_row[1:]), prg_row[9], prg_row[10], c_popup,
+                                            bubd_row[-1] if bubd_row is not None else "null")
+
+        return new_pts
@@ -0,0 +1,955 @@
+""" Module that collects structures used by the search engine of the GeocoderPL project """
+
+import mmap
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import AnyStr, Dict, List, Optional, Set, Tuple, Union
+
+import numpy as np
+from unidecode import unidecode
+
+# Definiujemy pozycje sektora zwracana zamiast pozycji zatrzymania wyszukiwania, gdy przeszukiwanie sektorow zostalo
+# przerwane po przekroczeniu limitu czasu (wyniki sa wtedy niepelne i wyszukiwanie mozna wznowic)
+PART_IDX = -2
+
+
+class PhraseHits(object):
+    """ Class that stores results of searching address phrases for a given text """
+
+    def __init__(self, sekt_lines: Dict[int, Optional[List[str]]], scan_end: int, prg_ids: List[str],
+                 stop_idx: int) -> None:
+        """
+        Method that creates objects from a class "PhraseHits"
+
+        :param sekt_lines: Ordered dictionary with positions of scanned sectors containing given text and the address
+                           lines matching this text (None if the list of lines was truncated)
+        :param scan_end: Position of the sector up to which (exclusively) all sectors have been scanned
+        :param prg_ids: List of indices of PRG points matching given text
+        :param stop_idx: Position of the sector on which the search was stopped (-1 if search was not stopped or
+                         PART_IDX if scanning was interrupted at the position 'scan_end' after exceeding time limit)
+        :return: The method does not return any values
+        """
+
+        self.sekt_lines = sekt_lines
+        self.scan_end = scan_end
+        self.prg_ids = prg_ids
+        self.stop_idx = stop_idx
+
+
+class PrefixCache(object):
+    """ Class that caches results of address phrases searches for recently typed texts (with LRU eviction) """
+
+    def __init__(self, max_size: int, max_lines: int) -> None:
+        """
+        Method that creates objects from a class "PrefixCache"
+
+        :param max_size: Maximum number of texts stored in cache
+        :param max_lines: Maximum number of address lines stored for a single sector
+        :return: The method does not return any values
+        """
+
+        self.max_size = max_size
+        self.max_lines = max_lines
+        self.cache_dict = OrderedDict()
+        self.adds_list = None
+
+    def get_entry(self, curr_text: str) -> Optional[PhraseHits]:
+        """
+        Method that returns search results cached for a given text
+
+        :param curr_text: Searched text
+        :return: Cached search results or None if given text is not in cache
+        """
+
+        if curr_text in self.cache_dict:
+            self.cache_dict.move_to_end(curr_text)
+            return self.cache_dict[curr_text]
+
+        return None
+
+    def get_base_entry(self, curr_text: str) -> Optional[PhraseHits]:
+        """
+        Method that returns search results cached for the longest prefix of a given text
+
+        :param curr_text: Searched text
+        :return: Cached search results or None if no prefix of given text is in cache
+        """
+
+        base_key = max((key for key in self.cache_dict if curr_text.startswith(key)), key=len, default=None)
+        return self.get_entry(base_key) if base_key is not None else None
+
+    def add_entry(self, curr_text: str, phrase_hits: PhraseHits) -> None:
+        """
+        Method that adds search results to cache and removes the least recently used ones
+
+        :param curr_text: Searched text
+        :param phrase_hits: Search results for a given text
+        :return: The method does not return any values
+        """
+
+        self.cache_dict[curr_text] = phrase_hits
+        self.cache_dict.move_to_end(curr_text)
+
+        while len(self.cache_dict) > self.max_size:
+            self.cache_dict.popitem(last=False)
+
+    def check_sectors(self, adds_list: "SectorsView") -> None:
+        """
+        Method that removes all search results from cache if they were found in another sequence of sectors - positions
+        of sectors stored in results (especially in results of interrupted searches) are valid only for the sequence
+        of sectors in which they were found
+
+        :param adds_list: Sequence of sectors of address phrases sorted by distance from the starting sector
+        :return: The method does not return any values
+        """
+
+        if adds_list is not self.adds_list:
+            self.cache_dict.clear()
+            self.adds_list = adds_list
+
+    def clear(self) -> None:
+        """
+        Method that removes all search results from cache
+
+        :return: The method does not return any values
+        """
+
+        self.cache_dict.clear()
+
+
+class FuzzyIndex(object):
+    """ Class that finds words similar to words containing typos on the basis of n-gram index of unique words """
+
+    def __init__(self, uniq_words: str, max_dist: int, max_cands: int, ngram_len: int = 3) -> None:
+        """
+        Method that creates objects from a class "FuzzyIndex" (the index itself is built at the first search)
+
+        :param uniq_words: String containing unique words separated by spaces
+        :param max_dist: Maximum edit distance between word containing typos and its correction
+        :param max_cands: Maximum number of candidates verified with edit distance for a single word
+        :param ngram_len: Length of n-grams
+        :return: The method does not return any values
+        """
+
+        self.uniq_words = uniq_words
+        self.max_dist = max_dist
+        self.max_cands = max_cands
+        self.ngram_len = ngram_len
+        self.words_arr = None
+        self.words_lens = None
+        self.words_set = set()
+        self.ngram_dict = {}
+
+    def build_index(self) -> None:
+        """
+        Method that builds n-gram index of unique words
+
+        :return: The method does not return any values
+        """
+
+        self.words_arr = np.asarray(sorted(set(self.uniq_words.split())), dtype=object)
+        self.words_lens = np.asarray([len(word) for word in self.words_arr], dtype=np.int32)
+        self.words_set = set(self.words_arr)
+        ngram_lists = {}
+
+        for i, word in enumerate(self.words_arr):
+            for ngram in self.get_ngrams(word):
+                ngram_lists.setdefault(ngram, []).append(i)
+
+        self.ngram_dict = {ngram: np.asarray(ids_list, dtype=np.int32) for ngram, ids_list in ngram_lists.items()}
+
+    def get_ngrams(self, word: str) -> Set[str]:
+        """
+        Method that returns unique n-grams of a given word (beginning of the word is marked with "#")
+
+        :param word: Word
+        :return: Set of n-grams
+        """
+
+        c_word = "#" + word
+        return {c_word[i:i + self.ngram_len] for i in range(max(len(c_word) - self.ngram_len + 1, 1))}
+
+    def find_word(self, word: str, prefix_flag: bool) -> Optional[str]:
+        """
+        Method that returns unique word (or word with prefix) closest to a given word in terms of edit distance
+
+        :param word: Word containing typos
+        :param prefix_flag: Flag indicating if given word may be only a prefix of the searched word
+        :return: Closest word or None if there is no word within maximum edit distance
+        """
+
+        if self.words_arr is None:
+            self.build_index()
+
+        # Kazda edycja niszczy maksymalnie 'ngram_len' n-gramow, wiec ograniczamy odleglosc tak, zeby kandydaci
+        # musieli miec co najmniej jeden wspolny n-gram z szukanym slowem
+        q_grams = self.get_ngrams(word)
+        max_dist = min(self.max_dist, (len(q_grams) - 1) // self.ngram_len)
+        postings = [self.ngram_dict[ngram] for ngram in q_grams if ngram in self.ngram_dict]
+
+        if max_dist < 1 or not postings:
+            return None
+
+        # Wybieramy kandydatow z odpowiednia liczba wspolnych n-gramow i odpowiednia dlugoscia
+        grams_cnt = np.bincount(np.concatenate(postings), minlength=len(self.words_arr))
+        lens_diff = self.words_lens - len(word)
+        cands_mask = grams_cnt >= len(q_grams) - max_dist * self.ngram_len
+        cands_mask &= lens_diff >= -max_dist if prefix_flag else np.abs(lens_diff) <= max_dist
+        cands_ids = np.flatnonzero(cands_mask)
+        cands_ids = cands_ids[np.argsort(-grams_cnt[cands_ids], kind="stable")[:self.max_cands]]
+
+        # Weryfikujemy kandydatow przy pomocy ograniczonej odleglosci edycyjnej
+        fin_word = None
+        fin_dist = max_dist + 1
+
+        for c_id in cands_ids:
+            c_dist = bounded_edit_distance(word, self.words_arr[c_id], fin_dist - 1, prefix_flag)
+
+            if c_dist < fin_dist:
+                fin_word, fin_dist = self.words_arr[c_id], c_dist
+
+                if c_dist == 1:
+                    break
+
+        return fin_word
+
+    def is_prefix(self, word: str) -> bool:
+        """
+        Method that checks if a given word is a prefix of any unique word
+
+        :param word: Word
+        :return: Flag indicating if the word is a prefix of any unique word
+        """
+
+        if self.words_arr is None:
+            self.build_index()
+
+        # Slowa sa posortowane, wiec pierwsze slowo nie mniejsze od szukanego zaczyna sie od niego, o ile takie istnieje
+        w_idx = np.searchsorted(self.words_arr, word)
+        return w_idx < len(self.words_arr) and self.words_arr[w_idx].startswith(word)
+
+    def correct_text(self, curr_text: str) -> Optional[str]:
+        """
+        Method that corrects typos in words of a given text - the last word of the text may be incomplete
+
+        :param curr_text: Current text
+        :return: Corrected text or None if there was nothing to correct or text could not be corrected
+        """
+
+        if self.words_arr is None:
+            self.build_index()
+
+        c_words = curr_text.split()
+        end_flag = curr_text.endswith(" ")
+        corr_flag = False
+
+        for i, word in enumerate(c_words):
+            prefix_flag = i == len(c_words) - 1 and not end_flag
+
+            if word in self.words_set or (prefix_flag and self.is_prefix(word)):
+                continue
+
+            c_word = self.find_word(word, prefix_flag)
+
+            if c_word is None:
+                return None
+
+            c_words[i] = c_word
+            corr_flag = True
+
+        return " " + " ".join(c_words) + (" " if end_flag else "") if corr_flag else None
+
+
+class AddrPhrases(object):
+    """
+    Class that gives access to address phrases of sectors stored in memory-mapped file. The file consists of header
+    (signature and number of sectors), table of offsets of sectors and concatenated address phrases of sectors. Sectors
+    are read from disk only when they are searched and pages of the file are shared through the page cache of operating
+    system
+    """
+
+    file_sign = b"GPLADDR2"
+    head_dtype = np.dtype("<i8")
+
+    def __init__(self, phrs_path: str) -> None:
+        """
+        Method that creates objects from a class "AddrPhrases"
+
+        :param phrs_path: Path to the file with address phrases
+        :return: The method does not return any values
+        """
+
+        with open(phrs_path, 'rb') as file:
+            self.phrs_mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self.phrs_mmap[:len(self.file_sign)] != self.file_sign:
+            self.phrs_mmap.close()
+            raise ValueError("Plik '" + phrs_path + "' nie zawiera macierzy adresów w obsługiwanym formacie!")
+
+        # Wczytujemy (bez kopiowania) liczbe sektorow oraz tablice przesuniec sektorow
+        head_size = self.head_dtype.itemsize
+        self.sekts_num = int(np.frombuffer(self.phrs_mmap, dtype=self.head_dtype, count=1,
+                                           offset=len(self.file_sign))[0])
+        offs_start = len(self.file_sign) + head_size
+        self.sekts_offs = np.frombuffer(self.phrs_mmap, dtype=self.head_dtype, count=self.sekts_num + 1,
+                                        offset=offs_start)
+        self.data_start = offs_start + (self.sekts_num + 1) * head_size
+
+    def get_sekt_bounds(self, sekt_code: int) -> Tuple[int, int]:
+        """
+        Method that returns position of address phrases of a given sector in memory-mapped file
+
+        :param sekt_code: Code of the sector
+        :return: Positions of the first byte of the sector and of the byte following the last byte of the sector
+        """
+
+        return self.data_start + int(self.sekts_offs[sekt_code]), self.data_start + int(self.sekts_offs[sekt_code + 1])
+
+    def get_sector(self, sekt_code: int) -> str:
+        """
+        Method that returns address phrases of a given sector
+
+        :param sekt_code: Code of the sector
+        :return: Address phrases of the sector
+        """
+
+        sekt_start, sekt_end = self.get_sekt_bounds(sekt_code)
+        return self.phrs_mmap[sekt_start:sekt_end].decode("utf-8")
+
+    def get_view(self, sekt_codes: np.ndarray) -> 'SectorsView':
+        """
+        Method that returns sequence of sectors ordered as given codes of sectors
+
+        :param sekt_codes: Codes of the sectors
+        :return: Ordered sequence of sectors
+        """
+
+        return SectorsView(self, np.asarray(sekt_codes))
+
+    def close(self) -> None:
+        """
+        Method that closes memory-mapped file with address phrases
+
+        :return: The method does not return any values
+        """
+
+        self.sekts_offs = None
+        self.phrs_mmap.close()
+
+
+class SectorsView(object):
+    """ Class that represents ordered sequence of sectors of memory-mapped address phrases """
+
+    def __init__(self, addr_phrs: AddrPhrases, sekts_ids: np.ndarray) -> None:
+        """
+        Method that creates objects from a class "SectorsView"
+
+        :param addr_phrs: Memory-mapped address phrases
+        :param sekts_ids: Codes of sectors in the order of searching
+        :return: The method does not return any values
+        """
+
+        self.addr_phrs = addr_phrs
+        sekts_offs = addr_phrs.sekts_offs
+
+        # Zapamietujemy granice sektorow, aby nie wyliczac ich przy kazdym przeszukiwaniu
+        self.sekts_bounds = (np.stack((sekts_offs[sekts_ids], sekts_offs[sekts_ids + 1]), axis=1) +
+                             addr_phrs.data_start).tolist()
+
+    def __len__(self) -> int:
+        """
+        Method that returns number of sectors in the sequence
+
+        :return: Number of sectors
+        """
+
+        return len(self.sekts_bounds)
+
+    def __getitem__(self, s_idx: int) -> str:
+        """
+        Method that returns address phrases of a sector on a given position
+
+        :param s_idx: Position of the sector
+        :return: Address phrases of the sector
+        """
+
+        sekt_start, sekt_end = self.sekts_bounds[s_idx]
+        return self.addr_phrs.phrs_mmap[sekt_start:sekt_end].decode("utf-8")
+
+    def find_text(self, s_idx: int, curr_text: str) -> bool:
+        """
+        Method that checks if address phrases of a given sector contain current text
+
+        :param s_idx: Position of the sector
+        :param curr_text: Current text
+        :return: Flag indicating that sector contains current text
+        """
+
+        sekt_start, sekt_end = self.sekts_bounds[s_idx]
+        return sekt_end > sekt_start and self.addr_phrs.phrs_mmap.find(curr_text.encode("utf-8"), sekt_start,
+                                                                       sekt_end) >= 0
+
+    def find_lines(self, s_idx: int, curr_text: str, max_lines: int) -> Tuple[List[str], bool]:
+        """
+        Method that returns address lines of a given sector containing current text
+
+        :param s_idx: Position of the sector
+        :param curr_text: Current text
+        :param max_lines: Maximum number of returned address lines
+        :return:
+            - c_lines (:py:class:`list`) - address lines containing current text
+            - full_flag (:py:class:`bool`) - flag indicating that all matching address lines were returned
+        """
+
+        c_lines, full_flag = get_phrase_lines(self.addr_phrs.phrs_mmap, curr_text.encode("utf-8"), max_lines,
+                                              *self.sekts_bounds[s_idx])
+        return [c_line.decode("utf-8") for c_line in c_lines], full_flag
+
+
+class SectorsRings(SectorsView):
+    """
+    Class that represents sequence of sectors of memory-mapped address phrases sorted by distance from the starting
+    sector - sectors are sorted lazily in rings of growing size (the next ring contains the nearest sectors which have
+    not been sorted yet), so changing of the starting sector does not require sorting of all sectors
+    """
+
+    def __init__(self, addr_phrs: AddrPhrases, sekts_bounds: np.ndarray, c_sekt: int, ring_len: int) -> None:
+        """
+        Method that creates objects from a class "SectorsRings"
+
+        :param addr_phrs: Memory-mapped address phrases
+        :param sekts_bounds: Numpy array containing first row, row following the last row, first column and column
+                             following the last column of cells of every sector
+        :param c_sekt: Code of the starting sector
+        :param ring_len: Number of sectors of the first ring (every next ring is twice as large)
+        :return: The method does not return any values
+        """
+
+        self.addr_phrs = addr_phrs
+        self.sekts_num = len(sekts_bounds)
+
+        # Klucz sortowania to odleglosc Czebyszewa (w komorkach siatki) od srodka sektora poczatkowego do krawedzi
+        # sektora - kod sektora rozstrzyga remisy, wiec kolejnosc sektorow jest taka sama jak przy sortowaniu stabilnym
+        # wszystkich sektorow
+        centr_row = (sekts_bounds[c_sekt, 0] + sekts_bounds[c_sekt, 1]) / 2
+        centr_col = (sekts_bounds[c_sekt, 2] + sekts_bounds[c_sekt, 3]) / 2
+        rows_dist = np.maximum(np.maximum(sekts_bounds[:, 0] - centr_row, centr_row - sekts_bounds[:, 1]), 0)
+        cols_dist = np.maximum(np.maximum(sekts_bounds[:, 2] - centr_col, centr_col - sekts_bounds[:, 3]), 0)
+        self.sekts_keys = np.maximum(rows_dist, cols_dist) * self.sekts_num + np.arange(self.sekts_num)
+        self.rest_ids = np.arange(self.sekts_num)
+        self.ring_len = max(ring_len, 1)
+        self.sekts_list = []
+        self.sekts_bounds = []
+        self.add_ring()
+
+    def __len__(self) -> int:
+        """
+        Method that returns number of all sectors (including sectors of rings which have not been found yet)
+
+        :return: Number of sectors
+        """
+
+        return self.sekts_num
+
+    def __getitem__(self, s_idx: int) -> str:
+        """
+        Method that returns address phrases of a sector on a given position
+
+        :param s_idx: Position of the sector
+        :return: Address phrases of the sector
+        """
+
+        self.fill_rings(s_idx)
+        return super().__getitem__(s_idx)
+
+    def add_ring(self) -> None:
+        """
+        Method that appends to the sequence the next ring - the nearest sectors which have not been sorted yet
+
+        :return: The method does not return any values
+        """
+
+        rest_keys = self.sekts_keys[self.rest_ids]
+
+        # Wybieramy najblizsze sektory w czasie liniowym i sortujemy tylko je
+        if len(self.rest_ids) > self.ring_len:
+            part_ids = np.argpartition(rest_keys, self.ring_len - 1)
+            ring_ids = part_ids[:self.ring_len]
+            ring_sekts = self.rest_ids[ring_ids[np.argsort(rest_keys[ring_ids])]]
+            self.rest_ids = self.rest_ids[part_ids[self.ring_len:]]
+        else:
+            ring_sekts = self.rest_ids[np.argsort(rest_keys)]
+            self.rest_ids = self.rest_ids[:0]
+
+        self.sekts_list += ring_sekts.tolist()
+        sekts_offs = self.addr_phrs.sekts_offs
+        self.sekts_bounds += (np.stack((sekts_offs[ring_sekts], sekts_offs[ring_sekts + 1]), axis=1) +
+                              self.addr_phrs.data_start).tolist()
+        self.ring_len *= 2
+
+    def fill_rings(self, s_idx: int) -> None:
+        """
+        Method that finds next rings of sectors until the sequence contains sector on a given position
+
+        :param s_idx: Position of the sector
+        :return: The method does not return any values
+        """
+
+        while len(self.sekts_list) <= s_idx < self.sekts_num:
+            self.add_ring()
+
+    def get_code(self, s_idx: int) -> int:
+        """
+        Method that returns code of the sector on a given position
+
+        :param s_idx: Position of the sector
+        :return: Code of the sector
+        """
+
+        self.fill_rings(s_idx)
+        return self.sekts_list[s_idx]
+
+    def get_codes(self, sekts_len: int) -> List[int]:
+        """
+        Method that returns codes of a given number of the first sectors
+
+        :param sekts_len: Number of sectors
+        :return: List of codes of sectors
+        """
+
+        self.fill_rings(min(sekts_len, self.sekts_num) - 1)
+        return self.sekts_list[:sekts_len]
+
+    def find_text(self, s_idx: int, curr_text: str) -> bool:
+        """
+        Method that checks if address phrases of a given sector contain current text
+
+        :param s_idx: Position of the sector
+        :param curr_text: Current text
+        :return: Flag indicating that sector contains current text
+        """
+
+        self.fill_rings(s_idx)
+        return super().find_text(s_idx, curr_text)
+
+    def find_lines(self, s_idx: int, curr_text: str, max_lines: int) -> Tuple[List[str], bool]:
+        """
+        Method that returns address lines of a given sector containing current text
+
+        :param s_idx: Position of the sector
+        :param curr_text: Current text
+        :param max_lines: Maximum number of returned address lines
+        :return:
+            - c_lines (:py:class:`list`) - address lines containing current text
+            - full_flag (:py:class:`bool`) - flag indicating that all matching address lines were returned
+        """
+
+        self.fill_rings(s_idx)
+        return super().find_lines(s_idx, curr_text, max_lines)
+
+
+class AddrSearch(object):
+    """
+    Class that searches address phrases of a database snapshot for PRG points matching texts typed by the user - the
+    same search is executed by the GUI window and by the benchmark of query paths
+    """
+
+    def __init__(self, addr_phrs: AddrPhrases, addr_uniq_words: str, sekts_bounds: np.ndarray, c_sekt: int,
+                 max_sekts: int, prefix_cache: PrefixCache, fuzzy_index: FuzzyIndex, c_ptrn: re.Pattern) -> None:
+        """
+        Method that creates objects from a class "AddrSearch"
+
+        :param addr_phrs: Memory-mapped address phrases
+        :param addr_uniq_words: Unique words of address phrases
+        :param sekts_bounds: Numpy array containing first row, row following the last row, first column and column
+                             following the last column of cells of every sector
+        :param c_sekt: Code of the starting sector
+        :param max_sekts: Maximum number of sectors searched after finding the first PRG point
+        :param prefix_cache: Cache of results of previous searches
+        :param fuzzy_index: Index of unique words used for correcting typos
+        :param c_ptrn: Pattern of geographic coordinates typed by the user
+        :return: The method does not return any values
+        """
+
+        self.addr_phrs = addr_phrs
+        self.addr_uniq_words = addr_uniq_words
+        self.sekts_bounds = sekts_bounds
+        self.max_sekts = max_sekts
+        self.prefix_cache = prefix_cache
+        self.fuzzy_index = fuzzy_index
+        self.c_ptrn = c_ptrn
+        self.c_sekt = c_sekt
+
+        # Tworzymy sekwencje sektorow uporzadkowanych pierscieniami wokol sektora poczatkowego - kolejne pierscienie
+        # wyznaczane sa dopiero wtedy, gdy dotrze do nich wyszukiwanie
+        self.adds_list = SectorsRings(addr_phrs, sekts_bounds, c_sekt, max_sekts + 1)
+
+    def change_sekts_order(self, c_sekt: int) -> None:
+        """
+        Method that changes order of sectors - rings of sectors are centred on a given sector only if it is not one of
+        'max_sekts' + 1 sectors closest to the current starting sector
+
+        :param c_sekt: Code of the sector
+        :return: The method does not return any values
+        """
+
+        if c_sekt not in self.adds_list.get_codes(self.max_sekts + 1):
+            self.adds_list = SectorsRings(self.addr_phrs, self.sekts_bounds, c_sekt, self.max_sekts + 1)
+            self.c_sekt = c_sekt
+
+            # Zmiana kolejnosci sektorow uniewaznia zapamietane wyniki wyszukiwania
+            self.prefix_cache.clear()
+
+    def search_text(self, start_text: str, curr_text: str, last_text: str, addrs_num: int,
+                    deadline: Optional[float] = None) -> Optional[Tuple[List[str], int]]:
+        """
+        Method that searches for PRG points matching a given text - if there are no such PRG points in the whole
+        country, text is searched once again after correcting its typos. Finished search centres order of sectors on
+        the sector on which the search was stopped
+
+        :param start_text: Text typed by the user
+        :param curr_text: Text typed by the user in the form of address phrases (returned by function "normalize_text")
+        :param last_text: Last word of current text (returned by function "normalize_text")
+        :param addrs_num: Number of searched PRG points
+        :param deadline: Time (returned by function "time.perf_counter") after which scanning of sectors is interrupted
+                         (None if scanning should not be interrupted)
+        :return: None if the text is not searched (suggestions should not be changed) or
+            - prg_ids (:py:class:`list`) - list of indices of PRG points matching given text
+            - stop_idx (:py:class:`int`) - position of the sector on which the search was stopped (-1 if no PRG points
+              were found or PART_IDX if scanning was interrupted)
+        """
+
+        coords_flag = self.c_ptrn.match(start_text) is not None
+
+        if curr_text != "" and ", g" not in start_text and last_text in self.addr_uniq_words:
+            # Przeszukujemy sektory zawezajac wyniki zapamietane dla poprzednio wpisanych fraz
+            prg_ids, stop_idx = search_addr_phrases(self.adds_list, curr_text, addrs_num, self.max_sekts,
+                                                    self.prefix_cache, deadline)
+
+            # Jezeli w calej Polsce nie znaleziono zadnego adresu to szukamy adresow z poprawionymi literowkami
+            if not prg_ids and stop_idx != PART_IDX and not coords_flag:
+                prg_ids, stop_idx = search_fuzzy_phrases(self.adds_list, curr_text, addrs_num, self.max_sekts,
+                                                         self.prefix_cache, self.fuzzy_index, deadline)
+        elif last_text not in self.addr_uniq_words:
+            prg_ids, stop_idx = ([], -1) if coords_flag or ", g" in start_text else \
+                search_fuzzy_phrases(self.adds_list, curr_text, addrs_num, self.max_sekts, self.prefix_cache,
+                                     self.fuzzy_index, deadline)
+        else:
+            return None
+
+        # Kolejnosc sektorow zmieniamy dopiero po zakonczeniu wyszukiwania, bo przerwane wyszukiwanie jest wznawiane
+        # w tej samej kolejnosci sektorow
+        if prg_ids and stop_idx != PART_IDX:
+            self.change_sekts_order(self.adds_list.get_code(stop_idx))
+
+        return prg_ids, stop_idx
+
+
+def save_addr_phrases(sekt_addr_phrs: np.ndarray, phrs_path: str) -> None:
+    """
+    Function that saves address phrases of sectors to the file that can be memory-mapped by class "AddrPhrases"
+
+    :param sekt_addr_phrs: Numpy array containing address phrases of sectors (indexed by codes of sectors)
+    :param phrs_path: Path to the file with address phrases
+    :return: The method does not return any values
+    """
+
+    head_dtype = AddrPhrases.head_dtype
+    sekts_offs = np.zeros(sekt_addr_phrs.size + 1, dtype=head_dtype)
+    offs_start = len(AddrPhrases.file_sign) + head_dtype.itemsize
+    temp_path = phrs_path + ".tmp"
+
+    with open(temp_path, 'wb') as file:
+        file.write(AddrPhrases.file_sign)
+        file.write(np.array([sekt_addr_phrs.size], dtype=head_dtype).tobytes())
+        file.seek(offs_start + sekts_offs.nbytes)
+
+        # Zapisujemy kolejno sektory, a nastepnie uzupelniamy tablice ich przesuniec
+        for i, c_addrs in enumerate(sekt_addr_phrs.ravel()):
+            sekts_offs[i + 1] = sekts_offs[i] + file.write(c_addrs.encode("utf-8"))
+
+        file.seek(offs_start)
+        file.write(sekts_offs.tobytes())
+
+    # Podmieniamy plik dopiero po jego pelnym zapisaniu, aby nie uszkodzic pliku otwartego przez inne procesy
+    os.replace(temp_path, phrs_path)
+
+
+def bounded_edit_distance(word1: str, word2: str, max_dist: int, prefix_flag: bool = False) -> int:
+    """
+    Function that calculates edit distance (optimal string alignment) between two words - calculation is stopped as
+    soon as distance exceeds maximum distance
+
+    :param word1: First word
+    :param word2: Second word
+    :param max_dist: Maximum edit distance
+    :param prefix_flag: Flag indicating that distance should be calculated between first word and the closest prefix of
+                        second word
+    :return: Edit distance between words or "max_dist + 1" if distance exceeds maximum distance
+    """
+
+    len1, len2 = len(word1), len(word2)
+    big_dist = max_dist + 1
+
+    if max_dist < 0 or len1 - len2 > max_dist or (not prefix_flag and len2 - len1 > max_dist):
+        return big_dist
+
+    # Wyliczamy tylko komorki macierzy odleglosci lezace w pasie o szerokosci 'max_dist' wokol przekatnej
+    prev2_row = []
+    prev_row = [j if j <= max_dist else big_dist for j in range(len2 + 1)]
+
+    for i in range(1, len1 + 1):
+        j_min, j_max = max(1, i - max_dist), min(len2, i + max_dist)
+        curr_row = [big_dist] * (len2 + 1)
+        curr_row[0] = i if i <= max_dist else big_dist
+
+        for j in range(j_min, j_max + 1):
+            c_dist = min(prev_row[j] + 1, curr_row[j - 1] + 1, prev_row[j - 1] + (word1[i - 1] != word2[j - 1]))
+
+            if i > 1 and j > 1 and word1[i - 1] == word2[j - 2] and word1[i - 2] == word2[j - 1]:
+                c_dist = min(c_dist, prev2_row[j - 2] + 1)
+
+            curr_row[j] = min(c_dist, big_dist)
+
+        if min(curr_row) > max_dist:
+            return big_dist
+
+        prev2_row, prev_row = prev_row, curr_row
+
+    return min(prev_row) if prefix_flag else prev_row[len2]
+
+
+def get_phrase_lines(c_addrs: Union[AnyStr, mmap.mmap], curr_text: AnyStr, max_lines: int, sekt_start: int = 0,
+                     sekt_end: Optional[int] = None) -> Tuple[List[AnyStr], bool]:
+    """
+    Function that returns address lines of a given sector containing current text
+
+    :param c_addrs: Address phrases of a given sector (string, bytes or memory-mapped file)
+    :param curr_text: Current text (bytes if address phrases are not a string)
+    :param max_lines: Maximum number of returned address lines
+    :param sekt_start: Position of the first character of the sector in address phrases
+    :param sekt_end: Position following the last character of the sector in address phrases (None - end of phrases)
+    :return:
+        - c_lines (:py:class:`list`) - address lines containing current text
+        - full_flag (:py:class:`bool`) - flag indicating that all matching address lines were returned
+    """
+
+    sekt_end = len(c_addrs) if sekt_end is None else sekt_end
+    new_line = "\n" if isinstance(curr_text, str) else b"\n"
+    c_lines = []
+    c_start = sekt_start
+
+    while True:
+        str_idx = c_addrs.find(curr_text, c_start, sekt_end)
+
+        if str_idx < 0:
+            return c_lines, True
+        elif len(c_lines) >= max_lines:
+            return c_lines, False
+
+        # Wycinamy caly wiersz adresowy, w ktorym znaleziono szukana fraze
+        line_start = max(c_addrs.rfind(new_line, sekt_start, str_idx) + 1, sekt_start)
+        line_end = c_addrs.find(new_line, str_idx, sekt_end)
+        line_end = sekt_end if line_end < 0 else line_end
+        c_lines.append(c_addrs[line_start:line_end])
+        c_start = line_end
+
+
+def normalize_text(start_text: str) -> Tuple[str, str]:
+    """
+    Function that converts text typed by the user to the form of address phrases
+
+    :param start_text: Text typed by the user
+    :return:
+        - curr_text (:py:class:`str`) - current text in the form of address phrases
+        - last_text (:py:class:`str`) - last word of current text
+    """
+
+    # Dodajemy spacje (" ") na początku wyszukiwanej frazy żeby rozróżniać miasta typu: "INNOWROCLAW" i "WROCLAW"
+    curr_text = unidecode((" " + start_text).upper()).replace(",", "").replace("UL. ", "")
+    last_text = curr_text[max(curr_text.strip().rfind(" ") + 1, 0):].strip()
+    return curr_text, last_text
+
+
+def get_line_id(c_line: str) -> str:
+    """
+    Function that returns index of PRG point from a given address line
+
+    :param c_line: Address line
+    :return: Index of PRG point
+    """
+
+    return c_line[c_line.rfind(" [") + 2:c_line.rfind("]")]
+
+
+def search_addr_phrases(adds_list: SectorsView, curr_text: str, addrs_num: int, max_sekts: int,
+                        prefix_cache: PrefixCache, deadline: Optional[float] = None) -> Tuple[List[str], int]:
+    """
+    Function that searches sectors for address phrases containing current text using cached results of previous
+    searches - search interrupted after exceeding time limit is resumed by the next call for the same text
+
+    :param adds_list: Sequence of sectors of address phrases sorted by distance from the starting sector
+    :param curr_text: Current text
+    :param addrs_num: Number of searched PRG points
+    :param max_sekts: Maximum number of sectors searched after finding the first PRG point
+    :param prefix_cache: Cache of results of previous searches
+    :param deadline: Time (returned by function "time.perf_counter") after which scanning of sectors is interrupted
+                     (None if scanning should not be interrupted)
+    :return:
+        - prg_ids (:py:class:`list`) - list of indices of PRG points matching current text (found so far if scanning
+          was interrupted)
+        - stop_idx (:py:class:`int`) - position of the sector on which the search was stopped (PART_IDX if scanning
+          was interrupted)
+    """
+
+    prefix_cache.check_sectors(adds_list)
+    phrase_hits = prefix_cache.get_entry(curr_text)
+
+    # Jezeli wyszukiwanej frazy nie ma w pamieci podrecznej to zawezamy wyniki dla najdluzszego jej prefiksu, a jezeli
+    # wyszukiwanie frazy zostalo przerwane, to wznawiamy je od miejsca przerwania
+    if phrase_hits is None or phrase_hits.stop_idx == PART_IDX:
+        base_hits = prefix_cache.get_base_entry(curr_text)
+        phrase_hits = scan_addr_phrases(adds_list, curr_text, addrs_num, max_sekts, base_hits, prefix_cache.max_lines,
+                                        deadline)
+
+        # Wyniki zapisujemy tylko wtedy, gdy w trakcie skanowania nie zmieniono kolejnosci sektorow
+        if prefix_cache.adds_list is adds_list:
+            prefix_cache.add_entry(curr_text, phrase_hits)
+
+    return phrase_hits.prg_ids, phrase_hits.stop_idx
+
+
+def search_fuzzy_phrases(adds_list: SectorsView, curr_text: str, addrs_num: int, max_sekts: int,
+                         prefix_cache: PrefixCache, fuzzy_index: FuzzyIndex,
+                         deadline: Optional[float] = None) -> Tuple[List[str], int]:
+    """
+    Function that searches sectors for address phrases containing current text after correcting its typos
+
+    :param adds_list: Sequence of sectors of address phrases sorted by distance from the starting sector
+    :param curr_text: Current text
+    :param addrs_num: Number of searched PRG points
+    :param max_sekts: Maximum number of sectors searched after finding the first PRG point
+    :param prefix_cache: Cache of results of previous searches
+    :param fuzzy_index: Index of unique words used for correcting typos
+    :param deadline: Time (returned by function "time.perf_counter") after which scanning of sectors is interrupted
+                     (None if scanning should not be interrupted)
+    :return:
+        - prg_ids (:py:class:`list`) - list of indices of PRG points matching corrected text
+        - stop_idx (:py:class:`int`) - position of the sector on which the search was stopped (PART_IDX if scanning
+          was interrupted)
+    """
+
+    fuzzy_text = fuzzy_index.correct_text(curr_text)
+
+    if fuzzy_text is None:
+        return [], -1
+
+    return search_addr_phrases(adds_list, fuzzy_text, addrs_num, max_sekts, prefix_cache, deadline)
+
+
+def scan_addr_phrases(adds_list: SectorsView, curr_text: str, addrs_num: int, max_sekts: int,
+                      base_hits: Optional[PhraseHits], max_lines: int, deadline: Optional[float] = None) -> PhraseHits:
+    """
+    Function that scans sectors for address phrases containing current text - sectors already scanned for a prefix of
+    current text are filtered instead of being scanned once again. Scanning of further sectors is interrupted after
+    exceeding time limit (at least one further sector is always scanned, so repeated calls finish the search)
+
+    :param adds_list: Sequence of sectors of address phrases sorted by distance from the starting sector
+    :param curr_text: Current text
+    :param addrs_num: Number of searched PRG points
+    :param max_sekts: Maximum number of sectors searched after finding the first PRG point
+    :param base_hits: Search results for a prefix of current text (or None)
+    :param max_lines: Maximum number of address lines stored for a single sector
+    :param deadline: Time (returned by function "time.perf_counter") after which scanning of sectors is interrupted
+                     (None if scanning should not be interrupted)
+    :return: Search results for current text
+    """
+
+    # Zawsze zapamietujemy co najmniej tyle wierszy adresowych ile szukamy punktow PRG
+    max_lines = max(max_lines, addrs_num)
+    sekt_lines = OrderedDict()
+    prg_ids = []
+    prev_idx = -1
+    sek_licz = 0
+    stop_idx = -1
+    pause_idx = -1
+
+    def get_matched_sekts():
+        """
+        Generator that yields positions of sectors containing current text along with matching address lines
+
+        :return: Generator of tuples containing position of sector, address lines and flag of complete lines list
+        """
+
+        nonlocal pause_idx
+        scan_start = 0
+
+        if base_hits is not None:
+            for b_idx, b_lines in base_hits.sekt_lines.items():
+                if b_lines is None:
+                    c_lines, full_flag = adds_list.find_lines(b_idx, curr_text, max_lines)
+                else:
+                    c_lines, full_flag = [line for line in b_lines if curr_text in line], True
+
+                if c_lines:
+                    yield b_idx, c_lines, full_flag
+
+            scan_start = base_hits.scan_end
+
+        for s_idx in range(scan_start, len(adds_list)):
+            if deadline is not None and s_idx > scan_start and time.perf_counter() > deadline:
+                pause_idx = s_idx
+                return
+
+            if adds_list.find_text(s_idx, curr_text):
+                yield (s_idx, *adds_list.find_lines(s_idx, curr_text, max_lines))
+
+    def check_gap(gap_start: int, gap_end: int) -> int:
+        """
+        Function that checks if search should be stopped within sectors not containing current text
+
+        :param gap_start: Position of the first sector not containing current text
+        :param gap_end: Position of the sector following the last sector not containing current text
+        :return: Position of the sector on which the search should be stopped (-1 if search should be continued)
+        """
+
+        nonlocal sek_licz
+        gap_len = gap_end - gap_start
+
+        if not prg_ids or gap_len <= 0:
+            return -1
+        elif len(prg_ids) >= addrs_num:
+            return gap_start
+
+        # Po znalezieniu pierwszego punktu przeszukujemy jeszcze maksymalnie 'max_sekts' + 1 pustych sektorow
+        sekts_left = max_sekts + 1 - sek_licz
+
+        if gap_len > sekts_left:
+            return gap_start + sekts_left
+
+        sek_licz += gap_len
+        return -1
+
+    for i, lines_list, lines_flag in get_matched_sekts():
+        stop_idx = check_gap(prev_idx + 1, i)
+
+        if stop_idx >= 0:
+            break
+        elif len(prg_ids) >= addrs_num:
+            stop_idx = i
+            break
+
+        prg_ids += [get_line_id(line) for line in lines_list[:addrs_num - len(prg_ids)]]
+        sekt_lines[i] = lines_list if lines_flag else None
+        prev_idx = i
+    else:
+        stop_idx = check_gap(prev_idx + 1, pause_idx if pause_idx >= 0 else len(adds_list))
+
+        # Przerwane przeszukiwanie zwraca dotychczas znalezione punkty PRG, jezeli nie nalezalo go juz zatrzymac
+        if stop_idx < 0 and pause_idx >= 0:
+            return PhraseHits(sekt_lines, pause_idx, prg_ids, PART_IDX)
+
+    scan_end = stop_idx if stop_idx >= 0 else len(adds_list)
+    return PhraseHits(sekt_lines, scan_end, prg_ids if stop_idx >= 0 else [], stop_idx)
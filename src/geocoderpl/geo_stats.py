@@ -0,0 +1,134 @@
+""" Module that measures latency of stages of the query path of the GUI window of the GeocoderPL project """
+
+import json
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+from geo_utilities import *
+
+# Definiujemy etapy sciezki zapytania okna GUI - od wcisniecia klawisza do wyswietlenia podpowiedzi oraz od wyboru
+# podpowiedzi do zmiany mapy
+STATS_STAGES = ("keystroke", "normalization", "index_scan", "sql_fetch", "labels", "completer", "map_render")
+
+# Definiujemy gorne granice przedzialow histogramow czasow wykonania etapow (w milisekundach)
+STATS_BUCKETS = (0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 50.0, 100.0, 200.0, 500.0, 1000.0, np.inf)
+
+# Definiujemy znaki, ktorymi rysowane sa histogramy w panelu diagnostycznym
+HIST_BARS = " ▁▂▃▄▅▆▇█"
+
+
+class LatencyStats(object):
+    """
+    Class that keeps in memory the latest times of execution of every stage of the query path of the GUI window and
+    creates their histograms - times are measured by the search worker and by the main thread, so access to them is
+    synchronized
+    """
+
+    def __init__(self, window_size: int) -> None:
+        """
+        Method that creates objects from a class "LatencyStats"
+
+        :param window_size: Number of the latest times of execution kept in memory for every stage
+        :return: The method does not return any values
+        """
+
+        self.stats_lock = threading.Lock()
+        self.stage_times = {c_stage: deque(maxlen=window_size) for c_stage in STATS_STAGES}
+
+    @contextmanager
+    def measure(self, c_stage: str) -> Iterator[None]:
+        """
+        Method that measures time of execution of the block of code and saves it as a time of a given stage
+
+        :param c_stage: Name of the stage
+        :return: The method does not return any values
+        """
+
+        start_time = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.add_time(c_stage, (time.perf_counter() - start_time) * 1000)
+
+    def add_time(self, c_stage: str, time_ms: float) -> None:
+        """
+        Method that saves time of execution of a given stage - the oldest time is removed when the limit is reached
+
+        :param c_stage: Name of the stage
+        :param time_ms: Time of execution (in milliseconds)
+        :return: The method does not return any values
+        """
+
+        with self.stats_lock:
+            self.stage_times[c_stage].append(time_ms)
+
+    def get_summary(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Method that returns number of measurements, percentiles and histogram of the latest times of execution of every
+        stage
+
+        :return: Dictionary mapping names of stages to their statistics (times in milliseconds, histogram as numbers of
+                 times in buckets STATS_BUCKETS)
+        """
+
+        with self.stats_lock:
+            stage_times = {c_stage: np.asarray(c_times) for c_stage, c_times in self.stage_times.items()}
+
+        stats_summary = {}
+
+        for c_stage, c_times in stage_times.items():
+            if len(c_times) == 0:
+                stats_summary[c_stage] = {"calls": 0, "p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None,
+                                          "hist": [0] * len(STATS_BUCKETS)}
+                continue
+
+            stats_summary[c_stage] = {"calls": len(c_times), "p50_ms": float(np.percentile(c_times, 50)),
+                                      "p95_ms": float(np.percentile(c_times, 95)),
+                                      "p99_ms": float(np.percentile(c_times, 99)), "max_ms": float(c_times.max()),
+                                      "hist": np.bincount(np.searchsorted(STATS_BUCKETS, c_times),
+                                                          minlength=len(STATS_BUCKETS)).tolist()}
+
+        return stats_summary
+
+    def format_summary(self) -> str:
+        """
+        Method that creates text table of statistics of stages shown in the debug panel of the GUI window - histogram
+        of every stage is drawn as a sequence of bars, one bar for every bucket from 0.1 ms to over 1 s
+
+        :return: Text table of statistics
+        """
+
+        table_rows = ["{:<14}{:>7}{:>10}{:>10}{:>10}{:>10}  {}".format(
+            "etap", "liczba", "p50 [ms]", "p95 [ms]", "p99 [ms]", "max [ms]", "histogram")]
+
+        for c_stage, c_stats in self.get_summary().items():
+            if c_stats["calls"] == 0:
+                table_rows.append("{:<14}{:>7}".format(c_stage, 0))
+                continue
+
+            max_count = max(c_stats["hist"])
+            hist_bars = "".join([HIST_BARS[int(np.ceil(c_count / max_count * (len(HIST_BARS) - 1)))]
+                                 for c_count in c_stats["hist"]])
+            table_rows.append("{:<14}{:>7}{:>10.2f}{:>10.2f}{:>10.2f}{:>10.2f}  |{}|".format(
+                c_stage, c_stats["calls"], c_stats["p50_ms"], c_stats["p95_ms"], c_stats["p99_ms"], c_stats["max_ms"],
+                hist_bars))
+
+        return "\n".join(table_rows)
+
+    def dump_summary(self, stats_path: str) -> None:
+        """
+        Method that saves statistics of stages to JSON file - the last bucket of histograms (times over 1 s) has upper
+        limit saved as null
+
+        :param stats_path: Path to JSON file
+        :return: The method does not return any values
+        """
+
+        os.makedirs(os.path.dirname(os.path.abspath(stats_path)), exist_ok=True)
+
+        with open(stats_path, "w", encoding="utf-8") as stats_file:
+            json.dump({"buckets_ms": [c_val if np.isfinite(c_val) else None for c_val in STATS_BUCKETS],
+                       "stages": self.get_summary()}, stats_file, indent=2)
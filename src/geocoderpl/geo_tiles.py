@@ -0,0 +1,572 @@
+""" Module that serves map tiles of the GeocoderPL project - GeoJSON tiles with simplified outlines of BDOT10k buildings
+cached on disk, basemap tiles read from local MBTiles file and popups of PRG points shown on the map """
+
+import argparse
+import base64
+import json
+import math
+import threading
+import urllib.error
+import urllib.request
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.request import pathname2url
+
+from db_classes import get_snapshot_version
+from db_queries import get_bdot10k_bbox
+from geo_labels import LabelsCache
+from geo_utilities import *
+
+# Definiujemy wzorce adresow kafelkow z budynkami BDOT10k i kafelkow podkladu mapy (poziom przyblizenia, kolumna i
+# wiersz kafelka)
+TILE_PTRN = re.compile(r"/bubd/(\d+)/(\d+)/(\d+)\.geojson")
+BASEMAP_PTRN = re.compile(r"/basemap/(\d+)/(\d+)/(\d+)")
+
+# Definiujemy wzorzec adresu opisu punktu adresowego wyswietlanego po kliknieciu punktu na mapie (indeks punktu)
+POPUP_PTRN = re.compile(r"/popup/(\d+)")
+
+# Definiujemy typy MIME formatow kafelkow zapisywanych w plikach MBTiles
+TILE_FORMATS = {"png": "image/png", "jpg": "image/jpeg", "webp": "image/webp"}
+
+# Definiujemy polecenia tworzace tablice pliku MBTiles - wiersze kafelkow numerowane sa od dolu (schemat TMS)
+MBTILES_SQL = (
+    "CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT)",
+    "CREATE TABLE IF NOT EXISTS tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS tile_index ON tiles (zoom_level, tile_column, tile_row)")
+
+
+def get_tile_bbox(tile_z: int, tile_x: int, tile_y: int) -> Tuple[float, float, float, float]:
+    """
+    Function that returns bounding box of a given map tile (in the Web Mercator tiling scheme used by Leaflet)
+
+    :param tile_z: Zoom level of the tile
+    :param tile_x: Column of the tile
+    :param tile_y: Row of the tile
+    :return: Minimum latitude, minimum longitude, maximum latitude and maximum longitude of the tile
+    """
+
+    tiles_num = 2 ** tile_z
+    min_long = tile_x / tiles_num * 360.0 - 180.0
+    max_long = (tile_x + 1) / tiles_num * 360.0 - 180.0
+    max_lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / tiles_num))))
+    min_lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (tile_y + 1) / tiles_num))))
+    return min_lat, min_long, max_lat, max_long
+
+
+def encode_points(prg_ids: np.ndarray, lats_arr: np.ndarray, longs_arr: np.ndarray) -> str:
+    """
+    Function that packs indices and coordinates of points shown on the map into typed arrays read by JavaScript -
+    points are sorted by longitude, latitudes and longitudes are saved as 32-bit floats (accuracy of about 1 meter) and
+    indices as 32-bit unsigned integers, one array after another, and the whole buffer is encoded in base64
+
+    :param prg_ids: Indices of points
+    :param lats_arr: Latitudes of points
+    :param longs_arr: Longitudes of points
+    :return: Buffer of typed arrays encoded in base64
+    """
+
+    longs_arr = np.asarray(longs_arr, dtype="<f4")
+    pts_order = np.argsort(longs_arr, kind="stable")
+    pts_buff = np.asarray(lats_arr, dtype="<f4")[pts_order].tobytes() + longs_arr[pts_order].tobytes() + \
+        np.asarray(prg_ids, dtype="<u4")[pts_order].tobytes()
+    return base64.b64encode(pts_buff).decode("ascii")
+
+
+def scan_points(lats_arr: np.ndarray, longs_arr: np.ndarray, sw_corner: Tuple[float, float],
+                ne_corner: Tuple[float, float]) -> np.ndarray:
+    """
+    Function that returns positions of points located inside given bounding box - points have to be sorted by
+    longitude (as packed by function "encode_points"), so the first point is found by binary search and points are
+    scanned only until the eastern edge of the bounding box. Functions "_first" and "_scan" of the map layer
+    "PointsLayer" work the same way
+
+    :param lats_arr: Latitudes of points
+    :param longs_arr: Longitudes of points sorted in ascending order
+    :param sw_corner: Latitude and longitude of the south-western corner of the bounding box
+    :param ne_corner: Latitude and longitude of the north-eastern corner of the bounding box
+    :return: Positions of points inside the bounding box
+    """
+
+    first_idx = np.searchsorted(longs_arr, sw_corner[1], side="left")
+    last_idx = np.searchsorted(longs_arr, ne_corner[1], side="right")
+    c_lats = lats_arr[first_idx:last_idx]
+    return first_idx + np.nonzero((c_lats >= sw_corner[0]) & (c_lats <= ne_corner[0]))[0]
+
+
+def get_tile_xy(c_lat: float, c_long: float, tile_z: int) -> Tuple[int, int]:
+    """
+    Function that returns column and row of the map tile of a given zoom level containing given coordinates
+
+    :param c_lat: Latitude
+    :param c_long: Longitude
+    :param tile_z: Zoom level of the tile
+    :return: Column and row of the tile
+    """
+
+    tiles_num = 2 ** tile_z
+    tile_x = int((c_long + 180.0) / 360.0 * tiles_num)
+    tile_y = int((1.0 - math.asinh(math.tan(math.radians(c_lat))) / math.pi) / 2.0 * tiles_num)
+    return min(max(tile_x, 0), tiles_num - 1), min(max(tile_y, 0), tiles_num - 1)
+
+
+def simplify_ring(ring_crds: list, tile_bbox: Tuple[float, float, float, float], tile_grid: int) -> Optional[list]:
+    """
+    Function that simplifies ring of a polygon by snapping its vertices to the grid of a given map tile and removing
+    repeated vertices - rings smaller than a single cell of the grid are removed
+
+    :param ring_crds: List of coordinates (longitude, latitude) of vertices of the ring
+    :param tile_bbox: Bounding box of the tile (minimum latitude, minimum longitude, maximum latitude and maximum
+                      longitude)
+    :param tile_grid: Number of cells of the grid (in row and column of the tile)
+    :return: List of coordinates of vertices of the simplified ring (or None if the ring has been removed)
+    """
+
+    min_lat, min_long, max_lat, max_long = tile_bbox
+    cell_crds = np.asarray(ring_crds, dtype=np.float64)[:, :2]
+    cell_size = np.asarray(((max_long - min_long) / tile_grid, (max_lat - min_lat) / tile_grid))
+    cell_crds = np.round((cell_crds - (min_long, min_lat)) / cell_size)
+
+    # Usuwamy kolejne wierzcholki trafiajace do tej samej komorki siatki
+    uniq_mask = np.ones(len(cell_crds), dtype=bool)
+    uniq_mask[1:] = np.any(cell_crds[1:] != cell_crds[:-1], axis=1)
+    cell_crds = cell_crds[uniq_mask]
+
+    if len(cell_crds) > 1 and np.all(cell_crds[0] == cell_crds[-1]):
+        cell_crds = cell_crds[:-1]
+
+    if len(cell_crds) < 3:
+        return None
+
+    ring_crds = np.round(cell_crds * cell_size + (min_long, min_lat), int(os.environ["COORDS_PREC"]))
+    return np.vstack((ring_crds, ring_crds[:1])).tolist()
+
+
+def create_tile(tile_z: int, tile_x: int, tile_y: int) -> bytes:
+    """
+    Function that creates GeoJSON collection of simplified outlines of BDOT10k buildings of a given map tile - every
+    building is saved only in the tile containing its centroid, and tiles of zoom levels lower than TILES_MIN_ZOOM are
+    empty
+
+    :param tile_z: Zoom level of the tile
+    :param tile_x: Column of the tile
+    :param tile_y: Row of the tile
+    :return: GeoJSON collection encoded in UTF-8
+    """
+
+    tile_feats = []
+
+    if tile_z >= int(os.environ["TILES_MIN_ZOOM"]):
+        tile_bbox = get_tile_bbox(tile_z, tile_x, tile_y)
+        min_lat, min_long, max_lat, max_long = tile_bbox
+        tile_grid = int(os.environ["TILES_GRID"])
+
+        for bubd_id, opis_budynku, bubd_geojson, centr_long, centr_lat, _ in get_bdot10k_bbox(*tile_bbox):
+            if not (min_long <= centr_long < max_long and min_lat <= centr_lat < max_lat):
+                continue
+
+            # Pomijamy otwory wielokata mniejsze od komorki siatki, a budynki mniejsze od komorki siatki w calosci
+            bubd_rings = [simplify_ring(ring_crds, tile_bbox, tile_grid) for ring_crds in
+                          json.loads(bubd_geojson)["coordinates"]]
+
+            if bubd_rings and bubd_rings[0] is not None:
+                tile_feats.append({"type": "Feature", "id": int(bubd_id), "properties": {"OPIS": opis_budynku},
+                                   "geometry": {"type": "Polygon", "coordinates": [ring_crds for ring_crds in bubd_rings
+                                                                                   if ring_crds is not None]}})
+
+    return json.dumps({"type": "FeatureCollection", "features": tile_feats}, ensure_ascii=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+class TileCache(object):
+    """
+    Class that stores map tiles in files on disk and removes least recently used tiles when total size of the files
+    exceeds a given limit - order of using of tiles is kept in modification times of the files, so it survives restart
+    of the application (files saved by previous runs are used only after they are read by method "load_tiles")
+    """
+
+    def __init__(self, cache_path: str, max_size: int) -> None:
+        """
+        Method that creates objects from a class "TileCache"
+
+        :param cache_path: Path to the directory storing files of tiles
+        :param max_size: Maximum total size (in bytes) of files of tiles
+        :return: The method does not return any values
+        """
+
+        self.cache_path = cache_path
+        self.max_size = max_size
+        self.cache_lock = threading.Lock()
+        self.tiles_sizes = OrderedDict()
+        self.temp_paths = set()
+        self.cache_size = 0
+
+    def load_tiles(self) -> None:
+        """
+        Method that restores order of using of tiles saved by previous runs of the application - directory of the cache
+        can contain many small files, so it is scanned outside of the constructor while tiles are already served. Tiles
+        saved in the meantime are kept as the most recently used ones
+
+        :return: The method does not return any values
+        """
+
+        tiles_stats = []
+
+        for c_dir, _, c_files in os.walk(self.cache_path):
+            for c_file in c_files:
+                tile_path = os.path.join(c_dir, c_file)
+
+                try:
+                    if c_file.endswith(".tmp"):
+                        # Usuwamy tylko pliki tymczasowe poprzednich uruchomien - pomijamy pliki zapisywane wlasnie
+                        # przez inne watki
+                        with self.cache_lock:
+                            if tile_path not in self.temp_paths:
+                                os.remove(tile_path)
+                    else:
+                        tile_stat = os.stat(tile_path)
+                        tiles_stats.append((tile_stat.st_mtime, tile_path, tile_stat.st_size))
+                except FileNotFoundError:
+                    pass
+
+        with self.cache_lock:
+            for _, tile_path, tile_size in sorted(tiles_stats, reverse=True):
+                if tile_path not in self.tiles_sizes:
+                    self.tiles_sizes[tile_path] = tile_size
+                    self.tiles_sizes.move_to_end(tile_path, last=False)
+                    self.cache_size += tile_size
+
+            self.evict_tiles()
+
+    def get_tile(self, tile_key: str, tile_func: Callable[[], bytes]) -> bytes:
+        """
+        Method that returns content of a given tile - tiles missing in the cache are created by a given function and
+        saved to the cache
+
+        :param tile_key: Relative path of the file of the tile
+        :param tile_func: Function creating content of the tile
+        :return: Content of the tile
+        """
+
+        tile_path = os.path.join(self.cache_path, tile_key)
+
+        with self.cache_lock:
+            if tile_path in self.tiles_sizes:
+                # Plik kafelka mogl zostac usuniety przed odczytaniem katalogu (metoda "load_tiles"), wtedy kafelek
+                # tworzymy od nowa
+                try:
+                    os.utime(tile_path)
+
+                    with open(tile_path, 'rb') as file:
+                        self.tiles_sizes.move_to_end(tile_path)
+                        return file.read()
+                except FileNotFoundError:
+                    self.cache_size -= self.tiles_sizes.pop(tile_path)
+
+        # Kafelek tworzymy poza blokada, zeby nie wstrzymywac odczytu innych kafelkow - plik zapisujemy pod nazwa
+        # tymczasowa i podmieniamy jedna operacja, zeby inne watki nie odczytaly niepelnego pliku
+        tile_data = tile_func()
+        os.makedirs(os.path.dirname(tile_path), exist_ok=True)
+        temp_path = tile_path + "." + str(threading.get_ident()) + ".tmp"
+
+        with self.cache_lock:
+            self.temp_paths.add(temp_path)
+
+        with open(temp_path, 'wb') as file:
+            file.write(tile_data)
+
+        with self.cache_lock:
+            os.replace(temp_path, tile_path)
+            self.temp_paths.discard(temp_path)
+            self.cache_size += len(tile_data) - self.tiles_sizes.pop(tile_path, 0)
+            self.tiles_sizes[tile_path] = len(tile_data)
+            self.evict_tiles()
+
+        return tile_data
+
+    def evict_tiles(self) -> None:
+        """
+        Method that removes least recently used tiles until total size of the files does not exceed the limit
+
+        :return: The method does not return any values
+        """
+
+        while self.cache_size > self.max_size and self.tiles_sizes:
+            tile_path, tile_size = self.tiles_sizes.popitem(last=False)
+            self.cache_size -= tile_size
+
+            try:
+                os.remove(tile_path)
+            except FileNotFoundError:
+                pass
+
+
+class BasemapTiles(object):
+    """
+    Class that reads basemap tiles from MBTiles file - recently read tiles (and information about missing tiles) are
+    kept in memory, so panning of the map around the same area does not require reading of the file
+    """
+
+    def __init__(self, mbtiles_path: str, cache_size: int) -> None:
+        """
+        Method that creates objects from a class "BasemapTiles"
+
+        :param mbtiles_path: Path to the MBTiles file
+        :param cache_size: Maximum number of tiles kept in memory
+        :return: The method does not return any values
+        """
+
+        self.cache_size = cache_size
+        self.cache_lock = threading.Lock()
+        self.hot_tiles = OrderedDict()
+        self.mbtiles_engine = sa.create_engine("sqlite:///file:" + pathname2url(os.path.abspath(mbtiles_path)) +
+                                               "?mode=ro&uri=true")
+
+        with self.mbtiles_engine.connect() as db_conn:
+            self.tiles_meta = dict(db_conn.execute(sa.text("SELECT name, value FROM metadata")).all())
+
+        self.tiles_mime = TILE_FORMATS.get(self.tiles_meta.get("format", "png"), "image/png")
+
+    def get_tile(self, tile_z: int, tile_x: int, tile_y: int) -> Optional[bytes]:
+        """
+        Method that returns content of a given basemap tile
+
+        :param tile_z: Zoom level of the tile
+        :param tile_x: Column of the tile
+        :param tile_y: Row of the tile (numbered from the top as in the XYZ scheme)
+        :return: Content of the tile (or None if the tile is missing in the MBTiles file)
+        """
+
+        tile_key = (tile_z, tile_x, tile_y)
+
+        with self.cache_lock:
+            if tile_key in self.hot_tiles:
+                self.hot_tiles.move_to_end(tile_key)
+                return self.hot_tiles[tile_key]
+
+        with self.mbtiles_engine.connect() as db_conn:
+            tile_data = db_conn.execute(sa.text("SELECT tile_data FROM tiles WHERE zoom_level = :z AND tile_column = " +
+                                                ":x AND tile_row = :y"),
+                                        {"z": tile_z, "x": tile_x, "y": 2 ** tile_z - 1 - tile_y}).scalar()
+
+        with self.cache_lock:
+            self.hot_tiles[tile_key] = tile_data
+
+            if len(self.hot_tiles) > self.cache_size:
+                self.hot_tiles.popitem(last=False)
+
+        return tile_data
+
+
+def seed_basemap(mbtiles_path: str, tiles_url: str, tiles_bbox: Tuple[float, float, float, float], min_zoom: int,
+                 max_zoom: int) -> int:
+    """
+    Function that downloads basemap tiles covering a given bounding box to MBTiles file - tiles already saved in the
+    file are skipped, so interrupted seeding can be resumed. Tiles which could not be downloaded are saved to the log
+    and skipped
+
+    :param mbtiles_path: Path to the MBTiles file (created if it does not exist)
+    :param tiles_url: Address of the source of tiles with fields '{z}', '{x}' and '{y}'
+    :param tiles_bbox: Bounding box (minimum latitude, minimum longitude, maximum latitude and maximum longitude)
+    :param min_zoom: Minimum zoom level of tiles
+    :param max_zoom: Maximum zoom level of tiles
+    :return: Number of downloaded tiles
+    """
+
+    min_lat, min_long, max_lat, max_long = tiles_bbox
+    mbtiles_engine = sa.create_engine("sqlite:///" + mbtiles_path)
+    tiles_num = 0
+    errs_num = 0
+
+    with mbtiles_engine.begin() as db_conn:
+        for c_sql in MBTILES_SQL:
+            db_conn.execute(sa.text(c_sql))
+
+    for tile_z in range(min_zoom, max_zoom + 1):
+        min_x, min_y = get_tile_xy(max_lat, min_long, tile_z)
+        max_x, max_y = get_tile_xy(min_lat, max_long, tile_z)
+        logging.getLogger('root').info("Pobieramy kafelki podkładu mapy dla poziomu przybliżenia " + str(tile_z) +
+                                       " (" + str((max_x - min_x + 1) * (max_y - min_y + 1)) + " kafelków).")
+
+        with mbtiles_engine.connect() as db_conn:
+            saved_tiles = set(db_conn.execute(sa.text("SELECT tile_column, tile_row FROM tiles WHERE zoom_level = :z"),
+                                              {"z": tile_z}).all())
+
+        # Kafelki zapisujemy w schemacie TMS, w ktorym wiersze numerowane sa od dolu
+        for tile_x in range(min_x, max_x + 1):
+            tiles_rows = []
+
+            for tile_y in range(min_y, max_y + 1):
+                tile_row = 2 ** tile_z - 1 - tile_y
+
+                if (tile_x, tile_row) not in saved_tiles:
+                    tile_url = tiles_url.format(z=tile_z, x=tile_x, y=tile_y)
+                    c_req = urllib.request.Request(tile_url, headers={"User-Agent": "GeocoderPL"})
+
+                    # Bledy pojedynczych kafelkow (np. brak kafelka lub przekroczenie limitu zapytan) nie przerywaja
+                    # pobierania - pominiete kafelki zostana pobrane przy ponownym uruchomieniu
+                    try:
+                        with urllib.request.urlopen(c_req, timeout=30) as c_resp:
+                            tiles_rows.append({"z": tile_z, "x": tile_x, "y": tile_row, "data": c_resp.read()})
+                    except (urllib.error.URLError, OSError) as c_err:
+                        logging.getLogger('root').warning("Nie udało się pobrać kafelka '" + tile_url + "': " +
+                                                          str(c_err))
+                        errs_num += 1
+
+            if tiles_rows:
+                with mbtiles_engine.begin() as db_conn:
+                    db_conn.execute(sa.text("INSERT OR REPLACE INTO tiles VALUES (:z, :x, :y, :data)"), tiles_rows)
+
+                tiles_num += len(tiles_rows)
+
+    if errs_num > 0:
+        logging.getLogger('root').warning("Nie udało się pobrać " + str(errs_num) + " kafelków podkładu mapy.")
+
+    # Zapisujemy metadane pliku MBTiles (jesli zapisano w nim jakiekolwiek kafelki) - format kafelkow rozpoznajemy po
+    # naglowku zapisanego kafelka
+    with mbtiles_engine.begin() as db_conn:
+        tile_data = db_conn.execute(sa.text("SELECT tile_data FROM tiles LIMIT 1")).scalar()
+
+        if tile_data is not None:
+            tiles_fmt = "png" if tile_data.startswith(b"\x89PNG") else "webp" if tile_data[8:12] == b"WEBP" else \
+                "jpg"
+            zoom_rng = db_conn.execute(sa.text("SELECT MIN(zoom_level), MAX(zoom_level) FROM tiles")).one()
+            tiles_meta = {"name": "GeocoderPL", "type": "baselayer", "format": tiles_fmt,
+                          "minzoom": str(zoom_rng[0]), "maxzoom": str(zoom_rng[1])}
+            db_conn.execute(sa.text("INSERT OR REPLACE INTO metadata VALUES (:name, :value)"),
+                            [{"name": c_name, "value": c_val} for c_name, c_val in tiles_meta.items()])
+
+    mbtiles_engine.dispose()
+    return tiles_num
+
+
+def get_popup_json(labels_cache: LabelsCache, prg_id: int) -> Optional[bytes]:
+    """
+    Function that returns popup of PRG point with a given index as JSON - GeoJSON shape of the building is inserted
+    without decoding, because it is already saved as JSON
+
+    :param labels_cache: Object keeping in memory descriptions and popups of PRG points
+    :param prg_id: Index of PRG point
+    :return: JSON containing coordinates, HTML content of the popup and GeoJSON shape of the building or None if there
+             is no such PRG point
+    """
+
+    prg_popup = labels_cache.get_popup(prg_id)
+
+    if prg_popup is None:
+        return None
+
+    c_lat, c_long, c_popup, c_geojson = prg_popup
+    return ('{"lat": ' + json.dumps(c_lat) + ', "long": ' + json.dumps(c_long) + ', "popup": ' + json.dumps(c_popup) +
+            ', "building": ' + c_geojson + '}').encode("utf-8")
+
+
+class TileHandler(BaseHTTPRequestHandler):
+    """
+    Class that handles requests for map tiles with outlines of BDOT10k buildings, for basemap tiles and for popups of
+    PRG points
+    """
+
+    def do_GET(self) -> None:
+        """
+        Method that sends map tile with a given address - tiles with outlines of buildings (e.g.
+        '/bubd/17/73215/43128.geojson') are cached separately for every database snapshot, and basemap tiles (e.g.
+        '/basemap/17/73215/43128') are read from MBTiles file. Popups of PRG points (e.g. '/popup/1234') are sent as
+        JSON containing coordinates, HTML content of the popup and GeoJSON shape of the building
+
+        :return: The method does not return any values
+        """
+
+        c_path = self.path.split("?")[0]
+        tile_match = TILE_PTRN.fullmatch(c_path)
+        basemap_match = BASEMAP_PTRN.fullmatch(c_path)
+        popup_match = POPUP_PTRN.fullmatch(c_path)
+        basemap_tiles = self.server.basemap_tiles
+        labels_cache = self.server.labels_cache
+
+        try:
+            if tile_match is not None:
+                tile_z, tile_x, tile_y = [int(c_val) for c_val in tile_match.groups()]
+                tile_key = os.path.join(get_snapshot_version() or "base", str(tile_z), str(tile_x),
+                                        str(tile_y) + ".geojson")
+                tile_data = self.server.tile_cache.get_tile(tile_key, lambda: create_tile(tile_z, tile_x, tile_y))
+                tile_mime = "application/geo+json"
+            elif basemap_match is not None and basemap_tiles is not None:
+                tile_data = basemap_tiles.get_tile(*[int(c_val) for c_val in basemap_match.groups()])
+                tile_mime = basemap_tiles.tiles_mime
+            elif popup_match is not None and labels_cache is not None:
+                tile_data = get_popup_json(labels_cache, int(popup_match.group(1)))
+                tile_mime = "application/json"
+            else:
+                tile_data = None
+        except Exception as c_err:
+            logging.getLogger('root').error("Nie udało się utworzyć kafelka '" + self.path + "': " + str(c_err))
+            self.send_error(500)
+            return
+
+        if tile_data is None:
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", tile_mime)
+        self.send_header("Content-Length", str(len(tile_data)))
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.write(tile_data)
+
+    def log_message(self, format: str, *args) -> None:
+        """
+        Method that saves requests to the debug log instead of the standard error output
+
+        :param format: Format of the message
+        :param args: Arguments of the message
+        :return: The method does not return any values
+        """
+
+        logging.getLogger('root').debug("Serwer kafelków: " + format % args)
+
+
+def start_tile_server() -> ThreadingHTTPServer:
+    """
+    Function that starts local server of map tiles in a background thread - server listens on port TILES_PORT (or on a
+    free port if TILES_PORT is equal to 0), caches tiles with outlines of buildings in directory TILES_PATH and serves
+    basemap tiles only if MBTiles file BASEMAP_PATH exists. Popups of PRG points are served only after the object
+    keeping them in memory is assigned to attribute "labels_cache" of the server. Tiles cached by previous runs of the
+    application are used only after calling method "load_tiles" of attribute "tile_cache" of the server
+
+    :return: Server of map tiles
+    """
+
+    tile_server = ThreadingHTTPServer(("127.0.0.1", int(os.environ["TILES_PORT"])), TileHandler)
+    tile_server.daemon_threads = True
+    tile_server.tile_cache = TileCache(os.path.join(os.environ["PARENT_PATH"], os.environ["TILES_PATH"]),
+                                       int(os.environ["TILES_CACHE_SIZE"]))
+    mbtiles_path = os.path.join(os.environ["PARENT_PATH"], os.environ["BASEMAP_PATH"])
+    tile_server.basemap_tiles = BasemapTiles(mbtiles_path, int(os.environ["BASEMAP_CACHE_SIZE"])) \
+        if os.path.isfile(mbtiles_path) else None
+    tile_server.labels_cache = None
+    threading.Thread(target=tile_server.serve_forever, daemon=True).start()
+    return tile_server
+
+
+if __name__ == "__main__":
+    create_logger('root')
+    arg_parser = argparse.ArgumentParser(description="Pobiera do pliku MBTiles kafelki podkładu mapy GeocoderPL " +
+                                                     "wyświetlane bez dostępu do sieci.")
+    arg_parser.add_argument("--bbox", type=float, nargs=4, metavar=("MIN_LAT", "MIN_LONG", "MAX_LAT", "MAX_LONG"),
+                            default=[float(os.environ[env_name]) for env_name in ("PLND_MIN_SZER", "PLND_MIN_DL",
+                                                                                  "PLND_MAX_SZER", "PLND_MAX_DL")],
+                            help="prostokąt ograniczający obszar, dla którego pobierane są kafelki")
+    arg_parser.add_argument("--min-zoom", type=int, default=6, help="minimalny poziom przybliżenia kafelków")
+    arg_parser.add_argument("--max-zoom", type=int, default=12, help="maksymalny poziom przybliżenia kafelków")
+    arg_parser.add_argument("--source", required=True,
+                            help="adres źródła kafelków zawierający pola '{z}', '{x}' i '{y}' - źródło musi " +
+                                 "dopuszczać pobieranie wielu kafelków (zasady korzystania z serwerów kafelków " +
+                                 "OpenStreetMap tego zabraniają)")
+    arg_parser.add_argument("--output", default=os.path.join(os.environ["PARENT_PATH"], os.environ["BASEMAP_PATH"]),
+                            help="ścieżka do pliku MBTiles")
+    seed_args = arg_parser.parse_args()
+    seed_num = seed_basemap(seed_args.output, seed_args.source, tuple(seed_args.bbox), seed_args.min_zoom,
+                            seed_args.max_zoom)
+    logging.getLogger('root').info("Pobrano " + str(seed_num) + " kafelków podkładu mapy.")
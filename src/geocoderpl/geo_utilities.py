@@ -25,7 +25,8 @@ from osgeo import osr
 from pyproj import Proj, transform
 from unidecode import unidecode
 
-from db_classes import BDOT10K, UniqPhrs, TerytCodes, RegJSON, SQL_ENGINE
+from db_classes import BDOT10K, UniqPhrs, TerytCodes, RegJSON, SektTree, SQL_ENGINE
+from db_queries import get_bdot10k_sekts, get_data_engines
 from super_permutations import SuperPerms
 from typing import Callable, Dict, List, Hashable, Tuple, Union
 
@@ -89,7 +90,8 @@ def time_decorator(func) -> Callable:
 @time_decorator
 def fill_regs_tables() -> None:
     """
-    Function that fills tables with parameters of regions shapes
+    Function that fills tables with parameters of regions shapes - regions are assembled in memory and saved to
+    database in a single bulk insert
 
     :return: The method does not return any values
     """
@@ -102,60 +104,67 @@ def fill_regs_tables() -> None:
     curr_epsg = int(f_shp.GetSpatialRef().GetAttrValue("AUTHORITY", 1))
     pl_wrld_trans = create_coords_transform(curr_epsg, int(os.environ['WORLD_CRDS']), True)
 
-    # Tworzymy słownik regionow i ich ksztaltow
-    name_list = []
-    teryt_list = []
+    # Tworzymy slowniki kodow TERYT o danej nazwie oraz nazw i ksztaltow regionow o danym kodzie TERYT
+    teryt_dict = {}
+    regs_dict = {}
 
     # Dla każdego podfolderu w pliku granice administracyjne spisujemy
-    with sa.orm.Session(SQL_ENGINE) as db_session:
-        for reg_name, reg_file in regs_shps.items():
-            shapes = reg_file.GetLayer(0)
-
-            for feature in shapes:
-                feat_itms = feature.items()
-                name = unidecode(feat_itms['JPT_NAZWA_'].upper()).replace("POWIAT ", "")
-                teryt = feat_itms['JPT_KOD_JE']
-                geom = feature.geometry()
-                geom.Transform(pl_wrld_trans)
-
-                if geom.GetGeometryName() == "POLYGON":
-                    geom_ref = geom.GetGeometryRef(0)
-                    g_json = geom_ref.ExportToJson()
-                else:
-                    geom_c = geom.GetGeometryCount()
-                    g_json = ";".join([geom.GetGeometryRef(i).GetGeometryRef(0).ExportToJson() for i in range(geom_c)])
-
-                # Ustalamy finalna nazwe regionu TERYT
-                if len(teryt) < 3:
-                    fin_name = name
-                elif len(teryt) < 5:
-                    json_name = db_session.query(RegJSON.json_name).filter(RegJSON.json_teryt == teryt[:2]).all()[0][0]
-                    fin_name = json_name + ";" + name
-                else:
-                    json_name = db_session.query(RegJSON.json_name).filter(RegJSON.json_teryt == teryt[:4]).all()[0][0]
-                    fin_name = json_name + ";" + name
-
-                # Uzupełniamy tabele TERYT_TABLE
-                if fin_name not in name_list:
-                    name_list.append(fin_name)
-                    db_session.add(TerytCodes(fin_name, teryt))
-                else:
-                    c_teryt = db_session.query(TerytCodes.teryt_code).filter(TerytCodes.teryt_name ==
-                                                                             fin_name).all()[0][0]
-                    n_teryt = c_teryt + ";" + teryt
-                    db_session.query(TerytCodes).filter(TerytCodes.teryt_name ==
-                                                        fin_name).update({'teryt_code': n_teryt})
-
-                # Uzupełniamy tabele JSON_TABLE
-                if teryt not in teryt_list:
-                    teryt_list.append(teryt)
-                    db_session.add(RegJSON(fin_name, teryt, g_json))
-                else:
-                    c_json = db_session.query(RegJSON.json_shape).filter(RegJSON.json_teryt == teryt).all()[0][0]
-                    n_json = c_json + ";" + g_json
-                    db_session.query(RegJSON).filter(RegJSON.json_teryt == teryt).update({'json_shape': n_json})
-
-            db_session.commit()
+    for reg_name, reg_file in regs_shps.items():
+        shapes = reg_file.GetLayer(0)
+
+        for feature in shapes:
+            feat_itms = feature.items()
+            name = unidecode(feat_itms['JPT_NAZWA_'].upper()).replace("POWIAT ", "")
+            teryt = feat_itms['JPT_KOD_JE']
+            geom = feature.geometry()
+            geom.Transform(pl_wrld_trans)
+
+            # Ustalamy finalna nazwe regionu TERYT (nadrzedne regiony wczytywane sa wczesniej niz podrzedne)
+            if len(teryt) < 3:
+                fin_name = name
+            elif len(teryt) < 5:
+                fin_name = regs_dict[teryt[:2]][0] + ";" + name
+            else:
+                fin_name = regs_dict[teryt[:4]][0] + ";" + name
+
+            # Uzupełniamy slownik kodow TERYT (region moze skladac sie z kilku obiektow o tym samym kodzie TERYT)
+            if teryt not in regs_dict:
+                teryt_dict.setdefault(fin_name, []).append(teryt)
+                regs_dict[teryt] = (fin_name, ogr.Geometry(ogr.wkbMultiPolygon))
+
+            # Zewnetrzne pierscienie wielokatow regionu dopisujemy do jego multipoligonu
+            reg_geom = regs_dict[teryt][1]
+            polys = [geom] if geom.GetGeometryName() == "POLYGON" else [geom.GetGeometryRef(i) for i in
+                                                                        range(geom.GetGeometryCount())]
+
+            for c_poly in polys:
+                ext_poly = ogr.Geometry(ogr.wkbPolygon)
+                ext_poly.AddGeometry(c_poly.GetGeometryRef(0))
+                reg_geom.AddGeometry(ext_poly)
+
+    # Zapisujemy wszystkie regiony do bazy danych jednym poleceniem dla kazdej z tablic
+    teryt_rows = [{"TERYT_NAME": fin_name, "TERYT_CODE": ";".join(teryt_codes)}
+                  for fin_name, teryt_codes in teryt_dict.items()]
+    json_rows = [{"JSON_NAME": fin_name, "JSON_TERYT": teryt, "JSON_WKB": bytes(reg_geom.ExportToWkb()),
+                  **dict(zip(("MIN_LONG", "MAX_LONG", "MIN_LAT", "MAX_LAT"), reg_geom.GetEnvelope()))}
+                 for teryt, (fin_name, reg_geom) in regs_dict.items()]
+
+    with SQL_ENGINE.begin() as db_conn:
+        db_conn.execute(TerytCodes.__table__.insert(), teryt_rows)
+        db_conn.execute(RegJSON.__table__.insert(), json_rows)
+
+
+def get_region_paths(reg_wkb: bytes) -> List[matplotlib.path.Path]:
+    """
+    Function that converts shape of region saved as WKB multipolygon to matplotlib paths of its polygons
+
+    :param reg_wkb: Shape of region as WKB multipolygon
+    :return: List containing matplotlib paths of polygons
+    """
+
+    reg_geom = ogr.CreateGeometryFromWkb(reg_wkb)
+    return [path.Path(np.asarray(reg_geom.GetGeometryRef(i).GetGeometryRef(0).GetPoints()), readonly=True,
+                      closed=True) for i in range(reg_geom.GetGeometryCount())]
 
 
 @time_decorator
@@ -297,8 +306,9 @@ def points_inside_polygon(grouped_regions: Dict[Hashable, np.ndarray], woj_name:
                           points_arr: np.ndarray, popraw_list: List[int], dists_list: List[float],
                           zrodlo_list: List[str], bdot10k_ids: np.ndarray, bdot10k_dist: np.ndarray,
                           sekt_kod_list: np.ndarray, dod_opis_list: np.ndarray, addr_phrs_list: List[str],
-                          addr_phrs_len: int, teryt_arr: np.ndarray, json_arr: np.ndarray,
-                          wrld_pl_trans: osr.CoordinateTransformation, sekt_addr_phrs: np.ndarray) -> None:
+                          addr_phrs_len: int, teryt_dict: Dict[str, str], json_dict: Dict[str, tuple],
+                          wrld_pl_trans: osr.CoordinateTransformation, sekt_addr_phrs: np.ndarray,
+                          db_engine: sa.engine.Engine = SQL_ENGINE) -> None:
     """
     Function that checks if given points are inside polygon of their districts and finds closest building shape for
     given PRG point
@@ -317,10 +327,11 @@ def points_inside_polygon(grouped_regions: Dict[Hashable, np.ndarray], woj_name:
     :param dod_opis_list: Numpy array containing additional descriptions of an address point
     :param addr_phrs_list: List containing address points phrases
     :param addr_phrs_len: Length of address points phrases list
-    :param teryt_arr: Numpy array containing TERYT codes od address points
-    :param json_arr: Numpy array containing GeoJSON shapes
+    :param teryt_dict: Dictionary mapping names of regions to their TERYT codes
+    :param json_dict: Dictionary mapping TERYT codes to WKB shapes and bounding boxes of regions
     :param wrld_pl_trans: Coordinates transformation that transforms spatial references from EPSG 4326 to EPSG 2180
-    :param sekt_addr_phrs: Numpy array containing sectors of address points
+    :param sekt_addr_phrs: Numpy array containing address phrases of sectors (indexed by codes of sectors)
+    :param db_engine: SQL engine of the database (main database or shard) storing unique address phrases
     :return: The method does not return any values
     """
 
@@ -333,19 +344,20 @@ def points_inside_polygon(grouped_regions: Dict[Hashable, np.ndarray], woj_name:
 
             # Pobieramy kody TERYT danej gminy
             t_code = woj_name + ";" + pow_name + ";" + gmin_name
-            gmin_codes = teryt_arr[teryt_arr[:, 0] == t_code, -1][0]
+            gmin_codes = teryt_dict[t_code].split(";")
             c_paths = []
 
             # Dla kazdego kodu TERYT gminy pobieramy sciezki wielokatow tej gminy
-            for gmn_code in gmin_codes.split(";"):
-                curr_json = json_arr[json_arr[:, 0] == gmn_code, -1][0]
-
-                for c_json in curr_json.split(";"):
-                    c_paths += [path.Path(np.asarray(ogr.CreateGeometryFromJson(c_json).GetPoints()), readonly=True,
-                                          closed=True)]
+            for gmn_code in gmin_codes:
+                c_paths += get_region_paths(json_dict[gmn_code][0])
 
+            # Wielokaty gminy sprawdzamy tylko dla punktow znajdujacych sie w prostokacie ograniczajacym te gmine
             curr_coords = trans_crds[coords_inds, ::-1]
-            points_flags = points_in_shape(c_paths, curr_coords)
+            gmin_bbox = np.asarray([json_dict[gmn_code][1:] for gmn_code in gmin_codes])
+            bbox_flags = (curr_coords[:, 0] >= gmin_bbox[:, 0].min()) & (curr_coords[:, 0] <= gmin_bbox[:, 1].max()) & \
+                         (curr_coords[:, 1] >= gmin_bbox[:, 2].min()) & (curr_coords[:, 1] <= gmin_bbox[:, 3].max())
+            points_flags = np.zeros(len(curr_coords), dtype=bool)
+            points_flags[bbox_flags] = points_in_shape(c_paths, curr_coords[bbox_flags])
 
             # Dla punktow odresowych PRG, ktore znajduja sie poza granicami wielokatow swoich gmin przeprowadzamy
             # ponowne geokodowanie przy pomocy OpenStreetMap
@@ -371,29 +383,22 @@ def points_inside_polygon(grouped_regions: Dict[Hashable, np.ndarray], woj_name:
                     get_osm_coords(address, outside_pts[i, :], c_paths, popraw_list, c_ind, c_row[-2], c_row[-1],
                                    dists_list, zrodlo_list, wrld_pl_trans)
 
-            # Ustalamy sektory dla wybranych przez naas punktow PRG
-            coords_sekts = np.asarray(get_sector_codes(curr_coords[:, 1], curr_coords[:, 0])).T
-            coords_sekts_zfill = np.char.chararray.zfill(coords_sekts.astype(str), 3)
-            sekt_kod_list[coords_inds] = np.char.add(np.char.add(coords_sekts_zfill[:, 0], '_'),
-                                                     coords_sekts_zfill[:, 1])
+            # Ustalamy sektory dla wybranych przez nas punktow PRG
+            sekts_tree = get_sectors_tree()
+            coords_sekts = sekts_tree.get_sectors(curr_coords[:, 1], curr_coords[:, 0])
+            sekt_kod_list[coords_inds] = coords_sekts
 
-            # Dla każdego wybranego sektora dobieramy sektory, ktore go otaczaja, w ten sposob uzyskujac 9 sektorow dla
-            # kazdego punktu PRG, z których wybieramy unikalne kombinacje sektorow
-            sekt_num = int(os.environ["SEKT_NUM"])
-            sekts_arr, sekts_ids = np.unique([[str(max(i, 0)).zfill(3) + "_" + str(min(j, sekt_num - 1)).zfill(3)
-                                               for i in range(szer - 1, szer + 2) for j in range(dlug - 1, dlug + 2)]
-                                              for szer, dlug in coords_sekts], axis=0, return_inverse=True)
+            # Dla kazdego sektora wyznaczamy okno, w ktorym szukamy budynkow, oraz sektory przecinajace to okno
+            sekts_arr, sekts_ids = np.unique(coords_sekts, return_inverse=True)
+            sekts_wins = [sekts_tree.get_window(sekt_code, float(os.environ["SEKT_RAD"])) for sekt_code in sekts_arr]
 
             # Dla każdego punktu PRG wyszukujemy najbliższy mu wielokat z bazy BDOT10K
-            with sa.orm.Session(SQL_ENGINE) as db_session:
+            with sa.orm.Session(db_engine) as db_session:
                 addr_phrs_uniq = db_session.query(UniqPhrs.uniq_phrs).all()[0][0]
-                bubd_cols = [BDOT10K.bdot10k_bubd_id, BDOT10K.opis_budynku, BDOT10K.bubd_geojson, BDOT10K.centr_long,
-                             BDOT10K.centr_lat, BDOT10K.kod_sektora]
-                pow_bubd_all = pd.read_sql(db_session.query(*bubd_cols).filter(
-                    sa.or_(BDOT10K.kod_sektora == v for v in np.unique(sekts_arr))).statement, SQL_ENGINE).to_numpy()
+                pow_bubd_all = get_bdot10k_sekts(np.unique(np.concatenate([c_win[0] for c_win in sekts_wins])))
                 fin_addr_uniq = get_bdot10k_id(curr_coords, coords_inds, bdot10k_ids, bdot10k_dist, dod_opis_list,
                                                addr_phrs_list, addr_phrs_len, wrld_pl_trans, addr_phrs_uniq, sekts_arr,
-                                               sekts_ids, pow_bubd_all, sekt_addr_phrs)
+                                               sekts_ids, sekts_wins, pow_bubd_all, sekt_addr_phrs)
                 db_session.query(UniqPhrs).filter(UniqPhrs.uniq_id == 1).update({'uniq_phrs': fin_addr_uniq})
                 db_session.commit()
 
@@ -531,7 +536,8 @@ def calc_pnt_dist(c_paths: List[matplotlib.path.Path], x_val: float, y_val: floa
 def get_bdot10k_id(curr_coords: np.ndarray, coords_inds: np.ndarray, bdot10k_ids: np.ndarray, bdot10k_dist: np.ndarray,
                    dod_opis_list: np.ndarray, addr_phrs_list: List[str], addr_phrs_len: int,
                    wrld_pl_trans: osr.CoordinateTransformation, addr_phrs_uniq: str, sekts_arr: np.ndarray,
-                   sekts_ids: np.ndarray, pow_bubd_all: np.ndarray, sekt_addr_phrs: np.ndarray) -> str:
+                   sekts_ids: np.ndarray, sekts_wins: List[Tuple[np.ndarray, Tuple[float, float, float, float]]],
+                   pow_bubd_all: np.ndarray, sekt_addr_phrs: np.ndarray) -> str:
     """
     Function that returns id and distance of polygon closest to PRG point
 
@@ -545,37 +551,32 @@ def get_bdot10k_id(curr_coords: np.ndarray, coords_inds: np.ndarray, bdot10k_ids
     :param addr_phrs_len: Length of address points phrases list
     :param wrld_pl_trans: Coordinates transformation that transforms spatial references from EPSG 4326 to EPSG 2180
     :param addr_phrs_uniq: Unique addresses string
-    :param sekts_arr: Numpy array contaning sectors of address points
+    :param sekts_arr: Numpy array contaning codes of sectors of address points
     :param sekts_ids: Numpy array containing indices of sectors
+    :param sekts_wins: List containing codes of sectors intersecting windows of sectors and coordinates of these windows
     :param pow_bubd_all: Numpy array containing information about all BDOT10k buildings in current region
-    :param sekt_addr_phrs: Numpy array containing sectors of address points
+    :param sekt_addr_phrs: Numpy array containing address phrases of sectors (indexed by codes of sectors)
     :return: Unique addresses string
     """
 
-    # Wybieramy z tablicy BDOT10K_TABLE wszystkie budynki z zadanych sektorow
-    sekt_szer, sekt_dl, plnd_min_szer, plnd_min_dl = get_sectors_params()
-
-    for x, s_names in enumerate(sekts_arr):
-        # Dla każdej unikalnej kombinacji sektorow przeprowadzamy wyszukiwanie obrysow budynkow
-        pow_bubd_arr = pow_bubd_all[np.isin(pow_bubd_all[:, -1], s_names), :-1]
+    for x, (sekt_code, (win_sekts, win_crds)) in enumerate(zip(sekts_arr, sekts_wins)):
+        # Dla każdego sektora przeprowadzamy wyszukiwanie obrysow budynkow z sektorow przecinajacych jego okno
+        pow_bubd_arr = pow_bubd_all[np.isin(pow_bubd_all[:, -1], win_sekts), :-1]
         pow_centr_smpl = pow_bubd_arr[:, -2:].astype(np.float32)
         pow_bubd_arr = pow_bubd_arr[:, :-2]
 
-        # Wyliczamy odleglosci budynkow od srodka biezacego sektora i wybieramy tylko te budynki, ktore znajduja sie
-        # w odleglosci sekt_rad * szerokosc (dlugosc) sektora - w ten sposob mamy pewnosc, ze wlasciwie przypisane beda
-        # budynki do punktow adresowych znajdujacych sie na krawedziach sektorow - unikamy sytuacji w ktorej punkt
-        # adresowy znajduje sie na krawedzi jednego sektora a centroid budynku na krawedzi sasiedniego sektora
-        curr_sekt = s_names[4].split("_")
-        sekt_centr_sz = plnd_min_szer + (float(curr_sekt[0]) + 0.5) * sekt_szer
-        sekt_centr_dl = plnd_min_dl + (float(curr_sekt[1]) + 0.5) * sekt_dl
-        pow_centr_odl = np.abs(pow_centr_smpl - [sekt_centr_dl, sekt_centr_sz])
-        s_rad = float(os.environ["SEKT_RAD"])
-        pow_fin_mask = np.logical_and(pow_centr_odl[:, 0] <= s_rad * sekt_dl, pow_centr_odl[:, 1] <= s_rad * sekt_szer)
+        # Wybieramy tylko te budynki, ktorych centroidy leza w oknie sektora (prostokacie o bokach rownych
+        # 2 * sekt_rad * boki sektora) - w ten sposob mamy pewnosc, ze wlasciwie przypisane beda budynki do punktow
+        # adresowych znajdujacych sie na krawedziach sektorow - unikamy sytuacji w ktorej punkt adresowy znajduje sie
+        # na krawedzi jednego sektora a centroid budynku na krawedzi sasiedniego sektora
+        min_lat, min_long, max_lat, max_long = win_crds
+        pow_fin_mask = (pow_centr_smpl[:, 0] >= min_long) & (pow_centr_smpl[:, 0] <= max_long) & \
+                       (pow_centr_smpl[:, 1] >= min_lat) & (pow_centr_smpl[:, 1] <= max_lat)
         pow_centr_smpl = pow_centr_smpl[pow_fin_mask, :]
         pow_bubd_arr = pow_bubd_arr[pow_fin_mask, :]
         pow_len = len(pow_bubd_arr)
 
-        # Wybieramy koordynaty dla biezacych sektorow
+        # Wybieramy koordynaty dla biezacego sektora
         curr_uniqs = sekts_ids == x
         c_coords = curr_coords[curr_uniqs, :]
         c_coords_smpl = c_coords.astype(np.float32)
@@ -623,7 +624,7 @@ def get_bdot10k_id(curr_coords: np.ndarray, coords_inds: np.ndarray, bdot10k_ids
                                                             wrld_pl_trans)
 
             # Zapisujemy do bazy danych informacje o ciagach adresowych danego sektora
-            sekt_addr_phrs[int(curr_sekt[0]), int(curr_sekt[1])] += c_addr_phrs
+            sekt_addr_phrs[sekt_code] += c_addr_phrs
 
     return addr_phrs_uniq
 
@@ -631,11 +632,11 @@ def get_bdot10k_id(curr_coords: np.ndarray, coords_inds: np.ndarray, bdot10k_ids
 @lru_cache
 def get_sectors_params() -> Tuple[float, float, int, int]:
     """
-    Funtion that calculates basic parameters of sectors
+    Funtion that calculates basic parameters of cells of the grid on which sectors are built
 
     :return:
-        - sekt_szer (:py:class:`float`) - width of sectors
-        - sekt_dl (:py:class:`float`) - height of sectors
+        - sekt_szer (:py:class:`float`) - width of cells
+        - sekt_dl (:py:class:`float`) - height of cells
         - plnd_min_szer (:py:class:`int`) - min latitude of Poland
         - plnd_min_dl (:py:class:`int`) - min longitude of Poland
     """
@@ -652,28 +653,236 @@ def get_sectors_params() -> Tuple[float, float, int, int]:
     return fin_tup
 
 
-def get_sector_codes(poly_centr_y: np.ndarray, poly_centr_x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+def get_grid_cells(poly_centr_y: np.ndarray, poly_centr_x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
     """
-    Function that returns sector code for given coordinates
+    Function that returns rows and columns of cells of the grid for given coordinates - coordinates lying outside of
+    the grid are assigned to the closest cells on the edge of the grid
 
-    :param poly_centr_y: Numpy array containing latitudes of address points
-    :param poly_centr_x: Numpy array containing longitudes of address points
+    :param poly_centr_y: Numpy array containing latitudes
+    :param poly_centr_x: Numpy array containing longitudes
     :return:
-        - c_sekt_szer (:py:class:`np.ndarray`) - rows indices of sectors for given coordinates
-        - c_sekt_dl (:py:class:`np.ndarray`) - columns indices of sectors for given coordinates
-    """
-
-    # Wyliczamy finalny kod sektora
-    sek_tup = get_sectors_params()
-    sekt_szer = sek_tup[0]
-    sekt_dl = sek_tup[1]
-    plnd_min_szer = sek_tup[2]
-    plnd_min_dl = sek_tup[3]
-    c_sekt_szer = ((poly_centr_y - plnd_min_szer) / sekt_szer).astype(int)
-    c_sekt_dl = ((poly_centr_x - plnd_min_dl) / sekt_dl).astype(int)
+        - c_sekt_szer (:py:class:`np.ndarray`) - rows of cells for given coordinates
+        - c_sekt_dl (:py:class:`np.ndarray`) - columns of cells for given coordinates
+    """
+
+    sekt_szer, sekt_dl, plnd_min_szer, plnd_min_dl = get_sectors_params()
+    sekt_num = int(os.environ["SEKT_NUM"])
+    c_sekt_szer = np.clip(((np.asarray(poly_centr_y) - plnd_min_szer) / sekt_szer).astype(int), 0, sekt_num - 1)
+    c_sekt_dl = np.clip(((np.asarray(poly_centr_x) - plnd_min_dl) / sekt_dl).astype(int), 0, sekt_num - 1)
     return c_sekt_szer, c_sekt_dl
 
 
+def get_cell_codes(poly_centr_y: np.ndarray, poly_centr_x: np.ndarray) -> np.ndarray:
+    """
+    Function that returns integer codes of cells of the grid (row * SEKT_NUM + column) for given coordinates
+
+    :param poly_centr_y: Numpy array containing latitudes
+    :param poly_centr_x: Numpy array containing longitudes
+    :return: Numpy array containing codes of cells
+    """
+
+    c_rows, c_cols = get_grid_cells(poly_centr_y, poly_centr_x)
+    return c_rows.astype(np.int64) * int(os.environ["SEKT_NUM"]) + c_cols
+
+
+class SectorsTree(object):
+    """
+    Class that represents adaptive partition of the area of Poland into sectors. Sectors are leaves of the quadtree
+    built on the grid of SEKT_NUM x SEKT_NUM cells - rectangles of cells are divided into quarters as long as they
+    contain more than QUAD_MAX_PTS buildings, so dense cities are covered by small sectors and empty areas by large
+    ones. Codes of sectors are positions of leaves in the quadtree traversed in Z-order, so sectors with close codes
+    lie close together
+    """
+
+    def __init__(self, sekts_bounds: np.ndarray) -> None:
+        """
+        Method that creates objects from a class "SectorsTree"
+
+        :param sekts_bounds: Numpy array containing first row, row following the last row, first column and column
+                             following the last column of cells of every sector (ordered by codes of sectors)
+        :return: The method does not return any values
+        """
+
+        self.sekts_bounds = np.asarray(sekts_bounds, dtype=np.int32).reshape(-1, 4)
+        self.cells_num = int(self.sekts_bounds[:, 1].max())
+
+        # Tworzymy tablice przypisujaca kazdej komorce siatki kod sektora, w ktorym ta komorka sie znajduje
+        self.cells_sekts = np.empty((self.cells_num, self.cells_num), dtype=np.int32)
+
+        for sekt_code, (min_row, max_row, min_col, max_col) in enumerate(self.sekts_bounds):
+            self.cells_sekts[min_row:max_row, min_col:max_col] = sekt_code
+
+    def __len__(self) -> int:
+        """
+        Method that returns number of sectors
+
+        :return: Number of sectors
+        """
+
+        return len(self.sekts_bounds)
+
+    @classmethod
+    def from_counts(cls, cells_counts: np.ndarray, max_pts: int) -> 'SectorsTree':
+        """
+        Method that builds quadtree of sectors on the basis of numbers of buildings in cells of the grid
+
+        :param cells_counts: Numpy array (SEKT_NUM x SEKT_NUM) containing numbers of buildings in cells of the grid
+        :param max_pts: Maximum number of buildings in a sector (sectors consisting of a single cell may contain more
+                        buildings)
+        :return: Quadtree of sectors
+        """
+
+        # Sumy prefiksowe pozwalaja wyliczyc liczbe budynkow w dowolnym prostokacie komorek w stalym czasie
+        cells_num = cells_counts.shape[0]
+        cells_csum = np.zeros((cells_num + 1, cells_num + 1), dtype=np.int64)
+        cells_csum[1:, 1:] = cells_counts.cumsum(0).cumsum(1)
+        quads_stack = [(0, cells_num, 0, cells_num)]
+        sekts_bounds = []
+
+        while quads_stack:
+            min_row, max_row, min_col, max_col = quads_stack.pop()
+            quad_pts = cells_csum[max_row, max_col] - cells_csum[min_row, max_col] - cells_csum[max_row, min_col] + \
+                cells_csum[min_row, min_col]
+
+            if quad_pts <= max_pts or (max_row - min_row == 1 and max_col - min_col == 1):
+                sekts_bounds.append((min_row, max_row, min_col, max_col))
+            else:
+                # Dzielimy prostokat na cwiartki (prostokaty o szerokosci jednej komorki dzielimy tylko na dwie czesci)
+                # i odkladamy je na stos w odwrotnej kolejnosci, zeby liscie numerowane byly zgodnie z krzywa Z
+                mid_row = (min_row + max_row + 1) // 2
+                mid_col = (min_col + max_col + 1) // 2
+                quads_stack += [(c_rows[0], c_rows[1], c_cols[0], c_cols[1])
+                                for c_rows in ((mid_row, max_row), (min_row, mid_row))
+                                for c_cols in ((mid_col, max_col), (min_col, mid_col))
+                                if c_rows[1] > c_rows[0] and c_cols[1] > c_cols[0]]
+
+        return cls(np.asarray(sekts_bounds))
+
+    def get_sectors(self, c_lats: np.ndarray, c_longs: np.ndarray) -> np.ndarray:
+        """
+        Method that returns codes of sectors for given coordinates
+
+        :param c_lats: Numpy array containing latitudes
+        :param c_longs: Numpy array containing longitudes
+        :return: Numpy array containing codes of sectors
+        """
+
+        return self.cells_sekts[get_grid_cells(c_lats, c_longs)]
+
+    def get_window(self, sekt_code: int, s_rad: float) -> Tuple[np.ndarray, Tuple[float, float, float, float]]:
+        """
+        Method that returns window in which buildings are assigned to address points of a given sector - the window is
+        a rectangle centered on the sector with sides equal to 2 * s_rad * sides of the sector
+
+        :param sekt_code: Code of the sector
+        :param s_rad: Ratio of half of the side of the window to the side of the sector
+        :return:
+            - win_sekts (:py:class:`np.ndarray`) - codes of sectors intersecting the window
+            - win_crds (:py:class:`tuple`) - minimum latitude, minimum longitude, maximum latitude and maximum
+              longitude of the window
+        """
+
+        min_row, max_row, min_col, max_col = self.sekts_bounds[sekt_code].tolist()
+        rows_rad = s_rad * (max_row - min_row)
+        cols_rad = s_rad * (max_col - min_col)
+        win_rows = ((min_row + max_row) / 2 - rows_rad, (min_row + max_row) / 2 + rows_rad)
+        win_cols = ((min_col + max_col) / 2 - cols_rad, (min_col + max_col) / 2 + cols_rad)
+        win_sekts = np.unique(self.cells_sekts[max(int(np.floor(win_rows[0])), 0):int(np.ceil(win_rows[1])),
+                                               max(int(np.floor(win_cols[0])), 0):int(np.ceil(win_cols[1]))])
+        sekt_szer, sekt_dl, plnd_min_szer, plnd_min_dl = get_sectors_params()
+        win_crds = (plnd_min_szer + win_rows[0] * sekt_szer, plnd_min_dl + win_cols[0] * sekt_dl,
+                    plnd_min_szer + win_rows[1] * sekt_szer, plnd_min_dl + win_cols[1] * sekt_dl)
+        return win_sekts, win_crds
+
+    def get_bbox_sectors(self, min_lat: float, min_long: float, max_lat: float, max_long: float) -> np.ndarray:
+        """
+        Method that returns codes of sectors intersecting given bounding box
+
+        :param min_lat: Minimum latitude of bounding box
+        :param min_long: Minimum longitude of bounding box
+        :param max_lat: Maximum latitude of bounding box
+        :param max_long: Maximum longitude of bounding box
+        :return: Numpy array containing codes of sectors
+        """
+
+        min_row, min_col = get_grid_cells(min_lat, min_long)
+        max_row, max_col = get_grid_cells(max_lat, max_long)
+        return np.unique(self.cells_sekts[min_row:max_row + 1, min_col:max_col + 1])
+
+    def save(self, db_conn: sa.engine.Connection) -> None:
+        """
+        Method that saves sectors to the table "SEKT_TABLE"
+
+        :param db_conn: Database connection
+        :return: The method does not return any values
+        """
+
+        db_conn.execute(SektTree.__table__.insert(), [
+            {"KOD_SEKTORA": sekt_code, "MIN_WIERSZ": c_bounds[0], "MIN_KOLUMNA": c_bounds[2],
+             "MAX_WIERSZ": c_bounds[1], "MAX_KOLUMNA": c_bounds[3]}
+            for sekt_code, c_bounds in enumerate(self.sekts_bounds.tolist())])
+
+
+@lru_cache
+def get_sectors_tree() -> SectorsTree:
+    """
+    Function that reads (only once) quadtree of sectors from the table "SEKT_TABLE"
+
+    :return: Quadtree of sectors
+    """
+
+    with SQL_ENGINE.connect() as db_conn:
+        sekts_bounds = db_conn.execute(sa.select(SektTree.min_wiersz, SektTree.max_wiersz, SektTree.min_kolumna,
+                                                 SektTree.max_kolumna).order_by(SektTree.kod_sektora)).all()
+
+    return SectorsTree(np.asarray(sekts_bounds))
+
+
+@time_decorator
+def create_sectors_tree() -> None:
+    """
+    Function that builds quadtree of sectors on the basis of numbers of BDOT10k buildings in cells of the grid, saves
+    sectors to the table "SEKT_TABLE" and replaces codes of cells of buildings (saved by BDOT10k parser in the column
+    "KOD_SEKTORA") with codes of sectors - if the database is divided into shards, buildings of all shards are counted
+
+    :return: The method does not return any values
+    """
+
+    sekt_num = int(os.environ["SEKT_NUM"])
+    cells_counts = np.zeros(sekt_num * sekt_num, dtype=np.int64)
+    data_engines = get_data_engines()
+
+    for db_engine in data_engines:
+        with db_engine.connect() as db_conn:
+            cells_arr = np.asarray(db_conn.execute(sa.select(BDOT10K.kod_sektora, sa.func.count()).group_by(
+                BDOT10K.kod_sektora)).all(), dtype=np.int64).reshape(-1, 2)
+            cells_counts[cells_arr[:, 0]] += cells_arr[:, 1]
+
+    sekts_tree = SectorsTree.from_counts(cells_counts.reshape(sekt_num, sekt_num), int(os.environ["QUAD_MAX_PTS"]))
+
+    with SQL_ENGINE.begin() as db_conn:
+        sekts_tree.save(db_conn)
+
+    get_sectors_tree.cache_clear()
+
+    # Kody komorek zamieniamy na kody sektorow jednym poleceniem UPDATE przy pomocy tymczasowej tablicy
+    cells_codes = np.flatnonzero(cells_counts)
+    cells_rows = [{"cell_code": c_cell, "sekt_code": c_sekt} for c_cell, c_sekt in
+                  zip(cells_codes.tolist(), sekts_tree.cells_sekts.ravel()[cells_codes].tolist())]
+
+    for db_engine in data_engines:
+        with db_engine.begin() as db_conn:
+            db_conn.execute(sa.text("CREATE TEMPORARY TABLE CELLS_MAP (KOD_KOMORKI INTEGER PRIMARY KEY, " +
+                                    "KOD_SEKTORA INTEGER NOT NULL)"))
+            db_conn.execute(sa.text("INSERT INTO CELLS_MAP VALUES (:cell_code, :sekt_code)"), cells_rows)
+            db_conn.execute(sa.text("UPDATE BDOT10K_TABLE SET KOD_SEKTORA = (SELECT CELLS_MAP.KOD_SEKTORA FROM " +
+                                    "CELLS_MAP WHERE CELLS_MAP.KOD_KOMORKI = BDOT10K_TABLE.KOD_SEKTORA)"))
+            db_conn.execute(sa.text("DROP TABLE CELLS_MAP"))
+
+    get_sectors_tree.cache_clear()
+    logging.info("Liczba sektorow: " + str(len(sekts_tree)))
+
+
 def gen_fin_bubds_ids(c_coords: np.ndarray, c_len: int, top_geojson: np.ndarray, top_ids: np.ndarray,
                       bdot10k_dist: np.ndarray, bdot10k_ids: np.ndarray, crds_inds: np.ndarray,
                       pow_bubd_arr: np.ndarray, dod_opis_list: np.ndarray, addr_phrs_list: List[str],
@@ -1,12 +1,13 @@
 """ XML Parsers module of the GeocoderPL project """
 
-import pickle
 from abc import ABC, abstractmethod
 from io import BytesIO
 
-from db_classes import PRG
+from db_classes import PRG, get_snapshot_path
+from db_queries import DictEncoder, sync_rtree_tables
+from geo_search import save_addr_phrases
 from geo_utilities import *
-from typing import List, Tuple, Dict, Any
+from typing import List, Tuple, Dict, Any, Optional
 
 
 class XmlParser(ABC):
@@ -126,7 +127,8 @@ class BDOT10kDataParser(XmlParser):
     """ BDOT10kDataParser class """
 
     def __init__(self, xml_path: str, tags_tuple:  Tuple[str, ...], event_type: str, dicts_tags: Dict[str, str],
-                 tags_dict: Dict[str, int]) -> None:
+                 tags_dict: Dict[str, int], woj_names: Optional[List[str]] = None,
+                 db_engine: sa.engine.Engine = SQL_ENGINE, id_start: int = 0) -> None:
         """
         Method that creates objects from a class "BDOT10kDataParser"
 
@@ -135,12 +137,18 @@ class BDOT10kDataParser(XmlParser):
         :param event_type: Type of event in XML file
         :param dicts_tags: XML tags of BDOT10k dicts
         :param tags_dict: Tags dicts of BDOT10k buildings
+        :param woj_names: Names of files of parsed provinces (all provinces if None)
+        :param db_engine: SQL engine of the database (main database or shard) in which buildings are saved
+        :param id_start: Index preceding index of the first saved building
         :return: The method does not return any values
         """
 
         super().__init__(xml_path, tags_tuple, event_type)
         self.dicts_tags = dicts_tags
         self.tags_dict = tags_dict
+        self.woj_names = woj_names
+        self.db_engine = db_engine
+        self.bubd_num = id_start
         self.check_path()
         self.bdot10k_dicts = read_bdot10k_dicts()
         self.parse_xml()
@@ -165,7 +173,7 @@ class BDOT10kDataParser(XmlParser):
         """
 
         with zipfile.ZipFile(self.xml_path, "r") as zfile:
-            for woj_name in zfile.namelist():
+            for woj_name in zfile.namelist() if self.woj_names is None else self.woj_names:
                 woj_zip = BytesIO(zfile.read(woj_name))
                 logging.info(woj_name)
                 bdot10k_woj_rows = []
@@ -186,20 +194,31 @@ class BDOT10kDataParser(XmlParser):
                 # Zapisujemy do bazy danych informacje dotyczące budynkow z danego województwa
                 bdot10k_rows = []
                 db_save_freq = int(os.environ['DB_SAVE_FREQ'])
+                dict_enc = DictEncoder(BDOT10K.__table__, self.db_engine)
 
-                with Session(SQL_ENGINE) as db_session:
+                with Session(self.db_engine) as db_session:
                     for i, c_row in enumerate(bdot10k_woj_rows):
-                        bdot10k_rows.append(BDOT10K(*c_row))
+                        # Powtarzajace sie wartosci kolumn zastepujemy indeksami z tablic slownikowych - indeksy
+                        # budynkow nadajemy sami, bo kazda baza czesciowa ma wlasny przedzial indeksow
+                        c_bubd = BDOT10K(*dict_enc.encode_row(c_row))
+                        c_bubd.bdot10k_bubd_id = self.bubd_num + i + 1
+                        bdot10k_rows.append(c_bubd)
 
                         if i % db_save_freq == 0:
+                            dict_enc.save(db_session)
                             db_session.bulk_save_objects(bdot10k_rows)
                             db_session.commit()
                             bdot10k_rows = []
 
                     if bdot10k_rows:
+                        dict_enc.save(db_session)
                         db_session.bulk_save_objects(bdot10k_rows)
                         db_session.commit()
 
+                # Dopisujemy prostokaty ograniczajace nowych budynkow do tablicy R*Tree
+                sync_rtree_tables(self.db_engine)
+                self.bubd_num += len(bdot10k_woj_rows)
+
     def parse_bdot10k_xml(self, xml_contex: etree.iterparse, fin_row: List[Any]) -> List[List[Any]]:
         """
         Method that exctrats data from BDOT10k XML file
@@ -246,11 +265,9 @@ class BDOT10kDataParser(XmlParser):
                 reduced_geojson = reduce_coordinates_precision(geojson_poly, coords_prec)
                 fin_row[-1] = reduced_geojson
 
-                # Dodajemy nowy wiersz do lacznej listy
-                c_sekt_tpl = get_sector_codes(poly_centr_y, poly_centr_x)
-                c_sekt_szer = c_sekt_tpl[0]
-                c_sekt_dl = c_sekt_tpl[1]
-                kod_sektora = str(c_sekt_szer).zfill(3) + "_" + str(c_sekt_dl).zfill(3)
+                # Dodajemy nowy wiersz do lacznej listy - do czasu zbudowania drzewa sektorow (funkcja
+                # "create_sectors_tree") zapisujemy kod komorki siatki, w ktorej lezy centroid budynku
+                kod_sektora = int(get_cell_codes(poly_centr_y, poly_centr_x))
                 fin_row2 = [kod_sektora] + fin_row
                 bdot10k_pow_rows.append(fin_row2)
                 fin_row = ['', '', '', '', 0, 0, '', 0.0, 0.0, 0.0, '']
@@ -304,7 +321,8 @@ class PRGDataParser(XmlParser):
     """ PRGDataParser class """
 
     def __init__(self, xml_path: str, tags_tuple: Tuple[str, ...], event_type: str,
-                 perms_dict: Dict[int, List[int]]) -> None:
+                 perms_dict: Dict[int, List[int]], woj_names: Optional[List[str]] = None,
+                 db_engine: sa.engine.Engine = SQL_ENGINE, id_start: int = 0, save_flag: bool = True) -> None:
         """
         Method that creates objects from a class "PRGDataParser"
 
@@ -312,14 +330,23 @@ class PRGDataParser(XmlParser):
         :param tags_tuple: Tuple containig XML tags
         :param event_type: Type of event in XML file
         :param perms_dict: Dictionary containing superpermutation indices
+        :param woj_names: Names of files of parsed provinces (all provinces if None)
+        :param db_engine: SQL engine of the database (main database or shard) in which address points are saved
+        :param id_start: Index preceding index of the first saved address point
+        :param save_flag: Flag indicating if address phrases of sectors are saved to the file 'ADDRS_PATH' (otherwise
+                          they are only stored in the attribute "sekt_addr_phrs")
         :return: The method does not return any values
         """
 
         super().__init__(xml_path, tags_tuple, event_type)
         self.perms_dict = perms_dict
+        self.woj_names = woj_names
+        self.db_engine = db_engine
+        self.save_flag = save_flag
         self.check_path()
         self.addr_phrs_list = []
-        self.addr_phrs_len = 0
+        self.addr_phrs_len = id_start
+        self.sekt_addr_phrs = np.full(shape=len(get_sectors_tree()), fill_value='', dtype=object)
         self.parse_xml()
 
     def check_path(self) -> None:
@@ -342,26 +369,19 @@ class PRGDataParser(XmlParser):
         """
 
         # Definiujemy podstawowe parametry
-        x_path, x_filename = os.path.split(self.xml_path)
+        x_path = os.path.dirname(self.xml_path)
+        woj_names = self.extract_woj_files(self.xml_path) if self.woj_names is None else self.woj_names
         os.chdir(x_path)
 
         # Tworzymy transformacje wspolrzednych
         wrld_pl_trans = create_coords_transform(int(os.environ['WORLD_CRDS']), int(os.environ['PL_CRDS']), True)
-        sekt_num = int(os.environ["SEKT_NUM"])
-        sekt_addr_phrs = np.full(shape=(sekt_num, sekt_num), fill_value='', dtype=object)
-
-        # Definiujemy sesję sql engine
-        with Session(SQL_ENGINE) as db_session:
-            teryt_arr = pd.read_sql(db_session.query(TerytCodes.teryt_name, TerytCodes.teryt_code).statement,
-                                    SQL_ENGINE).to_numpy()
-            json_arr = pd.read_sql(db_session.query(RegJSON.json_teryt, RegJSON.json_shape).statement,
-                                   SQL_ENGINE).to_numpy()
-
-        with zipfile.ZipFile(x_filename, "r") as zfile:
-            woj_names = zfile.namelist()
 
-            if len(list(os.listdir(x_path))) < 3:
-                zfile.extractall()
+        # Wczytujemy kody TERYT oraz ksztalty regionow do slownikow
+        with SQL_ENGINE.connect() as db_conn:
+            teryt_dict = dict(db_conn.execute(sa.select(TerytCodes.teryt_name, TerytCodes.teryt_code)).all())
+            json_dict = {c_row[0]: tuple(c_row[1:]) for c_row in db_conn.execute(sa.select(
+                RegJSON.json_teryt, RegJSON.json_wkb, RegJSON.min_long, RegJSON.max_long, RegJSON.min_lat,
+                RegJSON.max_lat))}
 
         for woj_name in woj_names:
             # Wczytujemy dane XML dla danego wojewodztwa
@@ -374,11 +394,31 @@ class PRGDataParser(XmlParser):
 
             # Konwertujemy wspolrzedne PRG z ukladu polskiego do ukladu mag Google i sprawdzamy czy leżą one
             # wewnątrz shapefile'a swojej gminy
-            self.check_prg_pts_add_db(points_arr, woj_name, teryt_arr, json_arr, wrld_pl_trans, sekt_addr_phrs)
+            self.check_prg_pts_add_db(points_arr, woj_name, teryt_dict, json_dict, wrld_pl_trans,
+                                      self.sekt_addr_phrs)
 
         # Zapisujemy zbiór unikalnych adresow na dysku twardym
-        with open(os.path.join(os.environ["PARENT_PATH"], os.environ['ADDRS_PATH']), 'wb') as f:
-            pickle.dump(sekt_addr_phrs, f, pickle.HIGHEST_PROTOCOL)
+        if self.save_flag:
+            save_addr_phrases(self.sekt_addr_phrs, get_snapshot_path("ADDRS_PATH"))
+
+    @staticmethod
+    def extract_woj_files(xml_path: str) -> List[str]:
+        """
+        Method that extracts XML files of provinces from the PRG archive (if they have not been extracted yet)
+
+        :param xml_path: Path of the PRG archive
+        :return: List containing names of XML files of provinces
+        """
+
+        x_path = os.path.dirname(xml_path)
+
+        with zipfile.ZipFile(xml_path, "r") as zfile:
+            woj_names = zfile.namelist()
+
+            if len(list(os.listdir(x_path))) < 3:
+                zfile.extractall(x_path)
+
+        return woj_names
 
     def create_points_list(self, xml_contex: etree.iterparse) -> List[List[str]]:
         """
@@ -399,7 +439,7 @@ class PRGDataParser(XmlParser):
                     "wTrakcieBudowy": "w trakcie budowy"}
         rep_dict_keys = np.asarray(list(rep_dict.keys()))
 
-        with Session(SQL_ENGINE) as db_session:
+        with Session(self.db_engine) as db_session:
             addr_phrs_uniq = db_session.query(UniqPhrs.uniq_phrs).all()[0][0]
 
         for _, curr_node in xml_contex:
@@ -440,23 +480,24 @@ class PRGDataParser(XmlParser):
             # Czyscimy przetworzone obiekty wezlow XML z pamieci
             clear_xml_node(curr_node)
 
-        with Session(SQL_ENGINE) as db_session:
+        with Session(self.db_engine) as db_session:
             db_session.query(UniqPhrs).filter(UniqPhrs.uniq_id == 1).update({'uniq_phrs': addr_phrs_uniq})
             db_session.commit()
 
         return points_list
 
     @time_decorator
-    def check_prg_pts_add_db(self, points_arr: np.ndarray, woj_name: str, teryt_arr: np.ndarray, json_arr: np.ndarray,
-                             wrld_pl_trans: osr.CoordinateTransformation, sekt_addr_phrs: np.ndarray) -> None:
+    def check_prg_pts_add_db(self, points_arr: np.ndarray, woj_name: str, teryt_dict: Dict[str, str],
+                             json_dict: Dict[str, tuple], wrld_pl_trans: osr.CoordinateTransformation,
+                             sekt_addr_phrs: np.ndarray) -> None:
         """
         Function that converts spatial reference of PRG points from 2180 to 4326, checks if given PRG point belongs
         to shapefile of its district and finds closest building shape for given PRG point
 
         :param points_arr: Numpy array containing all address points in a given province
         :param woj_name: Name of the province
-        :param teryt_arr: Numpy array containing TERYT names and TERYT codes
-        :param json_arr: Numpy array containing JSON shapefiles
+        :param teryt_dict: Dictionary mapping names of regions to their TERYT codes
+        :param json_dict: Dictionary mapping TERYT codes to WKB shapes and bounding boxes of regions
         :param wrld_pl_trans: Coordinates transformation that transforms spatial references from EPSG 2180 to EPSG 4326
         :param sekt_addr_phrs: Numpy array containing address phrases
         :return: The method does not return any values
@@ -482,33 +523,44 @@ class PRGDataParser(XmlParser):
         dists_list = [0.0] * pts_lst_len
         bdot10k_ids = np.zeros(pts_lst_len, dtype=int)
         bdot10k_dist = np.zeros(pts_lst_len)
-        sekt_kod_list = np.full(pts_lst_len, fill_value='', dtype='<U7')
+        sekt_kod_list = np.zeros(pts_lst_len, dtype=np.int64)
         dod_opis_list = np.full(pts_lst_len, fill_value='', dtype=object)
 
         # Dla każdej gminy i powiatu sprawdzamy czy punkty do nich przypisane znajduja sie wewnatrz wielokata danej
         # gminy oraz znajdujemy najbliższy budynek do danego punktu PRG
         points_inside_polygon(grouped_regions, woj_name, trans_crds, points_arr, popraw_list, dists_list, zrodlo_list,
                               bdot10k_ids, bdot10k_dist, sekt_kod_list, dod_opis_list, self.addr_phrs_list,
-                              self.addr_phrs_len, teryt_arr, json_arr, wrld_pl_trans, sekt_addr_phrs)
+                              self.addr_phrs_len, teryt_dict, json_dict, wrld_pl_trans, sekt_addr_phrs,
+                              self.db_engine)
 
         # Zapisujemy do bazy danych informacje dotyczące budynkow z danego województwa
         prg_rows = []
         db_save_freq = int(os.environ['DB_SAVE_FREQ'])
+        dict_enc = DictEncoder(PRG.__table__, self.db_engine)
 
-        with Session(SQL_ENGINE) as db_session:
+        with Session(self.db_engine) as db_session:
             for i in range(pts_lst_len):
+                # Powtarzajace sie wartosci kolumn zastepujemy indeksami z tablic slownikowych - indeksy punktow
+                # adresowych musza byc zgodne z indeksami zapisanymi w ciagach adresowych sektorow
                 # noinspection PyTypeChecker
-                prg_rows.append(PRG(*points_arr[i, :-2], trans_crds[i, 0], trans_crds[i, 1], zrodlo_list[i],
-                                    popraw_list[i], dists_list[i], bdot10k_ids[i], bdot10k_dist[i], sekt_kod_list[i],
-                                    dod_opis_list[i]))
+                c_prg = PRG(*dict_enc.encode_row([*points_arr[i, :-2], trans_crds[i, 0], trans_crds[i, 1],
+                                                  zrodlo_list[i], popraw_list[i], dists_list[i], int(bdot10k_ids[i]),
+                                                  bdot10k_dist[i], int(sekt_kod_list[i]), dod_opis_list[i]]))
+                c_prg.prg_point_id = self.addr_phrs_len + i + 1
+                prg_rows.append(c_prg)
                 if i % db_save_freq == 0:
+                    dict_enc.save(db_session)
                     db_session.bulk_save_objects(prg_rows)
                     db_session.commit()
                     prg_rows = []
 
             if prg_rows:
+                dict_enc.save(db_session)
                 db_session.bulk_save_objects(prg_rows)
                 db_session.commit()
 
+        # Dopisujemy nowe punkty adresowe do tablicy R*Tree
+        sync_rtree_tables(self.db_engine)
+
         self.addr_phrs_len += pts_lst_len
         self.addr_phrs_list = []
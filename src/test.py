@@ -1,11 +1,43 @@
 """ Testing module """
 
+import base64
+import glob
+import json
+import os
+import re
+import sqlite3
+import tempfile
 import unittest
+import zipfile
+from typing import List, Optional, Tuple
+from unittest import mock
 import numpy as np
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import sqlalchemy as sa
+from osgeo import ogr, osr
 
 from pyproj.crs import CRSError
 from geocoderpl.super_permutations import SuperPerms
-from geocoderpl.geo_utilities import convert_coords
+from geocoderpl import db_shards
+from geocoderpl.db_classes import BASE, BDOT10K, DICT_TABLES, PRG, SCHEMA_VERSION, RegJSON, ShardInfo, ShardSekt, \
+    TerytCodes, connect_read_db
+from geocoderpl.db_queries import READ_ENGINE, SQL_ENGINE, DictEncoder, create_dict_views, get_bbox_engines, \
+    get_bdot10k_prg, get_crds_dists, get_prg_bdot10k, get_prg_info, get_prg_radius, get_schema_version, \
+    get_sekts_shards, get_shards_meta, read_sql_in, route_in_vals, set_schema_version, sync_rtree_tables
+from geocoderpl.db_shards import create_shards, get_bdot10k_shard_id, get_prg_shard_id, group_woj_names, \
+    update_shards_meta
+from geocoderpl.db_export import SNAPSHOT_META, export_snapshot
+from geocoderpl.db_snapshots import get_snapshot_versions, publish_snapshot
+from geocoderpl.geo_bench import QueryPaths, create_bench_corpus, create_bench_db, run_benchmarks
+from geocoderpl.geo_labels import NO_BUBD_INFO, create_label, create_popup
+from geocoderpl.geo_stats import STATS_BUCKETS, LatencyStats
+from geocoderpl.geo_search import PART_IDX, AddrPhrases, AddrSearch, FuzzyIndex, PrefixCache, SectorsRings, \
+    bounded_edit_distance, normalize_text, save_addr_phrases, search_addr_phrases
+from geocoderpl.geo_tiles import MBTILES_SQL, BasemapTiles, TileCache, encode_points, get_tile_bbox, get_tile_xy, \
+    scan_points, seed_basemap, simplify_ring
+from geocoderpl.geo_utilities import SectorsTree, convert_coords, fill_regs_tables, get_cell_codes, get_grid_cells, \
+    get_sectors_params
 
 # TODO: Klasa testów dla funkcji "points_in_shape" pochodzącej z modułu "geo_utilities"
 # TODO: Klasa testów dla funkcji "reduce_coordinates_precision" pochodzącej z modułu "geo_utilities"
@@ -310,5 +342,1224 @@ class TestSuperPermutations(unittest.TestCase):
         self.assertRaises(TypeError, SuperPerms, [1, 2, 3])
 
 
+class TestPrefixCache(unittest.TestCase):
+    """ Class performing tests of cached search of address phrases """
+
+    def setUp(self) -> None:
+        """
+        Method containing test sectors of memory-mapped address phrases
+
+        :return: The method does not return any values
+        """
+
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.sekts_phrs = ["", " WARSZAWA MARSZALKOWSKA 1 [1]\n WARSZAWA WSPOLNA 2 [2]\n", "", " WARKA POLNA 3 [3]\n",
+                           " WARSZAWA MARSZALKOWSKA 5 [4]\n WROCLAW RYNEK 1 [5]\n"]
+        phrs_path = os.path.join(self.temp_dir.name, "all_address_phrases.bin")
+        save_addr_phrases(np.array(self.sekts_phrs, dtype=object), phrs_path)
+        self.addr_phrs = AddrPhrases(phrs_path)
+        self.adds_list = self.addr_phrs.get_view(np.arange(len(self.sekts_phrs)))
+
+    def tearDown(self) -> None:
+        """
+        Method that closes address phrases and removes the temporary directory
+
+        :return: The method does not return any values
+        """
+
+        del self.adds_list
+        self.addr_phrs.close()
+        self.temp_dir.cleanup()
+
+    def test_prefix_refinement(self) -> None:
+        """
+        Test if extended text filtered from cached results gives the same results as a search without cache
+
+        :return: The method does not return any values
+        """
+
+        c_cache = PrefixCache(8, 100)
+        search_addr_phrases(self.adds_list, " WAR", 5, 1, c_cache)
+        c_res = search_addr_phrases(self.adds_list, " WARSZAWA M", 5, 1, c_cache)
+        exp_res = search_addr_phrases(self.adds_list, " WARSZAWA M", 5, 1, PrefixCache(8, 100))
+        self.assertEqual(c_res, exp_res, 'Results filtered from cache differ from results of the full search!')
+        self.assertEqual(c_res[0], [], 'Search not stopped on the last sector should not return any results!')
+
+    def test_backspace(self) -> None:
+        """
+        Test if results for a shorter text are served from cache
+
+        :return: The method does not return any values
+        """
+
+        c_cache = PrefixCache(8, 100)
+        search_addr_phrases(self.adds_list, " WAR", 2, 0, c_cache)
+        c_entry = c_cache.get_entry(" WAR")
+        search_addr_phrases(self.adds_list, " WARS", 2, 0, c_cache)
+        self.assertEqual(search_addr_phrases(self.adds_list, " WAR", 2, 0, c_cache), (['1', '2'], 2),
+                         'Wrong results of the search for text " WAR"!')
+        self.assertIs(c_cache.get_entry(" WAR"), c_entry, 'Results for text " WAR" have not been served from cache!')
+
+    def test_lru_eviction(self) -> None:
+        """
+        Test if the least recently used texts are removed from cache
+
+        :return: The method does not return any values
+        """
+
+        c_cache = PrefixCache(2, 100)
+
+        for c_text in (" WAR", " WRO", " MAR"):
+            search_addr_phrases(self.adds_list, c_text, 5, 1, c_cache)
+
+        self.assertEqual(list(c_cache.cache_dict), [" WRO", " MAR"], 'Wrong texts have been removed from cache!')
+
+    def test_deadline_resume(self) -> None:
+        """
+        Test if search interrupted after exceeding time limit returns hits found so far and if resumed search gives the
+        same results as a search without time limit
+
+        :return: The method does not return any values
+        """
+
+        for c_text, addrs_num, max_sekts in ((" WAR", 5, 1), (" WAR", 2, 0), (" WARSZAWA M", 5, 1), (" W", 3, 3)):
+            c_cache = PrefixCache(8, 100)
+            part_res = [search_addr_phrases(self.adds_list, c_text, addrs_num, max_sekts, c_cache, 0.0)]
+
+            while part_res[-1][1] == PART_IDX:
+                part_res.append(search_addr_phrases(self.adds_list, c_text, addrs_num, max_sekts, c_cache, 0.0))
+
+            self.assertEqual(part_res[-1], search_addr_phrases(self.adds_list, c_text, addrs_num, max_sekts,
+                                                               PrefixCache(8, 100)),
+                             'Resumed search differs from the search without time limit!')
+            self.assertTrue(all(len(c_res[0]) <= len(n_res[0]) for c_res, n_res in zip(part_res[:-2], part_res[1:-1])),
+                            'Hits found before interruption have been lost!')
+
+    def test_sectors_change(self) -> None:
+        """
+        Test if search interrupted in one sequence of sectors is not resumed in another sequence of sectors
+
+        :return: The method does not return any values
+        """
+
+        c_cache = PrefixCache(8, 100)
+        self.assertEqual(search_addr_phrases(self.adds_list, " WARSZAWA", 5, 1, c_cache, 0.0)[1], PART_IDX,
+                         'Search is not interrupted!')
+
+        rev_list = self.addr_phrs.get_view(np.arange(len(self.sekts_phrs))[::-1])
+        self.assertEqual(search_addr_phrases(rev_list, " WARSZAWA", 5, 1, c_cache),
+                         search_addr_phrases(rev_list, " WARSZAWA", 5, 1, PrefixCache(8, 100)),
+                         'Search interrupted in another sequence of sectors is resumed!')
+
+        c_cache = PrefixCache(8, 100)
+        self.assertEqual([search_addr_phrases(self.adds_list, " WAR", 5, 1, c_cache, 0.0) for _ in range(2)],
+                         [([], PART_IDX), (['1', '2'], PART_IDX)], 'Wrong results of interrupted search!')
+
+    def test_memory_mapped_phrases(self) -> None:
+        """
+        Test if memory-mapped sectors contain saved address phrases in the order of given codes of sectors
+
+        :return: The method does not return any values
+        """
+
+        sekt_codes = [4, 3, 2, 1, 0]
+        c_view = self.addr_phrs.get_view(np.array(sekt_codes))
+        self.assertEqual([c_view[i] for i in range(len(c_view))], [self.sekts_phrs[i] for i in sekt_codes],
+                         'Wrong address phrases of memory-mapped sectors!')
+
+        for c_text in (" WAR", " WARSZAWA M", " WROCLAW"):
+            self.assertEqual([c_view.find_text(i, c_text) for i in range(len(c_view))],
+                             [c_text in self.sekts_phrs[i] for i in sekt_codes],
+                             'Wrong memory-mapped sectors containing the text!')
+            self.assertEqual([c_line for i in range(len(c_view)) for c_line in c_view.find_lines(i, c_text, 10)[0]],
+                             [c_line for i in sekt_codes for c_line in self.sekts_phrs[i].splitlines()
+                              if c_text in c_line], 'Wrong memory-mapped address lines containing the text!')
+
+        del c_view
+
+
+class TestFuzzyIndex(unittest.TestCase):
+    """ Class performing tests of typos correction in searched texts """
+
+    def setUp(self) -> None:
+        """
+        Method containing test index of unique words
+
+        :return: The method does not return any values
+        """
+
+        self.fuzzy_index = FuzzyIndex("WARSZAWA MARSZALKOWSKA WSPOLNA KRAKOW RYNEK GLOWNY 00-001 ", 2, 100)
+
+    def test_edit_distance(self) -> None:
+        """
+        Test if bounded edit distance is calculated correctly
+
+        :return: The method does not return any values
+        """
+
+        self.assertEqual(bounded_edit_distance("MARSZALKOWKSA", "MARSZALKOWSKA", 2), 1, 'Wrong transposition distance!')
+        self.assertEqual(bounded_edit_distance("WARSZWA", "WARSZAWA", 2), 1, 'Wrong insertion distance!')
+        self.assertEqual(bounded_edit_distance("KRAKOW", "WARSZAWA", 2), 3, 'Distance is not bounded!')
+        self.assertEqual(bounded_edit_distance("MARSZLK", "MARSZALKOWSKA", 2, True), 1, 'Wrong prefix distance!')
+
+    def test_correct_text(self) -> None:
+        """
+        Test if typos in searched texts are corrected
+
+        :return: The method does not return any values
+        """
+
+        self.assertEqual(self.fuzzy_index.correct_text(" WARSZWA MARSZALKOWKSA"), " WARSZAWA MARSZALKOWSKA",
+                         'Typos in text have not been corrected!')
+        self.assertEqual(self.fuzzy_index.correct_text(" WARSZAWA MARSZLK"), " WARSZAWA MARSZALKOWSKA",
+                         'Typos in the last incomplete word have not been corrected!')
+        self.assertIsNone(self.fuzzy_index.correct_text(" WARSZAWA MARSZ"), 'Text without typos has been corrected!')
+        self.assertIsNone(self.fuzzy_index.correct_text(" XYZXYZXYZ"), 'Text has been corrected to a distant word!')
+        self.assertEqual(self.fuzzy_index.correct_text(" ARSZAW"), " WARSZAWA",
+                         'Fragment from the middle of a word has been taken for a prefix!')
+        self.assertTrue(self.fuzzy_index.is_prefix("WARSZ") and not self.fuzzy_index.is_prefix("ARSZAW"),
+                        'Wrong prefix check!')
+
+
+class TestAddrSearch(unittest.TestCase):
+    """ Class performing tests of the search of PRG points matching texts typed by the user """
+
+    def setUp(self) -> None:
+        """
+        Method containing test address phrases of sectors of the grid of 4x4 cells - the search starts in the corner
+        sector, while most of address phrases lie in the middle sector
+
+        :return: The method does not return any values
+        """
+
+        self.temp_dir = tempfile.TemporaryDirectory()
+        sekts_bounds = np.asarray([[c_row, c_row + 1, c_col, c_col + 1] for c_row in range(4) for c_col in range(4)])
+        sekts_phrs = np.full(len(sekts_bounds), '', dtype=object)
+        sekts_phrs[0] = " KRAKOW RYNEK 1 [3]\n"
+        sekts_phrs[10] = " WARSZAWA MARSZALKOWSKA 1 [1]\n WARSZAWA WSPOLNA 2 [2]\n"
+        phrs_path = os.path.join(self.temp_dir.name, "all_address_phrases.bin")
+        save_addr_phrases(sekts_phrs, phrs_path)
+        self.addr_phrs = AddrPhrases(phrs_path)
+        uniq_words = "KRAKOW RYNEK 1 WARSZAWA MARSZALKOWSKA WSPOLNA 2 "
+        self.addr_search = AddrSearch(self.addr_phrs, uniq_words, sekts_bounds, 0, 1, PrefixCache(8, 100),
+                                      FuzzyIndex(uniq_words, 2, 100), re.compile(os.environ["RE_PATTERN"]))
+
+    def tearDown(self) -> None:
+        """
+        Method that closes address phrases and removes the temporary directory
+
+        :return: The method does not return any values
+        """
+
+        del self.addr_search
+        self.addr_phrs.close()
+        self.temp_dir.cleanup()
+
+    def search_text(self, start_text: str, deadline: Optional[float] = None) -> Optional[Tuple[List[str], int]]:
+        """
+        Method that searches for PRG points matching a given text typed by the user
+
+        :param start_text: Text typed by the user
+        :param deadline: Time after which scanning of sectors is interrupted (None if scanning should not be
+                         interrupted)
+        :return: Indices of found PRG points and position of the sector on which the search was stopped or None
+        """
+
+        return self.addr_search.search_text(start_text, *normalize_text(start_text), 5, deadline)
+
+    def test_search_text(self) -> None:
+        """
+        Test if texts typed by the user are searched only when they can match address phrases and if typos are corrected
+
+        :return: The method does not return any values
+        """
+
+        self.assertEqual(self.search_text("Krakow Rynek")[0], ['3'], 'Wrong PRG points of the text!')
+        self.assertEqual(self.search_text("Warszawa Marszalkowka")[0], ['1'], 'Typo in the text is not corrected!')
+        self.assertEqual(self.search_text("Gdansk"), ([], -1), 'PRG points of unknown text are found!')
+        self.assertEqual(self.search_text("52.23, 21.01"), ([], -1), 'Coordinates are searched as a text!')
+        self.assertIsNone(self.search_text("Rynek, gm Krakow"), 'Text with the name of municipality is searched!')
+
+    def test_sectors_order(self) -> None:
+        """
+        Test if order of sectors is centred on the sector of found PRG points only after the search is finished and if
+        cached results found in the previous order of sectors are removed
+
+        :return: The method does not return any values
+        """
+
+        self.search_text("Krakow")
+        c_sekt = self.addr_search.c_sekt
+        self.assertIn(c_sekt, [0, 1, 4, 5], 'Order of sectors is not centred near the found PRG point!')
+
+        part_res = self.search_text("Warszawa", 0.0)
+        self.assertEqual(part_res[1], PART_IDX, 'Search is not interrupted!')
+        self.assertEqual(self.addr_search.c_sekt, c_sekt, 'Order of sectors is changed by the interrupted search!')
+
+        while part_res[1] == PART_IDX:
+            part_res = self.search_text("Warszawa", 0.0)
+
+        self.assertEqual(part_res[0], ['1', '2'], 'Wrong PRG points of the resumed search!')
+        self.assertIn(self.addr_search.adds_list.get_code(0), [10, 11, 14, 15], 'Order of sectors is not changed!')
+
+        # Sektory siatki 4x4 maja po jednej komorce, wiec ich odleglosc to odleglosc Czebyszewa pomiedzy komorkami
+        c_row, c_col = divmod(self.addr_search.c_sekt, 4)
+        self.assertEqual(self.addr_search.adds_list.get_codes(16),
+                         sorted(range(16), key=lambda i: (max(abs(i // 4 - c_row), abs(i % 4 - c_col)), i)),
+                         'Sectors are not sorted by distance from the new sector!')
+        self.assertEqual(len(self.addr_search.prefix_cache.cache_dict), 0, 'Outdated results are kept in cache!')
+        self.assertEqual(self.search_text("Warszawa Wspolna")[0], ['2'], 'Wrong PRG points after the change of order!')
+
+
+class TestLabels(unittest.TestCase):
+    """ Class performing tests of descriptions of PRG points shown in suggestions and popups """
+
+    def setUp(self) -> None:
+        """
+        Method containing description of PRG point and building used in tests
+
+        :return: The method does not return any values
+        """
+
+        self.prg_row = ["Warszawa", "Marszałkowska", "10", "00-001", "Warszawa", "Warszawa", "mazowieckie", ".",
+                        52.2301, 21.0109, b"\x01\x00\x00\x00"]
+        self.bubd_row = ["BUBD", "", "Eksploatowany", "budynek biurowy", 5.0, 1, 1234.6, "Urząd"]
+
+    def test_create_label(self) -> None:
+        """
+        Test if description of PRG point skips empty fields and adds prefixes of street and commune
+
+        :return: The method does not return any values
+        """
+
+        self.assertEqual(create_label(self.prg_row), "Warszawa, ul. Marszałkowska, 10, 00-001, gmina: Warszawa",
+                         'Wrong description of PRG point!')
+
+    def test_create_popup(self) -> None:
+        """
+        Test if popup contains description of PRG point and description of the building or information that there is
+        no building
+
+        :return: The method does not return any values
+        """
+
+        c_popup = create_popup(self.prg_row, self.bubd_row)
+        self.assertIn("<b>Współrzędne: </b>52.23º N, 21.011º E", c_popup, 'Wrong coordinates!')
+        self.assertIn("<b>Liczba kondygnacji: </b>5<br><b>Zabytek: </b>Tak<br><b>Szacunkowa powierzchnia: </b>1234 m²" +
+                      "<br><b>Opis budynku: </b>Urząd", c_popup, 'Wrong description of the building!')
+        self.assertNotIn("Nazwa kartograficzna", c_popup, 'Empty field is not skipped!')
+        self.assertIn(NO_BUBD_INFO[0], create_popup(self.prg_row, None), 'Missing information about no building!')
+
+
+class TestLatencyStats(unittest.TestCase):
+    """ Class performing tests of statistics of times of execution of stages of the search """
+
+    def test_rolling_histogram(self) -> None:
+        """
+        Test if only the latest times are kept in memory and if percentiles and histogram are calculated from them
+
+        :return: The method does not return any values
+        """
+
+        latency_stats = LatencyStats(4)
+
+        for time_ms in (500.0, 0.05, 0.15, 3.0, 3.0):
+            latency_stats.add_time("index_scan", time_ms)
+
+        stage_stats = latency_stats.get_summary()["index_scan"]
+        self.assertEqual(stage_stats["calls"], 4, 'Wrong number of times in memory!')
+        self.assertEqual(stage_stats["max_ms"], 3.0, 'The oldest time is not removed!')
+        self.assertEqual(stage_stats["hist"][:6], [1, 1, 0, 0, 0, 2], 'Wrong histogram!')
+        self.assertEqual(sum(stage_stats["hist"]), 4, 'Wrong histogram!')
+        self.assertEqual(len(stage_stats["hist"]), len(STATS_BUCKETS), 'Wrong number of buckets!')
+        self.assertEqual(latency_stats.get_summary()["sql_fetch"]["calls"], 0, 'Wrong number of times in memory!')
+
+    def test_dump_summary(self) -> None:
+        """
+        Test if measured times are saved to JSON file
+
+        :return: The method does not return any values
+        """
+
+        latency_stats = LatencyStats(10)
+
+        with latency_stats.measure("normalization"):
+            pass
+
+        self.assertIn("normalization", latency_stats.format_summary(), 'Missing stage in the debug panel!')
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            stats_path = os.path.join(temp_dir, "stats", "latency_stats.json")
+            latency_stats.dump_summary(stats_path)
+
+            with open(stats_path, encoding="utf-8") as stats_file:
+                stats_json = json.load(stats_file)
+
+        self.assertEqual(stats_json["stages"]["normalization"]["calls"], 1, 'Time is not saved to the file!')
+        self.assertIsNone(stats_json["buckets_ms"][-1], 'Wrong upper limit of the last bucket!')
+
+
+class TestSectorsTree(unittest.TestCase):
+    """ Class performing tests of adaptive partition of the grid of cells into sectors """
+
+    def setUp(self) -> None:
+        """
+        Method containing test numbers of buildings in cells of the grid (most of buildings lie in one corner)
+
+        :return: The method does not return any values
+        """
+
+        c_rng = np.random.default_rng(0)
+        self.cells_counts = np.zeros((16, 16), dtype=np.int64)
+        np.add.at(self.cells_counts, tuple(c_rng.integers(0, 4, (2, 500))), 1)
+        np.add.at(self.cells_counts, tuple(c_rng.integers(0, 16, (2, 100))), 1)
+        self.sekts_tree = SectorsTree.from_counts(self.cells_counts, 20)
+
+    def test_sectors_partition(self) -> None:
+        """
+        Test if sectors cover the whole grid and contain limited number of buildings
+
+        :return: The method does not return any values
+        """
+
+        sekts_bounds = self.sekts_tree.sekts_bounds
+        sekts_sizes = (sekts_bounds[:, 1] - sekts_bounds[:, 0]) * (sekts_bounds[:, 3] - sekts_bounds[:, 2])
+        sekts_pts = np.bincount(self.sekts_tree.cells_sekts.ravel(), weights=self.cells_counts.ravel())
+        self.assertEqual(sekts_sizes.sum(), self.cells_counts.size, 'Sectors do not cover the grid!')
+        self.assertTrue(np.all((sekts_pts <= 20) | (sekts_sizes == 1)), 'Sectors contain too many buildings!')
+        self.assertGreater(sekts_sizes.max(), 4 * sekts_sizes.min(), 'Sizes of sectors are not adapted to density!')
+
+    def test_sectors_rings(self) -> None:
+        """
+        Test if sectors are sorted lazily ring by ring by distance from the starting sector (Chebyshev distance from the
+        centre of the starting sector to edges of the sector, ties are resolved by codes of sectors)
+
+        :return: The method does not return any values
+        """
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            phrs_path = os.path.join(temp_dir, "all_address_phrases.bin")
+            save_addr_phrases(np.full(len(self.sekts_tree), '', dtype=object), phrs_path)
+            addr_phrs = AddrPhrases(phrs_path)
+            c_sekt = int(self.sekts_tree.cells_sekts[8, 8])
+            c_rings = SectorsRings(addr_phrs, self.sekts_tree.sekts_bounds, c_sekt, 4)
+            self.assertEqual(c_rings.get_code(0), c_sekt, 'Starting sector is not the first sector!')
+            self.assertEqual(len(c_rings.sekts_list), 4, 'Rings are not sorted lazily!')
+
+            sekts_bounds = self.sekts_tree.sekts_bounds.tolist()
+            centr_row = (sekts_bounds[c_sekt][0] + sekts_bounds[c_sekt][1]) / 2
+            centr_col = (sekts_bounds[c_sekt][2] + sekts_bounds[c_sekt][3]) / 2
+            sekts_dists = [max(min_row - centr_row, centr_row - max_row, min_col - centr_col, centr_col - max_col, 0)
+                           for min_row, max_row, min_col, max_col in sekts_bounds]
+            sekts_order = sorted(range(len(sekts_bounds)), key=lambda i: (sekts_dists[i], i))
+            self.assertEqual(c_rings.get_codes(len(c_rings)), sekts_order, 'Order of sectors is not correct!')
+            self.assertIn(sekts_order[1], self.sekts_tree.cells_sekts[7:10, 7:10], 'Second sector is not adjacent!')
+            del c_rings
+            addr_phrs.close()
+
+    def test_cell_codes(self) -> None:
+        """
+        Test if codes of cells of the grid decode back to rows and columns of cells of given coordinates, also for
+        cells on edges of the grid and coordinates lying outside of the grid
+
+        :return: The method does not return any values
+        """
+
+        sekt_szer, sekt_dl, plnd_min_szer, plnd_min_dl = get_sectors_params()
+        sekt_num = int(os.environ["SEKT_NUM"])
+        c_rows = np.asarray([0, 0, sekt_num - 1, sekt_num - 1, 1, sekt_num // 2])
+        c_cols = np.asarray([0, sekt_num - 1, 0, sekt_num - 1, sekt_num - 2, 3])
+        cells_lats = plnd_min_szer + (c_rows + 0.5) * sekt_szer
+        cells_longs = plnd_min_dl + (c_cols + 0.5) * sekt_dl
+        cell_codes = get_cell_codes(cells_lats, cells_longs)
+        self.assertEqual(cell_codes[:4].tolist(), [0, sekt_num - 1, sekt_num * (sekt_num - 1), sekt_num ** 2 - 1],
+                         'Wrong codes of cells in corners of the grid!')
+        self.assertEqual([c_arr.tolist() for c_arr in np.divmod(cell_codes, sekt_num)],
+                         [c_rows.tolist(), c_cols.tolist()], 'Codes of cells do not decode to their rows and columns!')
+        self.assertEqual([c_arr.tolist() for c_arr in get_grid_cells(cells_lats, cells_longs)],
+                         [c_rows.tolist(), c_cols.tolist()], 'Wrong rows and columns of cells!')
+
+        edge_lats = np.asarray([plnd_min_szer, plnd_min_szer - 1.0, plnd_min_szer + sekt_num * sekt_szer, 90.0])
+        edge_longs = np.asarray([plnd_min_dl, plnd_min_dl - 1.0, plnd_min_dl + sekt_num * sekt_dl, 180.0])
+        self.assertEqual(get_cell_codes(edge_lats, edge_longs).tolist(), [0, 0, sekt_num ** 2 - 1, sekt_num ** 2 - 1],
+                         'Coordinates on edges or outside of the grid are not assigned to edge cells!')
+
+
+class TestSnapshots(unittest.TestCase):
+    """ Class performing tests of publishing of versioned database snapshots """
+
+    def test_publish_snapshot(self) -> None:
+        """
+        Test if published snapshot becomes current snapshot and only the newest snapshots (along with their Parquet
+        directories) are kept on disk
+
+        :return: The method does not return any values
+        """
+
+        snap_versions = ["20240101_000000", "20240102_000000", "20240103_000000", "20240104_000000"]
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with mock.patch.dict(os.environ, {"PARENT_PATH": temp_dir, "DB_PATH": "snap.db",
+                                              "ADDRS_PATH": "snap.bin", "PARQUET_PATH": "parquet",
+                                              "SNAPSHOT_BUILD": ""}):
+                for snap_version in snap_versions:
+                    for c_ext in (".db", ".bin"):
+                        open(os.path.join(temp_dir, "snap." + snap_version + c_ext), 'wb').close()
+
+                    os.makedirs(os.path.join(temp_dir, "parquet." + snap_version, "prg"))
+                    open(os.path.join(temp_dir, "parquet." + snap_version, "prg", "part-0.parquet"), 'wb').close()
+
+                publish_snapshot(snap_versions[2], 2)
+
+                with open(os.path.join(temp_dir, "snap.db.current"), 'r', encoding='utf-8') as file:
+                    self.assertEqual(file.read(), snap_versions[2], 'Snapshot has not been published!')
+
+                self.assertEqual(get_snapshot_versions(), snap_versions[1:], 'Wrong snapshots have been removed!')
+                self.assertFalse(os.path.exists(os.path.join(temp_dir, "snap." + snap_versions[0] + ".bin")),
+                                 'Phrase file of removed snapshot still exists!')
+                self.assertFalse(os.path.exists(os.path.join(temp_dir, "parquet." + snap_versions[0])),
+                                 'Parquet directory of removed snapshot still exists!')
+                self.assertTrue(os.path.isdir(os.path.join(temp_dir, "parquet." + snap_versions[1])),
+                                'Parquet directory of kept snapshot is removed!')
+
+    def test_read_only_connection(self) -> None:
+        """
+        Test if connections of the read-only engine to the published snapshot cannot modify the database
+
+        :return: The method does not return any values
+        """
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with mock.patch.dict(os.environ, {"PARENT_PATH": temp_dir, "DB_PATH": "snap.db", "SNAPSHOT_BUILD": ""}):
+                db_path = os.path.join(temp_dir, "snap.20240101_000000.db")
+
+                with sqlite3.connect(db_path) as db_conn:
+                    db_conn.execute("CREATE TABLE TEST_TABLE (TEST_VAL INTEGER)")
+                    db_conn.execute("INSERT INTO TEST_TABLE VALUES (1)")
+
+                db_conn.close()
+                publish_snapshot("20240101_000000", 1)
+                db_conn = connect_read_db(db_path)
+                self.assertEqual(db_conn.execute("SELECT TEST_VAL FROM TEST_TABLE").fetchall(), [(1,)],
+                                 'Rows cannot be read from the snapshot!')
+                self.assertRaises(sqlite3.OperationalError, db_conn.execute, "DELETE FROM TEST_TABLE")
+                self.assertGreater(db_conn.execute("PRAGMA mmap_size").fetchone()[0], 0, 'Snapshot is not mapped!')
+                db_conn.close()
+
+
+class TestQueries(unittest.TestCase):
+    """ Class performing tests of queries of the database filled with synthetic PRG points and BDOT10k buildings """
+
+    def setUp(self) -> None:
+        """
+        Method that creates database filled with synthetic data in a temporary directory
+
+        :return: The method does not return any values
+        """
+
+        # Mala baza danych dzielona jest na wiele sektorow, tak jak baza danych calej Polski
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.env_patch = mock.patch.dict(os.environ, {"PARENT_PATH": self.temp_dir.name, "DB_PATH": "bench.db",
+                                                      "ADDRS_PATH": "bench.bin", "SNAPSHOT_BUILD": "",
+                                                      "QUAD_MAX_PTS": "5", "MAX_SEKTS": "2"})
+        self.env_patch.start()
+        self.reset_engines()
+        create_bench_db(300, 0)
+
+    def tearDown(self) -> None:
+        """
+        Method that closes connections to the database and removes the temporary directory
+
+        :return: The method does not return any values
+        """
+
+        self.reset_engines()
+        self.env_patch.stop()
+        self.temp_dir.cleanup()
+
+    @staticmethod
+    def reset_engines() -> None:
+        """
+        Method that closes connections of SQL engines and forgets metadata of shards read from the previous database
+
+        :return: The method does not return any values
+        """
+
+        SQL_ENGINE.dispose()
+        READ_ENGINE.dispose()
+        get_shards_meta.cache_clear()
+        get_sekts_shards.cache_clear()
+
+    def test_bubd_ids(self) -> None:
+        """
+        Test if PRG points and BDOT10k buildings assigned to each other are found in both directions and if indices of
+        buildings saved as bytes by older versions of the PRG parser are decoded
+
+        :return: The method does not return any values
+        """
+
+        prg_bubd = get_prg_bdot10k(range(1, 301))
+        self.assertEqual(len(prg_bubd), 300, 'Wrong number of PRG points!')
+        self.assertTrue(all(isinstance(bubd_id, int) for bubd_id in prg_bubd.values()), 'Indices are not decoded!')
+
+        bubd_prg = {(prg_id, bubd_id) for prg_id, bubd_id in prg_bubd.items() if bubd_id > 0}
+        bdot10k_prg = get_bdot10k_prg([bubd_id for _, bubd_id in bubd_prg])
+        self.assertEqual({(prg_id, bubd_id) for bubd_id, prg_id in bdot10k_prg[:, :2].tolist()}, bubd_prg,
+                         'Wrong PRG points of buildings!')
+
+        prg_id, bubd_id = min(bubd_prg)
+
+        with sqlite3.connect(os.path.join(self.temp_dir.name, "bench.db")) as db_conn:
+            db_conn.execute("UPDATE PRG_TABLE SET BDOT10K_BUBD_ID = ? WHERE PRG_POINT_ID = ?",
+                            (bubd_id.to_bytes(4, "little", signed=True), prg_id))
+
+        db_conn.close()
+        self.assertEqual(get_prg_bdot10k([prg_id]), {prg_id: bubd_id}, 'Index saved as bytes is not decoded!')
+
+    def test_schema_version(self) -> None:
+        """
+        Test if version of the schema is saved in the database file - databases without saved version have to be
+        rebuilt
+
+        :return: The method does not return any values
+        """
+
+        self.assertEqual(get_schema_version(), 0, 'Database without saved version has the current version!')
+        set_schema_version()
+        self.assertEqual(get_schema_version(), SCHEMA_VERSION, 'Version of the schema is not saved!')
+
+    def test_prg_radius(self) -> None:
+        """
+        Test if PRG points found through R*Tree table within given radius are the same and in the same order as PRG
+        points found by the distance filter of all PRG points, also after adding a new PRG point
+
+        :return: The method does not return any values
+        """
+
+        with sqlite3.connect(os.path.join(self.temp_dir.name, "bench.db")) as db_conn:
+            prg_crds = np.asarray(db_conn.execute("SELECT PRG_POINT_ID, SZEROKOSC, DLUGOSC FROM PRG_TABLE").fetchall())
+
+        db_conn.close()
+        c_lat, c_long = prg_crds[0, 1] + 0.001, prg_crds[0, 2] - 0.001
+
+        for c_rad in (500.0, 3000.0):
+            pts_dists = get_crds_dists(c_lat, c_long, prg_crds[:, 1], prg_crds[:, 2])
+            exp_ids = prg_crds[np.argsort(pts_dists, kind="stable"), 0][np.sort(pts_dists) <= c_rad]
+            prg_pts = get_prg_radius(c_lat, c_long, c_rad)
+            self.assertGreater(len(exp_ids), 0, 'There are no PRG points within the radius!')
+            self.assertEqual(prg_pts[:, 0].tolist(), exp_ids.tolist(), 'Wrong PRG points within the radius!')
+            self.assertTrue(np.all(np.diff(prg_pts[:, 3]) >= 0), 'PRG points are not sorted by distance!')
+
+        with sqlite3.connect(os.path.join(self.temp_dir.name, "bench.db")) as db_conn:
+            db_conn.execute("INSERT INTO PRG_TABLE SELECT PRG_POINT_ID + 1000, WOJEWODZTWO, POWIAT, GMINA, " +
+                            "MIEJSCOWOSC, MIEJSCOWOSC2, ULICA, NUMER, KOD_POCZTOWY, STATUS, ?, ?, ZRODLO, " +
+                            "CZY_POPRAWNY, ODLEGLOSC_OD_GMINY, BDOT10K_BUBD_ID, ODLEGLOSC_OD_BUDYNKU, KOD_SEKTORA, " +
+                            "DODATKOWY_OPIS FROM PRG_TABLE WHERE PRG_POINT_ID = ?",
+                            (c_lat, c_long, int(prg_crds[0, 0])))
+
+        db_conn.close()
+        sync_rtree_tables()
+        self.assertEqual(get_prg_radius(c_lat, c_long, 500.0)[0, 0], prg_crds[0, 0] + 1000,
+                         'New PRG point is not added to R*Tree table!')
+
+    def test_export_snapshot(self) -> None:
+        """
+        Test if Parquet snapshot contains all rows of PRG and BDOT10k tables with declared schema and if every file
+        contains only rows of its block of sectors - partitions of the previous export with other blocks of sectors
+        cannot be left in the directory
+
+        :return: The method does not return any values
+        """
+
+        snap_path = os.path.join(self.temp_dir.name, "parquet")
+
+        for block_size in ("3", "10"):
+            with mock.patch.dict(os.environ, {"PARQUET_BLOCK": block_size}):
+                export_snapshot(snap_path)
+
+        with sqlite3.connect(os.path.join(self.temp_dir.name, "bench.db")) as db_conn:
+            db_ids = {"prg": db_conn.execute("SELECT PRG_POINT_ID FROM PRG_TABLE").fetchall(),
+                      "bdot10k": db_conn.execute("SELECT BDOT10K_BUBD_ID FROM BDOT10K_TABLE").fetchall()}
+
+        db_conn.close()
+
+        for snap_name, snap_schema in (("prg", SNAPSHOT_META["prg"][1]), ("bdot10k", SNAPSHOT_META["bdot10k"][1])):
+            snap_dir = os.path.join(snap_path, snap_name)
+            snap_table = ds.dataset(snap_dir, format="parquet", partitioning="hive").to_table()
+            self.assertEqual(snap_table.num_rows, len(db_ids[snap_name]), 'Wrong number of exported rows!')
+            self.assertEqual(sorted(snap_table.column(0).to_pylist()), sorted(row[0] for row in db_ids[snap_name]),
+                             'Wrong indices of exported rows!')
+            self.assertEqual(sorted(snap_table.schema.names), sorted(snap_schema.names), 'Wrong exported columns!')
+            self.assertTrue(all(snap_table.schema.field(c_field.name).type == c_field.type for c_field in snap_schema
+                                if c_field.name not in SNAPSHOT_META[snap_name][3]), 'Wrong types of columns!')
+
+            file_paths = glob.glob(os.path.join(snap_dir, "**", "*.parquet"), recursive=True)
+            self.assertGreater(len(file_paths), 1, 'Rows are not partitioned by blocks of sectors!')
+
+            for file_path in file_paths:
+                block_code = int(re.search(r"KOD_BLOKU=(\d+)", file_path).group(1))
+                sekt_codes = np.asarray(pq.read_table(file_path, columns=["KOD_SEKTORA"]).column(0).to_pylist())
+                self.assertTrue(np.all(sekt_codes // 10 == block_code), 'File contains rows of another block!')
+
+    def test_query_paths(self) -> None:
+        """
+        Test if query paths of the benchmark find the same PRG points as the plain scan of address lines of sectors and
+        if all paths are measured
+
+        :return: The method does not return any values
+        """
+
+        query_paths = QueryPaths()
+
+        for prg_row in get_prg_info([1, 2, 3]):
+            start_text = prg_row[0] + " " + prg_row[1] + " " + prg_row[2]
+            curr_text = normalize_text(start_text)[0]
+            adds_list = query_paths.addr_search.adds_list
+            scan_ids = []
+
+            for s_idx in range(len(adds_list)):
+                scan_ids += [c_line[c_line.rindex("[") + 1:-1] for c_line in adds_list[s_idx].splitlines()
+                             if curr_text in c_line]
+
+                if len(scan_ids) >= query_paths.addrs_num:
+                    break
+
+            scan_labels = [prg_point[0] for prg_point in
+                           query_paths.labels_cache.get_points(scan_ids[:query_paths.addrs_num]).values()]
+            self.assertGreater(len(scan_labels), 0, 'PRG point is not found by the baseline scan!')
+            self.assertEqual(sorted(query_paths.text_changed(start_text)), sorted(scan_labels),
+                             'Search finds other PRG points than the baseline scan!')
+
+        corpus_path = os.path.join(self.temp_dir.name, "bench_queries.jsonl")
+        create_bench_corpus(corpus_path, 5, 0)
+        bench_res = run_benchmarks(corpus_path, 1)
+        self.assertEqual(list(bench_res), ["on_text_changed", "on_text_selected_coords", "popup_fetch"],
+                         'Wrong query paths!')
+        self.assertTrue(all(path_stats["calls"] > 0 for path_stats in bench_res.values()), 'Path is not measured!')
+
+
+class TestShards(unittest.TestCase):
+    """ Class performing tests of assignment of files of provinces to database shards """
+
+    def test_shard_ids(self) -> None:
+        """
+        Test if files of provinces are assigned to shards with TERYT codes of these provinces
+
+        :return: The method does not return any values
+        """
+
+        bdot10k_names = ["PL.PZGiK.994.02__OT_BDOT10k.zip", "PL.PZGiK.994.32__OT_BDOT10k.zip"]
+        prg_names = ["PRG_PunktyAdresowe_dolnośląskie.xml", "PRG_PunktyAdresowe_zachodniopomorskie.xml"]
+        teryt_dict = {"DOLNOSLASKIE": "02;", "ZACHODNIOPOMORSKIE": "32;"}
+        shard_ids = [get_bdot10k_shard_id(woj_name) for woj_name in bdot10k_names]
+
+        self.assertEqual(shard_ids, [2, 32], 'Wrong shards of BDOT10k files!')
+        self.assertEqual([get_prg_shard_id(woj_name, teryt_dict) for woj_name in prg_names], [2, 32],
+                         'Wrong shards of PRG files!')
+        self.assertEqual(group_woj_names(bdot10k_names + bdot10k_names[:1], shard_ids + [2]),
+                         {2: [bdot10k_names[0], bdot10k_names[0]], 32: [bdot10k_names[1]]}, 'Wrong groups of files!')
+
+
+class TestDictEncoder(unittest.TestCase):
+    """ Class performing tests of lookup tables of repeated values of columns of PRG and BDOT10k tables """
+
+    def setUp(self) -> None:
+        """
+        Method that creates PRG and BDOT10k tables, their lookup tables and views in the in-memory database
+
+        :return: The method does not return any values
+        """
+
+        self.db_engine = sa.create_engine("sqlite://", poolclass=sa.pool.StaticPool)
+        BASE.metadata.create_all(self.db_engine, tables=[PRG.__table__, BDOT10K.__table__, *DICT_TABLES.values()])
+        create_dict_views(self.db_engine)
+        self.prg_rows = [{"PRG_POINT_ID": i + 1, "WOJEWODZTWO": "łódzkie", "POWIAT": powiat, "GMINA": gmina,
+                          "MIEJSCOWOSC": gmina, "MIEJSCOWOSC2": "", "ULICA": ulica, "NUMER": str(i + 1),
+                          "KOD_POCZTOWY": "90-001", "STATUS": "istniejacy", "SZEROKOSC": 51.7 + i / 100,
+                          "DLUGOSC": 19.4, "ZRODLO": "PRG", "CZY_POPRAWNY": 1, "ODLEGLOSC_OD_GMINY": 0.0,
+                          "BDOT10K_BUBD_ID": i + 1, "ODLEGLOSC_OD_BUDYNKU": 0.0, "KOD_SEKTORA": 3,
+                          "DODATKOWY_OPIS": ""}
+                         for i, (powiat, gmina, ulica) in enumerate((("Łódź", "Łódź", "Piotrkowska"),
+                                                                     ("Łódź", "Łódź", "Zgierska"),
+                                                                     ("zgierski", "Zgierz", "Piotrkowska")))]
+
+    def tearDown(self) -> None:
+        """
+        Method that closes the in-memory database
+
+        :return: The method does not return any values
+        """
+
+        self.db_engine.dispose()
+
+    def read_view(self, view_name: str) -> List[Tuple]:
+        """
+        Method that reads all rows of a given view
+
+        :param view_name: Name of the view
+        :return: List of rows sorted by the first column
+        """
+
+        with self.db_engine.connect() as db_conn:
+            return [tuple(c_row) for c_row in db_conn.execute(sa.text("SELECT * FROM " + view_name + " ORDER BY 1"))]
+
+    def test_prg_view(self) -> None:
+        """
+        Test if PRG points saved by two encoders decode back to the original values and if repeated values are saved
+        in lookup tables only once
+
+        :return: The method does not return any values
+        """
+
+        for c_rows in (self.prg_rows[:2], self.prg_rows[2:]):
+            prg_enc = DictEncoder(PRG.__table__, self.db_engine)
+
+            with self.db_engine.begin() as db_conn:
+                db_conn.execute(PRG.__table__.insert(), [prg_enc.encode_dict(c_row) for c_row in c_rows])
+                prg_enc.save(db_conn)
+
+        self.assertEqual(self.read_view("PRG_VIEW"), [tuple(c_row.values()) for c_row in self.prg_rows],
+                         'Values of the view differ from the original values!')
+
+        with self.db_engine.connect() as db_conn:
+            self.assertEqual(db_conn.execute(sa.text("SELECT DICT_VALUE FROM ULICA_DICT ORDER BY DICT_ID")).all(),
+                             [("Piotrkowska",), ("Zgierska",)], 'Repeated values are saved more than once!')
+
+    def test_bdot10k_view(self) -> None:
+        """
+        Test if BDOT10k buildings encoded as arguments of the constructor of the class "BDOT10K" decode back to the
+        original values
+
+        :return: The method does not return any values
+        """
+
+        bubd_cols = [c_col.name for c_col in BDOT10K.__table__.columns]
+        bubd_rows = [(i + 1, 3, "BUBD", nazwa, "Eksploatowany", funkcja, 2.0, 0, "", 150.0, 51.7, 19.4,
+                      '{"type": "Polygon", "coordinates": []}')
+                     for i, (nazwa, funkcja) in enumerate((("", "budynki mieszkalne"), ("Pałac", "budynki biurowe"),
+                                                           ("", "budynki biurowe")))]
+        bubd_enc = DictEncoder(BDOT10K.__table__, self.db_engine)
+
+        with self.db_engine.begin() as db_conn:
+            db_conn.execute(BDOT10K.__table__.insert(), [dict(zip(bubd_cols, c_row[:1] + tuple(
+                bubd_enc.encode_row(c_row[1:])))) for c_row in bubd_rows])
+            bubd_enc.save(db_conn)
+
+        self.assertEqual(self.read_view("BDOT10K_VIEW"), bubd_rows,
+                         'Values of the view differ from the original values!')
+
+
+class TestRegions(unittest.TestCase):
+    """ Class performing tests of tables of shapes of administrative regions """
+
+    def setUp(self) -> None:
+        """
+        Method that saves shapes of a province and its counties (one county consists of two features, one of which has
+        a hole) to shapefiles packed like the file of administrative regions
+
+        :return: The method does not return any values
+        """
+
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.env_patch = mock.patch.dict(os.environ, {"PARENT_PATH": self.temp_dir.name, "DB_PATH": "regs.db",
+                                                      "SNAPSHOT_BUILD": "", "JA_PATH": "regs.zip"})
+        self.env_patch.start()
+        SQL_ENGINE.dispose()
+        BASE.metadata.create_all(SQL_ENGINE, tables=[TerytCodes.__table__, RegJSON.__table__])
+        regs_feats = {"A01_Granice_wojewodztw": [("dolnośląskie", "02", "POLYGON ((200000 300000, 400000 300000, " +
+                                                  "400000 450000, 200000 450000, 200000 300000))")],
+                      "A02_Granice_powiatow": [
+                          ("powiat bolesławiecki", "0201", "MULTIPOLYGON (((250000 350000, 270000 350000, 270000 " +
+                           "370000, 250000 370000, 250000 350000)), ((280000 350000, 290000 350000, 290000 360000, " +
+                           "280000 360000, 280000 350000)))"),
+                          ("powiat bolesławiecki", "0201", "POLYGON ((250000 380000, 270000 380000, 270000 400000, " +
+                           "250000 400000, 250000 380000), (255000 385000, 256000 385000, 256000 386000, 255000 " +
+                           "386000, 255000 385000))"),
+                          ("powiat dzierżoniowski", "0202", "POLYGON ((300000 300000, 320000 300000, 320000 320000, " +
+                           "300000 320000, 300000 300000))")]}
+        shp_srs = osr.SpatialReference()
+        shp_srs.ImportFromEPSG(2180)
+
+        with zipfile.ZipFile(os.path.join(self.temp_dir.name, "regs.zip"), "w") as zfile:
+            for shp_name, shp_feats in regs_feats.items():
+                shp_path = os.path.join(self.temp_dir.name, shp_name + ".shp")
+                data_src = ogr.GetDriverByName("ESRI Shapefile").CreateDataSource(shp_path)
+                c_layer = data_src.CreateLayer(shp_name, shp_srs, ogr.wkbPolygon)
+                c_layer.CreateField(ogr.FieldDefn("JPT_NAZWA_", ogr.OFTString))
+                c_layer.CreateField(ogr.FieldDefn("JPT_KOD_JE", ogr.OFTString))
+
+                for reg_name, teryt, reg_wkt in shp_feats:
+                    c_feat = ogr.Feature(c_layer.GetLayerDefn())
+                    c_feat.SetField("JPT_NAZWA_", reg_name)
+                    c_feat.SetField("JPT_KOD_JE", teryt)
+                    c_feat.SetGeometry(ogr.CreateGeometryFromWkt(reg_wkt))
+                    c_layer.CreateFeature(c_feat)
+
+                # Pliki shapefile zapisywane sa dopiero po zamknieciu warstwy i zrodla danych
+                c_layer = data_src = None
+
+                for shp_ext in (".shp", ".shx", ".dbf", ".prj"):
+                    zfile.write(os.path.join(self.temp_dir.name, shp_name + shp_ext), shp_name + shp_ext)
+
+    def tearDown(self) -> None:
+        """
+        Method that closes connections to the database and removes the temporary directory
+
+        :return: The method does not return any values
+        """
+
+        SQL_ENGINE.dispose()
+        self.env_patch.stop()
+        self.temp_dir.cleanup()
+
+    def test_fill_regs_tables(self) -> None:
+        """
+        Test if every region is saved once with its full name and if its shape contains only outer rings of polygons
+        of all its features
+
+        :return: The method does not return any values
+        """
+
+        fill_regs_tables()
+
+        with sqlite3.connect(os.path.join(self.temp_dir.name, "regs.db")) as db_conn:
+            teryt_rows = db_conn.execute("SELECT TERYT_NAME, TERYT_CODE FROM TERYT_TABLE").fetchall()
+            json_rows = db_conn.execute("SELECT JSON_TERYT, JSON_NAME, JSON_WKB, MIN_LONG, MAX_LONG, MIN_LAT, " +
+                                        "MAX_LAT FROM JSON_TABLE ORDER BY JSON_TERYT").fetchall()
+
+        db_conn.close()
+        self.assertEqual(sorted(teryt_rows), [("DOLNOSLASKIE", "02"), ("DOLNOSLASKIE;BOLESLAWIECKI", "0201"),
+                                              ("DOLNOSLASKIE;DZIERZONIOWSKI", "0202")], 'Wrong TERYT codes!')
+        self.assertEqual([json_row[:2] for json_row in json_rows], [("02", "DOLNOSLASKIE"),
+                                                                    ("0201", "DOLNOSLASKIE;BOLESLAWIECKI"),
+                                                                    ("0202", "DOLNOSLASKIE;DZIERZONIOWSKI")],
+                         'Wrong names of regions!')
+
+        for json_row, polys_num in zip(json_rows, (1, 3, 1)):
+            reg_geom = ogr.CreateGeometryFromWkb(json_row[2])
+            min_long, max_long, min_lat, max_lat = json_row[3:]
+            self.assertEqual(reg_geom.GetGeometryCount(), polys_num, 'Wrong number of polygons of the region!')
+            self.assertTrue(all(reg_geom.GetGeometryRef(i).GetGeometryCount() == 1 for i in range(polys_num)),
+                            'Inner rings of polygons are not removed!')
+            self.assertTrue(14.0 < min_long < max_long < 24.5 and 49.0 < min_lat < max_lat < 55.0,
+                            'Wrong bounding box of the region!')
+
+
+class TestShardRoutes(unittest.TestCase):
+    """ Class performing tests of routing of queries to database shards """
+
+    def setUp(self) -> None:
+        """
+        Method that creates main database and two shards in a temporary directory - every shard contains three PRG
+        points with buildings located in one sector and in a separate area
+
+        :return: The method does not return any values
+        """
+
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.env_patch = mock.patch.dict(os.environ, {"PARENT_PATH": self.temp_dir.name, "DB_PATH": "shards.db",
+                                                      "SNAPSHOT_BUILD": "", "SHARD_ID_STEP": "1000",
+                                                      "SQL_IN_MAX": "2"})
+        self.env_patch.start()
+        self.reset_engines()
+        BASE.metadata.create_all(SQL_ENGINE, tables=[ShardInfo.__table__, ShardSekt.__table__])
+        create_shards([2, 32])
+        self.fill_shard(2, 2000, 5, 51.0, 17.0)
+        self.fill_shard(32, 32000, 7, 53.5, 15.0)
+        update_shards_meta()
+
+    def tearDown(self) -> None:
+        """
+        Method that closes connections to the databases and removes the temporary directory
+
+        :return: The method does not return any values
+        """
+
+        self.reset_engines()
+        self.env_patch.stop()
+        self.temp_dir.cleanup()
+
+    @staticmethod
+    def reset_engines() -> None:
+        """
+        Method that closes connections of SQL engines and forgets metadata of shards read from the previous database -
+        modules of the project import each other without the name of the package, so engines of shards and metadata
+        of shards are taken from the module "db_shards" and not from the package
+
+        :return: The method does not return any values
+        """
+
+        SQL_ENGINE.dispose()
+        READ_ENGINE.dispose()
+
+        for shard_engine in db_shards.SHARD_ENGINES.values():
+            shard_engine.dispose()
+
+        db_shards.SHARD_ENGINES.clear()
+
+        for c_func in (get_shards_meta, get_sekts_shards, db_shards.get_shards_meta, db_shards.get_sekts_shards):
+            c_func.cache_clear()
+
+    @staticmethod
+    def fill_shard(shard_id: int, id_start: int, sekt_code: int, c_lat: float, c_long: float) -> None:
+        """
+        Method that saves three PRG points and their buildings to a given shard
+
+        :param shard_id: Index of the shard
+        :param id_start: Index of rows preceding the first saved row
+        :param sekt_code: Code of the sector of PRG points and buildings
+        :param c_lat: Latitude of the first PRG point
+        :param c_long: Longitude of the first PRG point
+        :return: The method does not return any values
+        """
+
+        shard_engine = db_shards.get_shard_engine("%02d" % shard_id)
+        row_ids = [id_start + i + 1 for i in range(3)]
+        bubd_enc = DictEncoder(BDOT10K.__table__, shard_engine)
+        prg_enc = DictEncoder(PRG.__table__, shard_engine)
+        bubd_rows = []
+        prg_rows = []
+
+        for i, row_id in enumerate(row_ids):
+            lat, lon = c_lat + i * 0.01, c_long + i * 0.01
+            bubd_poly = [[[lon, lat], [lon + 0.0001, lat], [lon + 0.0001, lat + 0.0001], [lon, lat]]]
+            bubd_rows.append({"BDOT10K_BUBD_ID": row_id, "KOD_SEKTORA": sekt_code, "KATEGORIA_BUDYNKU": "BUBD",
+                              "NAZWA_KARTOGRAFICZNA": "", "STAN_BUDYNKU": "Eksploatowany",
+                              "FUNKCJA_BUDYNKU": "budynki mieszkalne", "LICZBA_KONDYGNACJI": 2.0, "CZY_ZABYTEK": 0,
+                              "OPIS_BUDYNKU": "", "POWIERZCHNIA": 150.0, "CENTROID_LAT": lat, "CENTROID_LONG": lon,
+                              "BUBD_GEOJSON": json.dumps({"type": "Polygon", "coordinates": bubd_poly})})
+            prg_rows.append({"PRG_POINT_ID": row_id, "WOJEWODZTWO": "%02d" % shard_id, "POWIAT": "powiat",
+                             "GMINA": "Gmina", "MIEJSCOWOSC": "Miasto", "MIEJSCOWOSC2": "", "ULICA": "Polna",
+                             "NUMER": str(i + 1), "KOD_POCZTOWY": "00-001", "STATUS": "istniejacy", "SZEROKOSC": lat,
+                             "DLUGOSC": lon, "ZRODLO": "PRG", "CZY_POPRAWNY": 1, "ODLEGLOSC_OD_GMINY": 0.0,
+                             "BDOT10K_BUBD_ID": row_id, "ODLEGLOSC_OD_BUDYNKU": 0.0, "KOD_SEKTORA": sekt_code,
+                             "DODATKOWY_OPIS": ""})
+
+        with shard_engine.begin() as db_conn:
+            db_conn.execute(BDOT10K.__table__.insert(), [bubd_enc.encode_dict(c_row) for c_row in bubd_rows])
+            db_conn.execute(PRG.__table__.insert(), [prg_enc.encode_dict(c_row) for c_row in prg_rows])
+            bubd_enc.save(db_conn)
+            prg_enc.save(db_conn)
+
+        sync_rtree_tables(shard_engine)
+
+    def test_route_in_vals(self) -> None:
+        """
+        Test if values of filters are sent only to shards containing rows with these values
+
+        :return: The method does not return any values
+        """
+
+        engine_02, engine_32 = db_shards.get_shard_engine("02", True), db_shards.get_shard_engine("32", True)
+        self.assertEqual(route_in_vals("prg_info", [2001, 32002, 2003, 5001]), [(engine_02, [2001, 2003]),
+                                                                                (engine_32, [32002])],
+                         'Wrong shards of indices of rows!')
+        self.assertEqual(route_in_vals("bdot10k_sekts", [7, 5, 9]), [(engine_32, [7]), (engine_02, [5])],
+                         'Wrong shards of codes of sectors!')
+        self.assertEqual(route_in_vals("prg_gmina", ["Gmina"]), [(engine_02, ["Gmina"]), (engine_32, ["Gmina"])],
+                         'Query is not sent to all shards!')
+        self.assertEqual(route_in_vals("prg_info", [5001]), [(engine_02, [])],
+                         'Query without matching shards is not sent to the first shard!')
+
+    def test_read_sql_in(self) -> None:
+        """
+        Test if rows read from many shards are concatenated (also when values of filter are joined from temporary
+        table)
+
+        :return: The method does not return any values
+        """
+
+        prg_info = read_sql_in("prg_info", [32001, 2001, 2002, 2003, 5001])
+        self.assertEqual(sorted(prg_info["WOJEWODZTWO"].tolist()), ["02", "02", "02", "32"],
+                         'Wrong rows read from shards!')
+        self.assertEqual(len(read_sql_in("prg_info", [5001])), 0, 'Rows of not existing shard are read!')
+        self.assertEqual(len(read_sql_in("prg_gmina", ["Gmina"])), 6, 'Rows are not read from all shards!')
+
+    def test_bbox_engines(self) -> None:
+        """
+        Test if spatial queries are sent only to shards whose bounding boxes intersect given bounding box
+
+        :return: The method does not return any values
+        """
+
+        engine_02, engine_32 = db_shards.get_shard_engine("02", True), db_shards.get_shard_engine("32", True)
+        self.assertEqual(get_bbox_engines(50.9, 16.9, 51.1, 17.1), [engine_02], 'Wrong shards of bounding box!')
+        self.assertEqual(get_bbox_engines(50.0, 14.0, 54.0, 18.0), [engine_02, engine_32],
+                         'Wrong shards of bounding box containing both shards!')
+        self.assertEqual(get_bbox_engines(49.0, 22.0, 49.5, 23.0), [engine_02],
+                         'Query without matching shards is not sent to the first shard!')
+
+    def test_shard_id_step(self) -> None:
+        """
+        Test if metadata of shards are not saved when indices of rows of a shard reach range of the next shard
+
+        :return: The method does not return any values
+        """
+
+        self.fill_shard(2, 2998, 5, 51.1, 17.1)
+        self.assertRaises(Exception, update_shards_meta)
+
+
+class TestTiles(unittest.TestCase):
+    """ Class performing tests of map tiles with outlines of BDOT10k buildings """
+
+    def test_simplify_ring(self) -> None:
+        """
+        Test if vertices of outlines are snapped to the grid of the tile and outlines smaller than a cell are removed
+
+        :return: The method does not return any values
+        """
+
+        tile_bbox = get_tile_bbox(17, 73215, 43128)
+        min_lat, min_long, max_lat, max_long = tile_bbox
+        d_lat, d_long = (max_lat - min_lat) / 256, (max_long - min_long) / 256
+        ring_crds = [[min_long + i * d_long, min_lat + j * d_lat] for i, j in ((10, 10), (10.2, 10.1), (20, 10),
+                                                                               (20, 20), (10, 20), (10, 10))]
+
+        with mock.patch.dict(os.environ, {"COORDS_PREC": "9"}):
+            self.assertLess(min_lat, max_lat, 'Wrong bounding box of the tile!')
+            self.assertEqual(len(simplify_ring(ring_crds, tile_bbox, 256)), 5, 'Repeated vertices are not removed!')
+            self.assertIsNone(simplify_ring(ring_crds[:2] * 2, tile_bbox, 256),
+                              'Outline smaller than a cell is not removed!')
+
+    def test_lru_eviction(self) -> None:
+        """
+        Test if least recently used tiles are removed from the disk when size of the cache exceeds the limit
+
+        :return: The method does not return any values
+        """
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            tile_cache = TileCache(temp_dir, 250)
+
+            for tile_idx in range(3):
+                tile_cache.get_tile(os.path.join("17", str(tile_idx) + ".geojson"), lambda: b"x" * 100)
+
+            self.assertEqual(tile_cache.get_tile(os.path.join("17", "1.geojson"), lambda: b""), b"x" * 100,
+                             'Tile is not read from the cache!')
+            tile_cache.get_tile(os.path.join("17", "3.geojson"), lambda: b"x" * 100)
+            self.assertEqual(sorted(os.listdir(os.path.join(temp_dir, "17"))), ["1.geojson", "3.geojson"],
+                             'Least recently used tiles are not removed!')
+
+    def test_load_tiles(self) -> None:
+        """
+        Test if tiles cached by the previous run are used after reading of the directory of the cache, as less recently
+        used than tiles saved in the meantime, and if temporary files of the previous run are removed
+
+        :return: The method does not return any values
+        """
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            os.makedirs(os.path.join(temp_dir, "17"))
+
+            for tile_idx, tile_name in enumerate(("0.geojson", "1.geojson", "2.geojson.1.tmp")):
+                tile_path = os.path.join(temp_dir, "17", tile_name)
+
+                with open(tile_path, 'wb') as file:
+                    file.write(b"y" * 100)
+
+                os.utime(tile_path, (1000000000 + tile_idx, 1000000000 + tile_idx))
+
+            tile_cache = TileCache(temp_dir, 250)
+            tile_cache.get_tile(os.path.join("17", "3.geojson"), lambda: b"x" * 100)
+            self.assertEqual(len(os.listdir(os.path.join(temp_dir, "17"))), 4, 'Tiles are removed before reading!')
+            tile_cache.load_tiles()
+            self.assertEqual(sorted(os.listdir(os.path.join(temp_dir, "17"))), ["1.geojson", "3.geojson"],
+                             'Wrong tiles are removed after reading of the cache!')
+            self.assertEqual(tile_cache.get_tile(os.path.join("17", "1.geojson"), lambda: b""), b"y" * 100,
+                             'Tile of the previous run is not read from the cache!')
+
+    def test_basemap_tiles(self) -> None:
+        """
+        Test if basemap tiles are read from MBTiles file with rows numbered from the bottom and kept in memory
+
+        :return: The method does not return any values
+        """
+
+        tile_x, tile_y = get_tile_xy(52.23, 21.01, 12)
+        min_lat, min_long, max_lat, max_long = get_tile_bbox(12, tile_x, tile_y)
+        self.assertTrue(min_lat <= 52.23 < max_lat and min_long <= 21.01 < max_long, 'Wrong tile of coordinates!')
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            mbtiles_path = os.path.join(temp_dir, "basemap.mbtiles")
+            db_conn = sqlite3.connect(mbtiles_path)
+
+            for c_sql in MBTILES_SQL:
+                db_conn.execute(c_sql)
+
+            db_conn.execute("INSERT INTO metadata VALUES ('format', 'jpg')")
+            db_conn.execute("INSERT INTO tiles VALUES (12, ?, ?, ?)", (tile_x, 2 ** 12 - 1 - tile_y, b"tile"))
+            db_conn.commit()
+            db_conn.close()
+
+            basemap_tiles = BasemapTiles(mbtiles_path, 1)
+            self.assertEqual(basemap_tiles.tiles_mime, "image/jpeg", 'Wrong format of tiles!')
+            self.assertEqual(basemap_tiles.get_tile(12, tile_x, tile_y), b"tile", 'Tile is not read from the file!')
+            self.assertIsNone(basemap_tiles.get_tile(12, tile_x, tile_y + 1), 'Missing tile is returned!')
+            self.assertEqual(list(basemap_tiles.hot_tiles), [(12, tile_x, tile_y + 1)], 'Wrong tiles in memory!')
+            basemap_tiles.mbtiles_engine.dispose()
+
+    def test_seed_basemap(self) -> None:
+        """
+        Test if seeding of basemap tiles skips tiles which could not be downloaded and saves the remaining ones
+
+        :return: The method does not return any values
+        """
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            tile_x, tile_y = get_tile_xy(52.23, 21.01, 12)
+            os.makedirs(os.path.join(temp_dir, "12", str(tile_x)))
+
+            with open(os.path.join(temp_dir, "12", str(tile_x), str(tile_y) + ".png"), "wb") as tile_file:
+                tile_file.write(b"\x89PNG tile")
+
+            # Zrodlo zawiera tylko jeden z dwoch kafelkow obszaru - brakujacy kafelek nie moze przerwac pobierania
+            min_lat, min_long, max_lat, max_long = get_tile_bbox(12, tile_x, tile_y)
+            tiles_url = "file:///" + temp_dir.replace(os.sep, "/").lstrip("/") + "/{z}/{x}/{y}.png"
+            mbtiles_path = os.path.join(temp_dir, "basemap.mbtiles")
+            tiles_bbox = (min_lat + 1e-6, min_long + 1e-6, max_lat - 1e-6, max_long + (max_long - min_long) / 2)
+            tiles_num = seed_basemap(mbtiles_path, tiles_url, tiles_bbox, 12, 12)
+            self.assertEqual(tiles_num, 1, 'Wrong number of downloaded tiles!')
+
+            basemap_tiles = BasemapTiles(mbtiles_path, 1)
+            self.assertEqual(basemap_tiles.tiles_mime, "image/png", 'Wrong format of tiles!')
+            self.assertEqual(basemap_tiles.get_tile(12, tile_x, tile_y), b"\x89PNG tile", 'Tile is not saved!')
+            basemap_tiles.mbtiles_engine.dispose()
+
+    def test_encode_points(self) -> None:
+        """
+        Test if points are packed into typed arrays of latitudes, longitudes and indices sorted by longitude
+
+        :return: The method does not return any values
+        """
+
+        pts_buff = base64.b64decode(encode_points(np.array([5, 7, 10000001]), np.array([52.1, 52.2, 52.3]),
+                                                  np.array([21.3, 21.1, 21.2])))
+        self.assertEqual(len(pts_buff), 36, 'Wrong size of the buffer!')
+        np.testing.assert_allclose(np.frombuffer(pts_buff[:12], "<f4"), [52.2, 52.3, 52.1], rtol=1e-6)
+        np.testing.assert_allclose(np.frombuffer(pts_buff[12:24], "<f4"), [21.1, 21.2, 21.3], rtol=1e-6)
+        np.testing.assert_array_equal(np.frombuffer(pts_buff[24:], "<u4"), [7, 10000001, 5])
+
+    def test_scan_points(self) -> None:
+        """
+        Test if points sorted by longitude are found inside bounding box of a map tile given by its corners
+
+        :return: The method does not return any values
+        """
+
+        rand_gen = np.random.default_rng(0)
+        tile_x, tile_y = get_tile_xy(52.23, 21.01, 14)
+        min_lat, min_long, max_lat, max_long = get_tile_bbox(14, tile_x, tile_y)
+        lats_arr = rand_gen.uniform(min_lat - 0.02, max_lat + 0.02, 1000)
+        longs_arr = np.sort(rand_gen.uniform(min_long - 0.02, max_long + 0.02, 1000))
+        in_bbox = (lats_arr >= min_lat) & (lats_arr <= max_lat) & (longs_arr >= min_long) & (longs_arr <= max_long)
+        self.assertTrue(0 < in_bbox.sum() < 1000, 'Wrong test points!')
+
+        np.testing.assert_array_equal(scan_points(lats_arr, longs_arr, (min_lat, min_long), (max_lat, max_long)),
+                                      np.nonzero(in_bbox)[0])
+        self.assertEqual(len(scan_points(lats_arr, longs_arr, (max_lat, max_long), (min_lat, min_long))), 0,
+                         'Points are found for swapped corners of the bounding box!')
+
+
 if __name__ == '__main__':
     unittest.main()